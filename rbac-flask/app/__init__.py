@@ -2,6 +2,8 @@ import click
 import json
 from flask import Flask, render_template
 from .extensions import db, login_manager
+from . import (budget, engine, formularios, grading, identidad, intentos, journal, metrics, replicas,
+               schema, versiones)
 from .models import User
 
 
@@ -9,9 +11,28 @@ def create_app(config_object="config.Config"):
     app = Flask(__name__, instance_relative_config=True, static_folder="static", template_folder="templates")
     app.config.from_object(config_object)
 
+    # opciones del pool y pragmas según el dialecto (una opción explícita en config gana)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS",
+                          engine.opciones(app.config["SQLALCHEMY_DATABASE_URI"], app.config))
+    # réplica de lectura opcional (DB_REPLICA_URL) como bind "replica"
+    app.config["SQLALCHEMY_BINDS"] = replicas.binds(app.config, engine.opciones)
+
     # init extensions
     db.init_app(app)
+    engine.init_app(app)
+    # esquema: migraciones pendientes una sola vez al arrancar (no por petición),
+    # antes de que el autosave o el diario puedan escribir en la base
+    schema.init_app(app)
+    replicas.init_app(app)
     login_manager.init_app(app)
+    identidad.init_app(app)
+    grading.init_app(app)
+    versiones.init_app(app)
+    formularios.init_app(app)
+    intentos.init_app(app)
+    journal.init_app(app)
+    budget.init_app(app)
+    metrics.init_app(app)
 
     # jinja filters
     @app.template_filter('from_json')
@@ -41,11 +62,6 @@ def create_app(config_object="config.Config"):
     app.register_blueprint(main_bp)
     app.register_blueprint(profesor_bp)
 
-    # create tables on first request
-    @app.before_request
-    def _create_tables():  # pragma: no cover
-        db.create_all()
-
     # error handlers
     @app.errorhandler(403)
     def forbidden(_):
@@ -72,3 +88,150 @@ def register_cli(app: Flask):
         db.session.add(u)
         db.session.commit()
         click.secho(f"Usuario {username} creado con rol {role}", fg="green")
+
+    @app.cli.command("import-students")
+    @click.argument("archivo", type=click.File("rb"))
+    @click.option("--workers", type=int, default=None, help="Processes used to hash passwords.")
+    def import_students(archivo, workers):
+        """Create student accounts from a CSV (username,email,password[,grupo])."""
+        from . import bulk
+        filas, errores = bulk.leer_csv(archivo)
+        resultado = bulk.importar_estudiantes(filas, procesos=workers)
+        for error in errores + resultado.errores:
+            click.secho(f"  omitida: {error}", fg="yellow")
+        click.secho(f"{resultado.creados} estudiante(s) importado(s)", fg="green")
+
+    @app.cli.command("bench-hash")
+    @click.option("--algorithm", type=click.Choice(["scrypt", "pbkdf2"]), default=None,
+                  help="Algorithm to calibrate (defaults to the configured one).")
+    @click.option("--target-ms", type=float, default=50.0, show_default=True,
+                  help="Target latency of one hash on this machine.")
+    @click.option("--repeat", type=int, default=3, show_default=True)
+    def bench_hash(algorithm, target_ms, repeat):
+        """Calibrate the password hashing cost to a target latency."""
+        from . import passwords
+        actual = passwords.politica_actual()
+        click.echo(f"Política actual: {passwords.describir(actual)} "
+                   f"→ {passwords.medir(actual, repeat):.1f} ms")
+        mediciones, elegida = passwords.calibrar(algorithm or actual.algoritmo, target_ms, repeat)
+        for politica, ms in mediciones:
+            click.echo(f"  {passwords.describir(politica):<40} {ms:8.1f} ms")
+        if elegida is None:
+            click.secho(f"Ningún costo cumple el objetivo de {target_ms:.0f} ms", fg="red")
+            raise SystemExit(1)
+        click.secho(f"\nPolítica sugerida: {passwords.describir(elegida)}", fg="green")
+        click.echo(f"  PASSWORD_HASH_ALGORITHM={elegida.algoritmo}")
+        click.echo(f"  PASSWORD_HASH_COST={elegida.costo}")
+
+    @app.cli.command("drain-submissions")
+    def drain_submissions():
+        """Apply the pending write-behind submission journal now."""
+        from . import journal
+        if not journal.activo(app):
+            click.secho("SUBMIT_WRITE_BEHIND no está activo", fg="yellow")
+            return
+        aplicados = journal.vaciar(app)
+        click.secho(f"{aplicados} envío(s) aplicado(s); "
+                    f"{len(app.extensions['journal.diario'])} pendiente(s)", fg="green")
+
+    @app.cli.command("db-sync-replica")
+    def db_sync_replica():
+        """Copy the primary SQLite database over the local replica file."""
+        url = app.config.get("DB_REPLICA_URL")
+        if not url:
+            click.secho("DB_REPLICA_URL no está configurada", fg="red")
+            raise SystemExit(1)
+        try:
+            replicas.sincronizar(app.config["SQLALCHEMY_DATABASE_URI"], url)
+        except ValueError as e:
+            click.secho(str(e), fg="red")
+            raise SystemExit(1)
+        click.secho(f"Réplica sincronizada: {url}", fg="green")
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Apply pending schema migrations."""
+        from . import schema
+        aplicadas = schema.upgrade(echo=click.echo)
+        if not aplicadas:
+            click.echo("El esquema ya está actualizado")
+        click.secho(f"Versión de esquema: {schema.current_version()}", fg="green")
+
+    @app.cli.command("rebuild-stats")
+    def rebuild_stats():
+        """Recompute the materialized professor statistics from scratch."""
+        from . import stats
+        total = stats.recalcular()
+        db.session.commit()
+        click.secho(f"Estadísticas recalculadas para {total} profesor(es)", fg="green")
+
+    @app.cli.command("calibrate")
+    @click.option("--examen", "examen_ids", type=int, multiple=True, required=True,
+                  help="Exam id to calibrate (repeatable).")
+    @click.option("--min-students", type=int, default=None,
+                  help="Minimum completed attempts (defaults to RASCH_MIN_STUDENTS).")
+    def calibrate(examen_ids, min_students):
+        """Fit a Rasch model to an exam's answers and store item difficulties."""
+        from . import analisis
+        from .models import Examen
+        if not analisis.disponible():
+            click.secho("La calibración requiere NumPy", fg="red")
+            raise SystemExit(1)
+        minimo = min_students if min_students is not None else app.config["RASCH_MIN_STUDENTS"]
+        fallidos = 0
+        for examen_id in examen_ids:
+            examen = db.session.get(Examen, examen_id)
+            if examen is None:
+                click.secho(f"Examen {examen_id}: no existe", fg="red")
+                fallidos += 1
+                continue
+            try:
+                calibracion = analisis.calibrar(examen, minimo)
+            except ValueError as e:
+                db.session.rollback()
+                click.secho(f"Examen {examen_id}: {e}", fg="red")
+                fallidos += 1
+                continue
+            db.session.commit()
+            click.secho(
+                f"Examen {examen_id}: {calibracion.preguntas} pregunta(s) calibradas con "
+                f"{calibracion.usados} de {calibracion.estudiantes} estudiante(s) en "
+                f"{calibracion.iteraciones} iteraciones"
+                f"{'' if calibracion.convergio else ' (sin converger)'}; "
+                f"{calibracion.reescalados} resultado(s) reescalados",
+                fg="green" if calibracion.convergio else "yellow")
+        if fallidos:
+            raise SystemExit(1)
+
+    @app.cli.command("db-advise")
+    @click.option("--url", default=None, help="Database URL to analyse (defaults to the app database).")
+    @click.option("--strict", is_flag=True, help="Exit with an error if any full scan is found.")
+    def db_advise(url, strict):
+        """EXPLAIN the hot queries and flag full table scans."""
+        from sqlalchemy import create_engine
+        from . import advisor
+        engine = create_engine(url) if url else db.engine
+        click.echo(f"Analizando consultas en {engine.dialect.name}...")
+        planes = advisor.explain(engine)
+        total_escaneos = 0
+        for plan in planes:
+            color = "yellow" if plan.escaneos else "green"
+            click.secho(f"\n{plan.nombre}", fg=color, bold=True)
+            for linea in plan.plan:
+                marca = "  ⚠️ " if linea in plan.escaneos else "    "
+                click.echo(f"{marca}{linea}")
+            total_escaneos += len(plan.escaneos)
+        if total_escaneos:
+            click.secho(f"\n{total_escaneos} recorrido(s) completo(s) detectado(s)", fg="yellow")
+            if strict:
+                raise SystemExit(1)
+        else:
+            click.secho("\nSin recorridos completos", fg="green")
+
+    @app.cli.command("db-version")
+    def db_version():
+        """Show the current schema version and pending migrations."""
+        from . import schema
+        click.echo(f"Versión actual: {schema.current_version()} (última: {schema.head_version()})")
+        for version, nombre in schema.pending():
+            click.echo(f"  pendiente: {version:03d} {nombre}")
@@ -0,0 +1,32 @@
+"""
+Control de acceso de los estudiantes a sus exámenes.
+
+`asignado` busca la fila (estudiante_id, examen_id) de estudiante_examen por
+su clave primaria, así que cuesta lo mismo con 5 que con 5000 exámenes
+asignados; antes se cargaba la colección `examenes_asignados` completa y se
+recorría en Python. Dentro de una petición el resultado se memoriza en `g`:
+las vistas y plantillas pueden volver a preguntar sin otra consulta.
+"""
+from flask import g, has_request_context
+from sqlalchemy import exists, select
+
+from .extensions import db
+from .models import estudiante_examen
+
+
+def _consultar(estudiante_id, examen_id):
+    return db.session.execute(select(exists().where(
+        estudiante_examen.c.estudiante_id == estudiante_id,
+        estudiante_examen.c.examen_id == examen_id,
+    ))).scalar()
+
+
+def asignado(estudiante_id, examen_id):
+    """True si el examen está asignado al estudiante."""
+    if not has_request_context():
+        return _consultar(estudiante_id, examen_id)
+    memo = g.setdefault("_acceso", {})
+    clave = (estudiante_id, examen_id)
+    if clave not in memo:
+        memo[clave] = _consultar(estudiante_id, examen_id)
+    return memo[clave]
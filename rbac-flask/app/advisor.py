@@ -0,0 +1,97 @@
+"""
+Asesor de índices: ejecuta EXPLAIN sobre las consultas más frecuentes de
+app/main/routes.py y marca las que recorren una tabla completa.
+
+Uso: flask db-advise [--url mysql+pymysql://...] [--strict]
+"""
+from collections import namedtuple
+
+from sqlalchemy import desc, select, text
+from sqlalchemy.exc import DBAPIError
+
+from .models import Examen, ExamenResultado, Notificacion, Respuesta
+
+PlanConsulta = namedtuple("PlanConsulta", "nombre plan escaneos")
+
+# Valores de ejemplo para los parámetros de las consultas
+_ID = 1
+
+
+def consultas_frecuentes():
+    """(nombre, sentencia) de las consultas calientes de las vistas."""
+    return [
+        ("resultado_estudiante_examen", select(ExamenResultado).where(
+            ExamenResultado.estudiante_id == _ID,
+            ExamenResultado.examen_id == _ID,
+        ).limit(1)),
+        ("resultados_examen_completados", select(ExamenResultado).where(
+            ExamenResultado.examen_id == _ID,
+            ExamenResultado.completado == True,
+        )),
+        ("historial_estudiante", select(ExamenResultado).where(
+            ExamenResultado.estudiante_id == _ID,
+        ).order_by(desc(ExamenResultado.fecha_presentacion))),
+        ("resultados_recientes_profesor", select(ExamenResultado).join(
+            Examen, ExamenResultado.examen_id == Examen.id
+        ).where(
+            Examen.profesor_id == _ID,
+        ).order_by(desc(ExamenResultado.fecha_presentacion)).limit(10)),
+        ("respuestas_resultado", select(Respuesta).where(
+            Respuesta.examen_id == _ID,
+            Respuesta.estudiante_id == _ID,
+        )),
+        ("notificaciones_no_leidas", select(Notificacion).where(
+            Notificacion.usuario_id == _ID,
+            Notificacion.leida == False,
+        ).order_by(desc(Notificacion.fecha_creacion)).limit(5)),
+        ("examenes_profesor_recientes", select(Examen).where(
+            Examen.profesor_id == _ID,
+        ).order_by(desc(Examen.fecha_creacion)).limit(5)),
+    ]
+
+
+def _explain_sqlite(conn, sql):
+    filas = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    plan = [fila[-1] for fila in filas]
+    # "SCAN tabla" sin índice = recorrido completo
+    escaneos = [linea for linea in plan
+                if linea.startswith("SCAN ") and " INDEX " not in linea]
+    return plan, escaneos
+
+
+def _explain_mysql(conn, sql):
+    resultado = conn.execute(text(f"EXPLAIN {sql}"))
+    columnas = list(resultado.keys())
+    plan, escaneos = [], []
+    for fila in resultado.fetchall():
+        datos = dict(zip(columnas, fila))
+        linea = (f"{datos.get('table')}: type={datos.get('type')} "
+                 f"key={datos.get('key')} rows={datos.get('rows')} {datos.get('Extra') or ''}")
+        plan.append(linea.strip())
+        if datos.get("type") == "ALL":
+            escaneos.append(linea.strip())
+    return plan, escaneos
+
+
+def explain(engine, consultas=None):
+    """Ejecutar EXPLAIN sobre cada consulta y devolver una lista de PlanConsulta."""
+    if engine.dialect.name == "sqlite":
+        explicar = _explain_sqlite
+    elif engine.dialect.name in ("mysql", "mariadb"):
+        explicar = _explain_mysql
+    else:
+        raise ValueError(f"Dialecto no soportado: {engine.dialect.name}")
+
+    planes = []
+    with engine.connect() as conn:
+        for nombre, sentencia in consultas or consultas_frecuentes():
+            sql = str(sentencia.compile(dialect=engine.dialect,
+                                        compile_kwargs={"literal_binds": True}))
+            try:
+                plan, escaneos = explicar(conn, sql)
+            except DBAPIError as e:
+                # Esquema desactualizado en la base analizada: reportar y seguir
+                conn.rollback()
+                plan, escaneos = [f"ERROR: {e.orig}"], []
+            planes.append(PlanConsulta(nombre, plan, escaneos))
+    return planes
@@ -0,0 +1,280 @@
+"""
+Análisis de ítems de un examen (teoría clásica de los tests).
+
+Las respuestas de los intentos completados se cargan con una sola consulta y
+se arman como matrices NumPy estudiantes × preguntas: opción elegida (-1 = sin
+responder) y aciertos (0/1). Los aciertos se calculan comparando la opción
+elegida con la clave vigente, no con Respuesta.es_correcta, que tras una
+edición mezcla calificaciones de versiones distintas de la clave. Sobre ellas
+se calcula, sin bucles en Python:
+
+- dificultad (p): proporción de aciertos de cada pregunta,
+- discriminación: correlación punto-biserial entre acertar la pregunta y el
+  puntaje en el resto de la prueba (corregida, sin contar la propia pregunta),
+- distractores: proporción de estudiantes que eligió cada opción,
+- confiabilidad KR-20 de la prueba.
+
+Solo entran las preguntas que se califican automáticamente (opción múltiple y
+verdadero/falso). El resultado se guarda en caché por examen y marca de agua
+(versión del examen, número de presentaciones y la última), así que se
+recalcula con el siguiente envío.
+
+La misma matriz de aciertos alimenta la calibración Rasch del examen
+(`calibrar`, usada por `flask calibrate`): guarda la dificultad de cada
+pregunta y reescala los puntajes ya presentados.
+
+NumPy es opcional: sin él `disponible()` es False y la vista lo avisa.
+"""
+from collections import namedtuple
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import and_, func, select, update
+
+from . import grading, rasch, versiones
+from .cache import LRUCache
+from .extensions import db
+from .models import ExamenResultado, Pregunta, Respuesta
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+# Umbrales para señalar preguntas a revisar
+MUY_FACIL = 0.90
+MUY_DIFICIL = 0.20
+DISCRIMINACION_BAJA = 0.20
+DISTRACTOR_INUTIL = 0.05
+
+OpcionAnalisis = namedtuple("OpcionAnalisis", "etiqueta texto correcta tasa")
+ItemAnalisis = namedtuple(
+    "ItemAnalisis", "pregunta_id numero texto tipo dificultad discriminacion sin_responder "
+                    "opciones alertas")
+Analisis = namedtuple("Analisis", "examen_id estudiantes items kr20 media desviacion")
+Calibracion = namedtuple(
+    "Calibracion", "examen_id estudiantes usados preguntas iteraciones convergio reescalados")
+
+_analisis = LRUCache(maxsize=64)
+
+
+def disponible():
+    return np is not None
+
+
+# ============= CARGA =============
+
+def _items(clave):
+    return [item for item in clave.items if item.correcta is not None and item.opciones]
+
+
+def matrices(examen_id, items):
+    """(aciertos, elegidas): matrices estudiantes × items de los intentos completados.
+
+    aciertos es int8 (0/1), calificado contra la opción correcta de cada item;
+    elegidas es int16 con el índice de la opción o -1. Un intento sin ninguna
+    respuesta a estas preguntas no aporta fila.
+    """
+    ids = np.array([item.pregunta_id for item in items], dtype=np.int64)
+    correctas = np.array([item.correcta for item in items], dtype=np.int16)
+    # Por la conexión y no por la sesión: filas planas sin el procesamiento del ORM
+    filas = db.session.connection().execute(select(
+        Respuesta.estudiante_id,
+        Respuesta.pregunta_id,
+        func.coalesce(Respuesta.opcion_indice, -1),
+    ).join(ExamenResultado, and_(
+        ExamenResultado.examen_id == Respuesta.examen_id,
+        ExamenResultado.estudiante_id == Respuesta.estudiante_id,
+        ExamenResultado.completado == True,
+    )).where(
+        Respuesta.examen_id == examen_id,
+        Respuesta.pregunta_id.in_(ids.tolist()),
+    ).order_by(Respuesta.id)).all()
+    if not filas:
+        return np.zeros((0, len(items)), np.int8), np.full((0, len(items)), -1, np.int16)
+
+    # fromiter sobre los valores planos: np.array(filas) trata cada Row como secuencia genérica
+    datos = np.fromiter(chain.from_iterable(filas), dtype=np.int64,
+                        count=3 * len(filas)).reshape(-1, 3)
+    _, fila = np.unique(datos[:, 0], return_inverse=True)
+    orden = np.argsort(ids)
+    columna = orden[np.searchsorted(ids, datos[:, 1], sorter=orden)]
+
+    elegidas = np.full((fila.max() + 1, len(items)), -1, dtype=np.int16)
+    # Con respuestas repetidas a una pregunta gana la última (orden por id)
+    elegidas[fila, columna] = datos[:, 2]
+    return (elegidas == correctas).astype(np.int8), elegidas
+
+
+# ============= CÁLCULO =============
+
+def estadisticas(aciertos, elegidas, opciones_por_item):
+    """Estadísticos vectorizados sobre las matrices.
+
+    Devuelve (dificultad, discriminacion, tasas, sin_responder, kr20, media,
+    desviacion); tasas es una matriz items × max(opciones).
+    """
+    n, k = aciertos.shape
+    ancho = max(opciones_por_item, default=0) + 1
+    if n == 0:
+        return (np.zeros(k), np.full(k, np.nan), np.zeros((k, ancho - 1)), np.zeros(k),
+                None, 0.0, 0.0)
+    x = aciertos.astype(np.float64)
+    total = x.sum(axis=1)
+    dificultad = x.mean(axis=0)
+
+    # Punto-biserial corregida: correlación de cada columna con el puntaje sin ella
+    resto = total[:, None] - x
+    xc = x - dificultad
+    rc = resto - resto.mean(axis=0)
+    denominador = np.sqrt((xc * xc).sum(axis=0) * (rc * rc).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discriminacion = np.where(denominador > 0, (xc * rc).sum(axis=0) / denominador, np.nan)
+
+    # Distractores: un bincount sobre (item, opción) en vez de un conteo por pregunta
+    codigos = np.arange(k, dtype=np.int64) * ancho + (elegidas.astype(np.int64) + 1)
+    conteos = np.bincount(codigos.ravel(), minlength=k * ancho).reshape(k, ancho)
+    tasas = conteos[:, 1:] / n
+    sin_responder = conteos[:, 0] / n
+
+    varianza = total.var()
+    kr20 = None
+    if k > 1 and varianza > 0:
+        kr20 = float(k / (k - 1) * (1 - (dificultad * (1 - dificultad)).sum() / varianza))
+    return (dificultad, discriminacion, tasas, sin_responder, kr20,
+            float(total.mean()), float(total.std()))
+
+
+def _alertas(dificultad, discriminacion, opciones):
+    alertas = []
+    if dificultad >= MUY_FACIL:
+        alertas.append("muy fácil")
+    elif dificultad <= MUY_DIFICIL:
+        alertas.append("muy difícil")
+    if discriminacion is None or discriminacion < DISCRIMINACION_BAJA:
+        alertas.append("discrimina poco")
+    if any(not o.correcta and o.tasa < DISTRACTOR_INUTIL for o in opciones):
+        alertas.append("distractor sin elegir")
+    return tuple(alertas)
+
+
+def analizar(examen_id, clave):
+    """Analisis completo del examen a partir de su clave de respuestas."""
+    items = _items(clave)
+    aciertos, elegidas = matrices(examen_id, items)
+    (dificultad, discriminacion, tasas, sin_responder,
+     kr20, media, desviacion) = estadisticas(aciertos, elegidas, [len(i.opciones) for i in items])
+
+    resultado = []
+    for j, item in enumerate(items):
+        opciones = tuple(
+            OpcionAnalisis(
+                etiqueta=chr(ord("A") + o) if o < 26 else str(o + 1),
+                texto=texto,
+                correcta=o == item.correcta,
+                tasa=float(tasas[j, o]),
+            )
+            for o, texto in enumerate(item.opciones)
+        )
+        disc = None if np.isnan(discriminacion[j]) else float(discriminacion[j])
+        resultado.append(ItemAnalisis(
+            pregunta_id=item.pregunta_id,
+            numero=j + 1,
+            texto=item.texto,
+            tipo=item.tipo,
+            dificultad=float(dificultad[j]),
+            discriminacion=disc,
+            sin_responder=float(sin_responder[j]),
+            opciones=opciones,
+            alertas=_alertas(float(dificultad[j]), disc, opciones) if len(aciertos) else (),
+        ))
+    return Analisis(examen_id, len(aciertos), tuple(resultado), kr20, media, desviacion)
+
+
+# ============= CACHÉ =============
+
+def _marca_de_agua(examen):
+    """Cambia con cada presentación completada del examen y con cada edición."""
+    total, ultima = db.session.query(
+        func.count(ExamenResultado.id), func.max(ExamenResultado.fecha_presentacion)
+    ).filter(
+        ExamenResultado.examen_id == examen.id,
+        ExamenResultado.completado == True,
+    ).one()
+    return examen.version, total, ultima
+
+
+def analisis_examen(examen):
+    """Análisis del examen, desde caché mientras no haya nuevos envíos."""
+    marca = _marca_de_agua(examen)
+    return _analisis.get_or_set(
+        (examen.id, marca),
+        lambda: analizar(examen.id, grading.get_answer_key(examen))
+    )
+
+
+# ============= CALIBRACIÓN =============
+
+def calibrar(examen, minimo=30):
+    """Ajustar el modelo de Rasch del examen y guardar sus dificultades (sin commit).
+
+    Crea una nueva versión del examen (congelada si está publicado) para que
+    todos los procesos recompilen la clave con la nueva tabla de puntajes, y
+    reescala los resultados ya completados. ValueError si hay menos de `minimo` presentaciones.
+    """
+    items = _items(grading.get_answer_key(examen))
+    aciertos, _ = matrices(examen.id, items)
+    if len(aciertos) < minimo:
+        raise ValueError(f"El examen tiene {len(aciertos)} presentación(es) con respuestas; "
+                         f"se necesitan al menos {minimo}")
+    dificultades, usados, iteraciones, convergio = rasch.ajustar(aciertos)
+
+    db.session.execute(update(Pregunta), [
+        {"id": item.pregunta_id, "rasch_dificultad": float(b)}
+        for item, b in zip(items, dificultades)
+    ])
+    examen.calibrado_en = datetime.now()
+    examen.calibrado_con = usados
+    versiones.nueva_version(examen)
+    db.session.flush()
+    return Calibracion(examen.id, len(aciertos), usados, len(items), iteraciones, convergio,
+                       reescalar(examen))
+
+
+def reescalar(examen):
+    """Recalcular puntaje_escalado de los resultados completados. Devuelve cuántos.
+
+    Los aciertos se cuentan contra la clave actual, igual que en `matrices`
+    (Respuesta.es_correcta puede venir de otra versión de la clave), y con
+    respuestas repetidas a una pregunta cuenta la última.
+    """
+    clave = grading.get_answer_key(examen)
+    escala = clave.escala
+    correctas = {item.pregunta_id: item.correcta for item in clave.items
+                 if item.correcta is not None}
+    if not escala:
+        return 0
+    filas = db.session.connection().execute(select(
+        ExamenResultado.id, Respuesta.pregunta_id, Respuesta.opcion_indice,
+    ).outerjoin(Respuesta, and_(
+        Respuesta.examen_id == ExamenResultado.examen_id,
+        Respuesta.estudiante_id == ExamenResultado.estudiante_id,
+        Respuesta.pregunta_id.in_(list(correctas)),
+    )).where(
+        ExamenResultado.examen_id == examen.id,
+        ExamenResultado.completado == True,
+    ).order_by(ExamenResultado.id, Respuesta.id)).all()
+
+    elegidas = {}
+    for rid, pregunta_id, indice in filas:
+        por_pregunta = elegidas.setdefault(rid, {})
+        if pregunta_id is not None:
+            por_pregunta[pregunta_id] = indice
+    if elegidas:
+        db.session.execute(update(ExamenResultado), [
+            {"id": rid, "puntaje_escalado": escala[sum(
+                1 for pregunta_id, indice in por_pregunta.items()
+                if indice == correctas[pregunta_id])]}
+            for rid, por_pregunta in elegidas.items()
+        ])
+    return len(elegidas)
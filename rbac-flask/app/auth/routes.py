@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 
+from .. import passwords
 from ..extensions import db
 from ..models import User
 
@@ -20,6 +21,7 @@ def login():
         )
         if user and user.check_password(password):
             login_user(user)
+            passwords.programar_rehash(user, password)
             flash("Bienvenido/a", "success")
             # redirigir según rol
             if user.role == "admin":
@@ -0,0 +1,55 @@
+"""
+Presupuesto de consultas SQL por vista.
+
+Las vistas declaran cuántas sentencias pueden ejecutar con `@query_budget(n)`.
+Con QUERY_BUDGET_ENFORCE activo (TestConfig) cada
+petición cuenta sus sentencias y falla con QueryBudgetExceeded si se pasa, de
+modo que un N+1 nuevo rompe los tests en lugar de llegar a producción.
+"""
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .extensions import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(maximo, methods=("GET",)):
+    """Declarar el máximo de sentencias SQL que puede ejecutar la vista
+    (por defecto solo se controla al pintar, en GET)."""
+    def decorator(f):
+        f.query_budget = (maximo, frozenset(methods))
+        return f
+    return decorator
+
+
+def _contar(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._sql_sentencias = g.get("_sql_sentencias", 0) + 1
+
+
+def consultas_peticion():
+    """Sentencias ejecutadas hasta ahora en la petición actual."""
+    return g.get("_sql_sentencias", 0)
+
+
+def _verificar(response):
+    vista = current_app.view_functions.get(request.endpoint)
+    maximo, metodos = getattr(vista, "query_budget", (None, ()))
+    if request.method in metodos and consultas_peticion() > maximo:
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} ejecutó {consultas_peticion()} consultas "
+            f"(presupuesto: {maximo})")
+    return response
+
+
+def init_app(app):
+    if not app.config.get("QUERY_BUDGET_ENFORCE"):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _contar):
+                event.listen(engine, "before_cursor_execute", _contar)
+    app.after_request(_verificar)
@@ -0,0 +1,232 @@
+"""
+Operaciones masivas sobre estudiantes: importación desde CSV y asignación de
+exámenes por grupo o filtro.
+
+El hash de contraseñas (lo más costoso de crear una cuenta) se reparte en un
+pool de procesos; las inserciones y borrados en `estudiante_examen` se calculan
+como diferencia de conjuntos y se envían en un solo executemany.
+"""
+import csv
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, insert, select
+from werkzeug.security import generate_password_hash
+
+from . import passwords
+from .extensions import db
+from .models import User, estudiante_examen
+
+COLUMNAS_CSV = ("username", "email", "password")
+COLUMNAS_OPCIONALES = ("grupo",)
+
+# Por debajo de este número de contraseñas no compensa arrancar el pool
+MINIMO_POOL = 32
+
+# Tamaño máximo de las listas IN: una consulta lleva hasta dos listas y debe
+# quedar bajo el límite de 999 variables de SQLite anterior a 3.32
+LOTE_IN = 450
+
+MODOS = ("reemplazar", "agregar", "quitar")
+
+FilaImportacion = namedtuple("FilaImportacion", "linea username email password grupo")
+ResultadoImportacion = namedtuple("ResultadoImportacion", "creados errores")
+ResultadoAsignacion = namedtuple("ResultadoAsignacion", "agregados eliminados total")
+
+
+# ============= IMPORTACIÓN =============
+
+def leer_csv(archivo):
+    """Leer y validar un CSV de estudiantes.
+
+    `archivo` es un objeto de texto o bytes (p. ej. un FileStorage). Devuelve
+    (filas, errores), donde errores es una lista de "línea N: motivo".
+    """
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode("utf-8-sig")
+    lector = csv.DictReader(io.StringIO(contenido))
+
+    columnas = [c.strip().lower() for c in (lector.fieldnames or [])]
+    faltantes = [c for c in COLUMNAS_CSV if c not in columnas]
+    if faltantes:
+        return [], [f"Faltan columnas: {', '.join(faltantes)}"]
+    lector.fieldnames = columnas
+
+    filas, errores = [], []
+    usernames, emails = set(), set()
+    for linea, registro in enumerate(lector, 2):
+        datos = {k: (v or "").strip() for k, v in registro.items() if k}
+        if not all(datos.get(c) for c in COLUMNAS_CSV):
+            errores.append(f"línea {linea}: campos obligatorios vacíos")
+            continue
+        if datos["username"] in usernames or datos["email"] in emails:
+            errores.append(f"línea {linea}: usuario o email repetido en el archivo")
+            continue
+        usernames.add(datos["username"])
+        emails.add(datos["email"])
+        filas.append(FilaImportacion(
+            linea=linea,
+            username=datos["username"],
+            email=datos["email"],
+            password=datos["password"],
+            grupo=datos.get("grupo") or None,
+        ))
+    return filas, errores
+
+
+def _lotes(valores, tamano=LOTE_IN):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def hash_passwords(claves, procesos=None):
+    """Hashes de `claves` con la política vigente, en el mismo orden, usando
+    un pool de procesos."""
+    claves = list(claves)
+    generar = partial(generate_password_hash, method=passwords.metodo(passwords.politica_actual()))
+    if procesos is None:
+        procesos = current_app.config.get("BULK_HASH_WORKERS") or os.cpu_count() or 1
+    if procesos <= 1 or len(claves) < MINIMO_POOL:
+        return [generar(c) for c in claves]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(generar, claves,
+                             chunksize=max(1, len(claves) // (procesos * 4))))
+
+
+def importar_estudiantes(filas, procesos=None):
+    """Crear las cuentas de estudiante de `filas` que no existan todavía.
+
+    Los usuarios y emails existentes se consultan por lotes y se reportan
+    como error; el resto se inserta en un solo executemany. Hace commit.
+    """
+    existentes_usuario, existentes_email = set(), set()
+    for lote in _lotes(filas):
+        for username, email in db.session.execute(select(User.username, User.email).where(
+            User.username.in_([f.username for f in lote]) | User.email.in_([f.email for f in lote])
+        )):
+            existentes_usuario.add(username)
+            existentes_email.add(email)
+
+    nuevas, errores = [], []
+    for fila in filas:
+        if fila.username in existentes_usuario or fila.email in existentes_email:
+            errores.append(f"línea {fila.linea}: usuario o email ya existe")
+        else:
+            nuevas.append(fila)
+
+    if nuevas:
+        ahora = datetime.utcnow()
+        hashes = hash_passwords([f.password for f in nuevas], procesos)
+        db.session.execute(insert(User), [{
+            "username": fila.username,
+            "email": fila.email,
+            "password_hash": password_hash,
+            "role": "estudiante",
+            "is_active": True,
+            "created_at": ahora,
+            "grupo": fila.grupo,
+        } for fila, password_hash in zip(nuevas, hashes)])
+        db.session.commit()
+    return ResultadoImportacion(creados=len(nuevas), errores=errores)
+
+
+# ============= ASIGNACIÓN =============
+
+def grupos():
+    """Grupos con al menos un estudiante, ordenados."""
+    return [g for (g,) in db.session.execute(
+        select(User.grupo).where(
+            User.role == "estudiante", User.grupo.isnot(None)
+        ).distinct().order_by(User.grupo)
+    )]
+
+
+def filtro_estudiantes(grupo=None, buscar=None, solo_activos=True):
+    """Sentencia con los IDs de estudiantes que cumplen el filtro."""
+    sentencia = select(User.id).where(User.role == "estudiante")
+    if solo_activos:
+        sentencia = sentencia.where(User.is_active == True)
+    if grupo:
+        sentencia = sentencia.where(User.grupo == grupo)
+    if buscar:
+        patron = f"%{buscar}%"
+        sentencia = sentencia.where(User.username.like(patron) | User.email.like(patron))
+    return sentencia
+
+
+def estudiantes_validos(ids):
+    """Subconjunto de `ids` que corresponde a estudiantes."""
+    validos = set()
+    for lote in _lotes({int(i) for i in ids}):
+        validos.update(db.session.execute(select(User.id).where(
+            User.id.in_(lote), User.role == "estudiante"
+        )).scalars())
+    return validos
+
+
+def asignados(examen_id):
+    """IDs de los estudiantes asignados al examen."""
+    return set(db.session.execute(select(estudiante_examen.c.estudiante_id).where(
+        estudiante_examen.c.examen_id == examen_id
+    )).scalars())
+
+
+def sincronizar_asignaciones(examen_id, estudiante_ids, modo="reemplazar"):
+    """Aplicar una asignación masiva como diferencia de conjuntos.
+
+    - reemplazar: los asignados pasan a ser exactamente `estudiante_ids`
+    - agregar: se suman `estudiante_ids` a los actuales
+    - quitar: se retiran `estudiante_ids` de los actuales
+
+    Los IDs que no sean de estudiantes se ignoran. No hace commit.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de asignación no válido: {modo}")
+    return _aplicar(examen_id, estudiantes_validos(estudiante_ids), modo)
+
+
+def asignar_por_filtro(examen_id, modo="agregar", **filtro):
+    """Asignar (o retirar) todos los estudiantes que cumplen el filtro."""
+    if modo not in MODOS:
+        raise ValueError(f"Modo de asignación no válido: {modo}")
+    if modo == "quitar" and not (filtro.get("grupo") or filtro.get("buscar")):
+        # Sin filtro retiraría el examen a todos los estudiantes activos
+        raise ValueError("Para quitar estudiantes indica un grupo o un texto de búsqueda")
+    ids = set(db.session.execute(filtro_estudiantes(**filtro)).scalars())
+    return _aplicar(examen_id, ids, modo)
+
+
+def _aplicar(examen_id, objetivo, modo):
+    # Las filas nuevas y las retiradas se envían cada una en un executemany
+    actuales = asignados(examen_id)
+    if modo == "reemplazar":
+        agregar, quitar = objetivo - actuales, actuales - objetivo
+    elif modo == "agregar":
+        agregar, quitar = objetivo - actuales, set()
+    else:
+        agregar, quitar = set(), actuales & objetivo
+
+    if agregar:
+        ahora = datetime.utcnow()
+        db.session.execute(estudiante_examen.insert(), [
+            {"estudiante_id": eid, "examen_id": examen_id, "asignado_en": ahora}
+            for eid in sorted(agregar)
+        ])
+    if quitar:
+        db.session.execute(estudiante_examen.delete().where(and_(
+            estudiante_examen.c.examen_id == bindparam("b_examen_id"),
+            estudiante_examen.c.estudiante_id == bindparam("b_estudiante_id"),
+        )), [{"b_examen_id": examen_id, "b_estudiante_id": eid} for eid in sorted(quitar)])
+
+    return ResultadoAsignacion(
+        agregados=len(agregar),
+        eliminados=len(quitar),
+        total=len(actuales) + len(agregar) - len(quitar),
+    )
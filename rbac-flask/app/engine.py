@@ -0,0 +1,145 @@
+"""
+Ajuste del motor de base de datos según el dialecto.
+
+`opciones(url, config)` arma SQLALCHEMY_ENGINE_OPTIONS a partir de las
+variables DB_POOL_* / SQLITE_* de config.py:
+
+- MySQL (PyMySQL): tamaño del pool, desborde, espera máxima, pool_recycle por
+  debajo de wait_timeout y pool_pre_ping para descartar conexiones cerradas.
+- SQLite en archivo: pool de conexiones y busy_timeout; al conectar se aplican
+  journal_mode=WAL, synchronous, busy_timeout y mmap_size.
+
+También cuenta los checkouts de cada pool para publicar su saturación en
+/admin/metrics. Con DB_ENGINE_TUNING=0 se usan los valores por defecto de
+SQLAlchemy.
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from . import metrics
+from .extensions import db
+
+
+def _es_memoria(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def opciones(url, config):
+    """Opciones de create_engine para `url` según la configuración."""
+    url = make_url(url)
+    if not config.get("DB_ENGINE_TUNING", True) or _es_memoria(url):
+        return {}
+    pool = {
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+    }
+    backend = url.get_backend_name()
+    if backend == "mysql":
+        return dict(pool,
+                    pool_recycle=config.get("DB_POOL_RECYCLE", 280),
+                    pool_pre_ping=config.get("DB_POOL_PRE_PING", True))
+    if backend == "sqlite":
+        # busy_timeout también como timeout del driver (segundos)
+        espera = config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000
+        return dict(pool, connect_args={"timeout": espera})
+    return pool
+
+
+def pragmas(config):
+    """Pragmas de SQLite a aplicar en cada conexión nueva."""
+    return (
+        ("journal_mode", config.get("SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("busy_timeout", config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        ("mmap_size", config.get("SQLITE_MMAP_SIZE", 268435456)),
+    )
+
+
+def _aplicar_pragmas(lista):
+    def conectar(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in lista:
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        cursor.close()
+    return conectar
+
+
+# ============= SATURACIÓN DEL POOL =============
+
+class _EstadoPool:
+    __slots__ = ("checkouts", "saturados", "maximo")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.saturados = 0  # checkouts que dejaron el pool sin conexiones libres
+        self.maximo = 0     # máximo de conexiones en uso a la vez
+
+
+_lock = threading.Lock()
+
+
+def _vigilar(app, nombre, engine):
+    estado = _EstadoPool()
+    pool = engine.pool
+    capacidad = (pool.size() + max(pool._max_overflow, 0)
+                 if hasattr(pool, "_max_overflow") else None)
+
+    def checkout(*_):
+        en_uso = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        with _lock:
+            estado.checkouts += 1
+            estado.maximo = max(estado.maximo, en_uso)
+            if capacidad is not None and en_uso >= capacidad:
+                estado.saturados += 1
+
+    event.listen(engine, "checkout", checkout)
+    app.extensions.setdefault("engine.pools", []).append((nombre, engine, estado))
+
+
+def estado_pools(app):
+    """[(nombre, tamaño, desborde máximo, en uso, máximo en uso, checkouts, saturados)]"""
+    filas = []
+    with _lock:
+        for nombre, engine, estado in app.extensions.get("engine.pools", ()):
+            pool = engine.pool
+            filas.append((
+                nombre,
+                pool.size() if hasattr(pool, "size") else 0,
+                max(getattr(pool, "_max_overflow", 0), 0),
+                pool.checkedout() if hasattr(pool, "checkedout") else 0,
+                estado.maximo, estado.checkouts, estado.saturados,
+            ))
+    return filas
+
+
+def prometheus(app):
+    """Líneas de métricas del pool para /admin/metrics."""
+    series = (
+        ("db_pool_size", "gauge", "Conexiones permanentes del pool.", 1),
+        ("db_pool_max_overflow", "gauge", "Conexiones extra permitidas sobre el tamaño del pool.", 2),
+        ("db_pool_checked_out", "gauge", "Conexiones en uso ahora.", 3),
+        ("db_pool_checked_out_max", "gauge", "Máximo de conexiones en uso a la vez.", 4),
+        ("db_pool_checkouts_total", "counter", "Conexiones entregadas por el pool.", 5),
+        ("db_pool_saturated_total", "counter",
+         "Checkouts que dejaron el pool sin conexiones libres.", 6),
+    )
+    filas = estado_pools(app)
+    lineas = []
+    for metrica, tipo, ayuda, columna in series:
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {tipo}"]
+        lineas += [f'{metrica}{{bind="{fila[0]}"}} {fila[columna]}' for fila in filas]
+    return lineas
+
+
+def init_app(app):
+    """Aplicar pragmas y vigilar los pools (después de db.init_app)."""
+    with app.app_context():
+        for nombre, engine in db.engines.items():
+            if engine.dialect.name == "sqlite" and app.config.get("DB_ENGINE_TUNING", True) \
+                    and not _es_memoria(engine.url):
+                event.listen(engine, "connect", _aplicar_pragmas(pragmas(app.config)))
+            _vigilar(app, nombre or "default", engine)
+    metrics.agregar_colector(app, lambda: prometheus(app))
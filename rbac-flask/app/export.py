@@ -0,0 +1,211 @@
+"""
+Exportación en streaming de resultados y respuestas de un examen.
+
+Las filas se leen con `yield_per` (cursor del lado del servidor en MySQL) y se
+escriben a la respuesta a medida que llegan, así que la memoria usada no crece
+con el tamaño de la cohorte. El XLSX se genera sin dependencias externas: cada
+hoja se escribe como XML dentro de un zip que se va vaciando por partes.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+from . import grading
+from .extensions import db
+from .models import User, Examen, Pregunta, Respuesta, ExamenResultado
+
+LOTE = 1000
+
+COLUMNAS_RESULTADOS = ("resultado_id", "estudiante", "email", "calificacion", "total_puntos",
+                       "completado", "fecha_inicio", "fecha_presentacion", "tiempo_utilizado")
+COLUMNAS_RESPUESTAS = ("estudiante", "email", "pregunta_id", "orden", "pregunta", "respuesta",
+                       "es_correcta", "puntos_obtenidos", "fecha_respuesta")
+
+
+def _stream(sentencia):
+    return db.session.execute(sentencia.execution_options(yield_per=LOTE))
+
+
+def filas_resultados(examen_id):
+    return _stream(select(
+        ExamenResultado.id, User.username, User.email, ExamenResultado.calificacion,
+        ExamenResultado.total_puntos, ExamenResultado.completado,
+        ExamenResultado.fecha_inicio, ExamenResultado.fecha_presentacion,
+        ExamenResultado.tiempo_utilizado
+    ).join(
+        User, User.id == ExamenResultado.estudiante_id
+    ).where(
+        ExamenResultado.examen_id == examen_id
+    ).order_by(ExamenResultado.id))
+
+
+def filas_respuestas(examen_id):
+    # Las opciones elegidas se guardan por índice; el texto sale de la clave de
+    # la versión que presentó cada estudiante (en caché por versión)
+    actual = db.session.get(Examen, examen_id).version
+    for (username, email, pregunta_id, orden, pregunta, texto, indice, es_correcta, puntos,
+         fecha, version) in _filas_respuestas(examen_id):
+        item = grading.answer_key_for(examen_id, version or actual).por_pregunta.get(pregunta_id)
+        if item is not None:
+            pregunta = item.texto
+            if indice is not None:
+                texto = grading.texto_de(item, indice)
+        yield username, email, pregunta_id, orden, pregunta, texto, es_correcta, puntos, fecha
+
+
+def _filas_respuestas(examen_id):
+    # Versión del último intento del estudiante (None en resultados anteriores a examen_version)
+    version = select(ExamenResultado.examen_version).where(
+        ExamenResultado.examen_id == Respuesta.examen_id,
+        ExamenResultado.estudiante_id == Respuesta.estudiante_id,
+    ).order_by(ExamenResultado.id.desc()).limit(1).scalar_subquery()
+    return _stream(select(
+        User.username, User.email, Respuesta.pregunta_id, Pregunta.orden, Pregunta.texto,
+        Respuesta.respuesta_texto, Respuesta.opcion_indice, Respuesta.es_correcta,
+        Respuesta.puntos_obtenidos, Respuesta.fecha_respuesta, version
+    ).join(
+        User, User.id == Respuesta.estudiante_id
+    ).join(
+        Pregunta, Pregunta.id == Respuesta.pregunta_id
+    ).where(
+        Respuesta.examen_id == examen_id
+    ).order_by(Respuesta.estudiante_id, Pregunta.orden, Pregunta.id))
+
+
+def _formato(valor):
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    return valor
+
+
+# ============= CSV =============
+
+def generar_csv(columnas, filas):
+    """Generador de fragmentos CSV (UTF-8 con BOM para Excel)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(columnas)
+    for n, fila in enumerate(filas, 1):
+        writer.writerow([_formato(v) for v in fila])
+        if n % LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# ============= XLSX =============
+
+_CARACTERES_INVALIDOS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{hojas}</Types>'
+)
+_HOJA_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{hojas}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{hojas}</Relationships>'
+)
+_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_HOJA_FIN = '</sheetData></worksheet>'
+
+
+class _SalidaPorPartes(io.RawIOBase):
+    """Archivo de solo escritura, no posicionable, que acumula lo escrito
+    hasta que el generador lo vacía."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _celda(valor):
+    valor = _formato(valor)
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c t="n"><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS.sub("", str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(valores):
+    return "<row>" + "".join(_celda(v) for v in valores) + "</row>"
+
+
+def generar_xlsx(hojas):
+    """Generador de fragmentos de un libro XLSX.
+
+    `hojas` es una lista de (nombre, columnas, fabrica_de_filas); cada fábrica
+    se invoca solo cuando le toca escribir su hoja.
+    """
+    salida = _SalidaPorPartes()
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(hojas="".join(
+            _HOJA_CONTENT_TYPE.format(n=n) for n in range(1, len(hojas) + 1))))
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(hojas="".join(
+            f'<sheet name="{escape(nombre)}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, (nombre, _, _) in enumerate(hojas, 1))))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(hojas="".join(
+            f'<Relationship Id="rId{n}" '
+            f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{n}.xml"/>'
+            for n in range(1, len(hojas) + 1))))
+        yield salida.vaciar()
+
+        for n, (_, columnas, fabrica) in enumerate(hojas, 1):
+            with zf.open(f"xl/worksheets/sheet{n}.xml", mode="w") as hoja:
+                hoja.write((_HOJA_INICIO + _fila_xml(columnas)).encode("utf-8"))
+                for i, fila in enumerate(fabrica(), 1):
+                    hoja.write(_fila_xml(fila).encode("utf-8"))
+                    if i % LOTE == 0:
+                        yield salida.vaciar()
+                hoja.write(_HOJA_FIN.encode("utf-8"))
+            yield salida.vaciar()
+    yield salida.vaciar()
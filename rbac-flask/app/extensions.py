@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
+from .replicas import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.login_message_category = "warning"
@@ -0,0 +1,105 @@
+"""
+Formularios de examen: versión base compilada y orden barajado por estudiante.
+
+La versión base (preguntas en su orden, opciones ya decodificadas) sale del
+contenido congelado de esa versión del examen (versiones.py) y se guarda en
+caché por (examen_id, version), como la clave de respuestas. Con
+Examen.barajar_preguntas, cada estudiante ve las preguntas y las opciones de
+opción múltiple en un orden propio que sale de una semilla por (examen,
+estudiante): no se guarda nada por pregunta y el mismo orden se reconstruye
+al retomar el intento y en la revisión.
+
+Cada pregunta y cada opción recibe una clave pseudoaleatoria derivada de la
+semilla y de su id (o índice) y se ordenan por ella. Agregar o quitar una
+pregunta no cambia el orden relativo de las demás.
+
+Las opciones conservan su índice original como valor del formulario, así que
+el envío, el autosave y la calificación siguen trabajando con el índice
+canónico y no necesitan conocer la permutación. Verdadero/falso no se baraja.
+"""
+import hashlib
+from collections import namedtuple
+
+from . import versiones
+from .cache import LRUCache
+
+OpcionFormulario = namedtuple("OpcionFormulario", "indice texto")
+PreguntaFormulario = namedtuple("PreguntaFormulario", "id texto tipo puntos imagen_url opciones")
+Formulario = namedtuple("Formulario", "examen_id version barajado preguntas")
+
+_bases = LRUCache(maxsize=256)
+
+
+def compilar(examen_id, version=None):
+    """Formulario base (sin barajar) de una versión del examen."""
+    return Formulario(examen_id, version, False, tuple(
+        PreguntaFormulario(
+            id=p["id"],
+            texto=p["texto"],
+            tipo=p["tipo"],
+            puntos=p["puntos"],
+            imagen_url=p["imagen_url"],
+            opciones=tuple(OpcionFormulario(i, texto) for i, texto in enumerate(p["opciones"])),
+        )
+        for p in versiones.contenido(examen_id, version)["preguntas"]
+    ))
+
+
+def base(examen, version=None):
+    """Formulario base del examen, compilándolo solo si no está en caché.
+
+    `version` es la del intento; por defecto la actual del examen.
+    """
+    version = version or examen.version
+    return _bases.get_or_set(
+        (examen.id, version),
+        lambda: compilar(examen.id, version)
+    )
+
+
+# ============= PERMUTACIÓN =============
+
+def semilla(examen_id, estudiante_id):
+    """Semilla del orden de un estudiante en un examen (estable entre procesos)."""
+    return hashlib.blake2b(f"{examen_id}:{estudiante_id}".encode(), digest_size=16).digest()
+
+
+def _clave(semilla, valor):
+    return hashlib.blake2b(valor.to_bytes(8, "big"), key=semilla, digest_size=8).digest()
+
+
+def orden_preguntas(semilla, ids):
+    """ids de pregunta en el orden del estudiante."""
+    return sorted(ids, key=lambda pid: _clave(semilla, pid))
+
+
+def orden_opciones(semilla, pregunta_id, n):
+    """Índices 0..n-1 de las opciones de una pregunta en el orden del estudiante."""
+    # El índice de la opción va en los 8 bits bajos, junto al id de la pregunta
+    return sorted(range(n), key=lambda i: _clave(semilla, pregunta_id << 8 | i))
+
+
+def barajar(formulario, semilla):
+    """El formulario con preguntas y opciones de opción múltiple permutadas."""
+    preguntas = {p.id: p for p in formulario.preguntas}
+    barajadas = []
+    for pid in orden_preguntas(semilla, preguntas):
+        pregunta = preguntas[pid]
+        if pregunta.tipo == "opcion_multiple" and len(pregunta.opciones) > 1:
+            pregunta = pregunta._replace(opciones=tuple(
+                pregunta.opciones[i] for i in orden_opciones(semilla, pid, len(pregunta.opciones))
+            ))
+        barajadas.append(pregunta)
+    return formulario._replace(barajado=True, preguntas=tuple(barajadas))
+
+
+def formulario(examen, estudiante_id, version=None):
+    """Formulario que ve el estudiante: el base, barajado si el examen lo pide."""
+    compilado = base(examen, version)
+    if not examen.barajar_preguntas:
+        return compilado
+    return barajar(compilado, semilla(examen.id, estudiante_id))
+
+
+def init_app(app):
+    _bases.maxsize = app.config.get("ANSWER_KEY_CACHE_SIZE", 256)
@@ -0,0 +1,266 @@
+"""
+Motor de calificación de exámenes.
+
+La clave de respuestas de un examen (pregunta -> respuesta correcta, puntos) se
+carga con una sola lectura (la versión congelada al publicar, o las preguntas
+si es un borrador), se precompila una vez y se guarda en una caché LRU por
+(examen_id, version). Editar el examen o sus preguntas incrementa
+Examen.version, así que ningún proceso vuelve a usar una clave desactualizada.
+El envío guarda el ExamenResultado, todas las Respuesta (con un único
+executemany), las estadísticas del profesor y el rollup del reporte en una
+sola transacción.
+
+Las preguntas de opción múltiple y verdadero/falso se responden, guardan
+(Respuesta.opcion_indice) y califican por el índice de la opción elegida;
+solo las abiertas guardan texto. `normalizar` acepta también el texto de la
+opción, para clientes y diarios de envíos anteriores al cambio.
+
+Además de la nota 0-5 ponderada por puntos, cada envío recibe un puntaje
+escalado estilo ICFES (modelo de Rasch, ver rasch.py): la clave guarda la
+tabla aciertos -> puntaje calculada con las dificultades de sus preguntas.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import rasch, reportes, stats
+from .cache import LRUCache
+from .extensions import db
+from .models import Examen, Respuesta, ExamenResultado
+
+ItemClave = namedtuple(
+    "ItemClave", "pregunta_id tipo correcta puntos texto explicacion opciones campo dificultad")
+
+TIPOS_CON_OPCIONES = ("opcion_multiple", "verdadero_falso")
+# Orden fijo de las opciones de verdadero/falso (el mismo que pinta presentar_examen.html)
+OPCIONES_VF = ("Verdadero", "Falso")
+Calificacion = namedtuple(
+    "Calificacion", "calificacion puntaje correctas total puntos_obtenidos total_puntos detalle")
+
+_claves = LRUCache(maxsize=256)
+
+
+class AnswerKey:
+    """Clave de respuestas precompilada de un examen."""
+    __slots__ = ("examen_id", "version", "items", "total_puntos", "por_pregunta", "_escala")
+
+    def __init__(self, examen_id, version, items):
+        self.examen_id = examen_id
+        self.version = version
+        self.items = tuple(items)
+        self.total_puntos = float(sum(item.puntos for item in self.items))
+        self.por_pregunta = {item.pregunta_id: item for item in self.items}
+        self._escala = None
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def escala(self):
+        """Puntaje escalado por número de aciertos en las preguntas calificables."""
+        if self._escala is None:
+            self._escala = rasch.tabla_puntajes(
+                [item.dificultad for item in self.items if item.correcta is not None])
+        return self._escala
+
+
+def opciones_de(tipo, opciones):
+    """Textos de las opciones de una pregunta, en el orden de sus índices."""
+    if tipo == "verdadero_falso":
+        return OPCIONES_VF
+    if tipo == "opcion_multiple":
+        try:
+            opciones = json.loads(opciones) if opciones else []
+        except (ValueError, TypeError):
+            return ()
+        # Formato antiguo: lista de textos con la correcta en respuesta_correcta
+        return tuple(opt.get("texto") if isinstance(opt, dict) else opt for opt in opciones)
+    return ()
+
+
+def respuesta_correcta(tipo, opciones, respuesta_correcta):
+    """Índice de la opción correcta (None si no hay o la pregunta es abierta)."""
+    if tipo == "opcion_multiple":
+        try:
+            opciones = json.loads(opciones) if opciones else []
+        except (ValueError, TypeError):
+            return None
+        return next((i for i, opt in enumerate(opciones)
+                     if (opt.get("correcta") if isinstance(opt, dict) else opt == respuesta_correcta)),
+                    None)
+    if tipo == "verdadero_falso":
+        return OPCIONES_VF.index(respuesta_correcta) if respuesta_correcta in OPCIONES_VF else None
+    # Las preguntas abiertas no se califican automáticamente
+    return None
+
+
+def normalizar(item, respuesta):
+    """Respuesta tal como se guarda y se califica.
+
+    Índice de la opción (int) o None en preguntas con opciones; texto en las
+    abiertas. En las de opciones acepta también el texto de la opción.
+    """
+    if item.tipo not in TIPOS_CON_OPCIONES:
+        return respuesta if isinstance(respuesta, str) else ""
+    if isinstance(respuesta, bool):
+        return None
+    if isinstance(respuesta, int):
+        return respuesta if 0 <= respuesta < len(item.opciones) else None
+    if isinstance(respuesta, str) and respuesta in item.opciones:
+        return item.opciones.index(respuesta)
+    return None
+
+
+def columnas(respuesta):
+    """Columnas de Respuesta para una respuesta normalizada."""
+    if isinstance(respuesta, int):
+        return {"opcion_indice": respuesta, "respuesta_texto": None}
+    return {"opcion_indice": None, "respuesta_texto": respuesta}
+
+
+def texto_de(item, respuesta):
+    """Texto legible de una respuesta normalizada ("" si no hay)."""
+    if isinstance(respuesta, int):
+        return item.opciones[respuesta] if respuesta < len(item.opciones) else ""
+    return respuesta or ""
+
+
+def compile_answer_key(examen_id, version=None):
+    """Compilar la clave de respuestas de una versión del examen.
+
+    Sale de la versión congelada al publicar (versiones.py) si existe; si no,
+    de las preguntas, con una sola consulta.
+    """
+    from . import versiones  # versiones usa los helpers de este módulo
+    return AnswerKey(examen_id, version, (
+        ItemClave(
+            pregunta_id=p["id"],
+            tipo=p["tipo"],
+            correcta=p["correcta"],
+            puntos=p["puntos"] if p["puntos"] is not None else 1,
+            texto=p["texto"],
+            explicacion=p["explicacion"],
+            opciones=tuple(p["opciones"]),
+            campo=f"pregunta_{p['id']}",
+            dificultad=(p["rasch_dificultad"] if p["rasch_dificultad"] is not None
+                        else rasch.dificultad_previa(p["nivel_dificultad"])),
+        )
+        for p in versiones.contenido(examen_id, version)["preguntas"]
+    ))
+
+
+def get_answer_key(examen):
+    """Clave de respuestas del examen, compilándola solo si no está en caché."""
+    return answer_key_for(examen.id, examen.version)
+
+
+def answer_key_for(examen_id, version):
+    """Como get_answer_key, a partir del id y la versión del examen."""
+    return _claves.get_or_set(
+        (examen_id, version),
+        lambda: compile_answer_key(examen_id, version)
+    )
+
+
+def invalidate_answer_key(examen):
+    """Invalidar la clave precompilada de un examen.
+
+    Incrementa Examen.version en la base (sin commit) y descarta las versiones
+    en caché de este proceso. El UPDATE es atómico y bloquea la fila hasta el
+    commit: dos ediciones simultáneas reciben versiones distintas.
+    """
+    db.session.execute(update(Examen).where(Examen.id == examen.id).values(
+        version=func.coalesce(Examen.version, 1) + 1
+    ).execution_options(synchronize_session=False))
+    # Leer la versión propia después del UPDATE (MySQL no tiene UPDATE ... RETURNING)
+    set_committed_value(examen, "version", db.session.execute(
+        select(Examen.version).where(Examen.id == examen.id)).scalar_one())
+    discard_answer_key(examen.id)
+
+
+def discard_answer_key(examen_id):
+    _claves.discard_where(lambda clave: clave[0] == examen_id)
+
+
+def init_app(app):
+    _claves.maxsize = app.config.get("ANSWER_KEY_CACHE_SIZE", 256)
+
+
+def grade(clave, respuestas_data):
+    """Calificar un envío contra la clave.
+
+    La nota va de 0.0 a 5.0 ponderada por puntos; el puntaje escalado sale de
+    la tabla de la clave según el número de aciertos (None si ninguna pregunta
+    se califica automáticamente).
+    """
+    correctas = 0
+    puntos_obtenidos = 0.0
+    detalle = []
+    for item in clave.items:
+        respuesta = respuestas_data.get(item.campo)
+        # Camino rápido: índice válido de una pregunta con opciones (el cliente actual)
+        if not (type(respuesta) is int and 0 <= respuesta < len(item.opciones)):
+            respuesta = normalizar(item, respuesta)
+        es_correcta = respuesta == item.correcta and item.correcta is not None
+        if es_correcta:
+            correctas += 1
+            puntos_obtenidos += item.puntos
+        detalle.append((item, respuesta, es_correcta))
+
+    calificacion = round((puntos_obtenidos / clave.total_puntos) * 5.0, 2) if (
+        clave.total_puntos > 0) else 0.0
+
+    escala = clave.escala
+    return Calificacion(
+        calificacion=calificacion,
+        puntaje=escala[correctas] if escala else None,
+        correctas=correctas,
+        total=len(clave),
+        puntos_obtenidos=puntos_obtenidos,
+        total_puntos=clave.total_puntos,
+        detalle=detalle,
+    )
+
+
+def submit(examen, estudiante_id, respuestas_data):
+    """Calificar y guardar un envío en una sola transacción.
+
+    Devuelve (resultado, calificacion).
+    """
+    examen_id = examen.id
+    calificacion = grade(get_answer_key(examen), respuestas_data)
+    ahora = datetime.now()
+
+    resultado = ExamenResultado(
+        examen_id=examen_id,
+        estudiante_id=estudiante_id,
+        examen_version=examen.version,
+        calificacion=calificacion.calificacion,
+        puntaje_escalado=calificacion.puntaje,
+        total_puntos=calificacion.total_puntos,
+        completado=True,
+        fecha_fin=ahora,
+        fecha_presentacion=ahora,
+        tiempo_utilizado=respuestas_data.get("tiempo_utilizado", 0)
+    )
+    db.session.add(resultado)
+
+    filas = [{
+        "examen_id": examen_id,
+        "estudiante_id": estudiante_id,
+        "pregunta_id": item.pregunta_id,
+        **columnas(respuesta),
+        "es_correcta": es_correcta,
+        "puntos_obtenidos": item.puntos if es_correcta else 0,
+        "fecha_respuesta": ahora,
+    } for item, respuesta, es_correcta in calificacion.detalle]
+    if filas:
+        db.session.execute(insert(Respuesta), filas)
+
+    if stats.registrar_resultado(examen.profesor_id, estudiante_id, calificacion.calificacion):
+        reportes.registrar_resultado(examen, calificacion.calificacion, ahora)
+    db.session.commit()
+    return resultado, calificacion
@@ -0,0 +1,82 @@
+"""
+Identidad del usuario autenticado sin consultar `users` en cada petición.
+
+El user_loader de Flask-Login devuelve una `Identidad`: una foto liviana e
+inmutable del usuario (id, username, email, role, is_active, grupo) guardada
+en una caché LRU del proceso durante USER_CACHE_TTL segundos. Flask-Login ya
+la conserva durante la petición, así que cada petición autenticada cuesta
+como mucho una consulta por clave primaria y, con la caché caliente, ninguna.
+
+Las vistas que cambian el estado de un usuario (activar/desactivar,
+eliminar, cambiar la contraseña) llaman a `invalidar`. Con varios procesos,
+los demás ven el cambio cuando vence el TTL.
+"""
+import time
+from collections import namedtuple
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from .cache import LRUCache
+from .extensions import db, login_manager
+from .models import User
+
+_CAMPOS = ("id", "username", "email", "role", "is_active", "grupo")
+
+_cache = LRUCache(maxsize=4096)
+
+
+class Identidad(namedtuple("Identidad", _CAMPOS), UserMixin):
+    """Foto de solo lectura de un User para current_user."""
+
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        return self.role == "admin"
+
+    @property
+    def is_profesor(self):
+        return self.role == "profesor"
+
+    @property
+    def is_estudiante(self):
+        return self.role == "estudiante"
+
+    def usuario(self):
+        """El User del ORM, para el código que necesita la entidad completa."""
+        return db.session.get(User, self.id)
+
+
+def _leer(user_id):
+    fila = db.session.execute(
+        select(*(getattr(User, campo) for campo in _CAMPOS)).where(User.id == user_id)
+    ).first()
+    return Identidad(*fila) if fila else None
+
+
+@login_manager.user_loader
+def cargar(user_id):
+    """user_loader: la Identidad en caché si no venció, si no desde la base."""
+    user_id = int(user_id)
+    guardada = _cache.get(user_id)
+    ahora = time.monotonic()
+    if guardada is not None and guardada[1] > ahora:
+        return guardada[0]
+    identidad = _leer(user_id)
+    ttl = current_app.config.get("USER_CACHE_TTL", 30)
+    if identidad is not None and ttl > 0:
+        _cache.set(user_id, (identidad, ahora + ttl))
+    else:
+        _cache.pop(user_id)
+    return identidad
+
+
+def invalidar(user_id):
+    """Descartar la foto de un usuario (llamar después del commit que lo cambia)."""
+    _cache.pop(user_id)
+
+
+def init_app(app):
+    _cache.maxsize = app.config.get("USER_CACHE_SIZE", 4096)
@@ -0,0 +1,527 @@
+"""
+Intentos de examen con guardado automático.
+
+Al abrir un examen se crea (o se retoma) su ExamenResultado con fecha_inicio y
+completado=False. El navegador envía a /estudiante/examen/<id>/autosave solo
+las respuestas que cambiaron; aquí se acumulan en memoria, una por (intento,
+pregunta) — la última gana —, y se escriben por lotes cuando hay
+AUTOSAVE_BATCH_SIZE pendientes o la más antigua supera AUTOSAVE_FLUSH_SECONDS
+(un hilo del proceso las escribe a tiempo aunque no lleguen más autosaves).
+Cada respuesta se califica al escribirla contra la clave en caché, así que el
+envío final solo escribe lo que aún no estaba guardado, recalifica en memoria
+y cierra el resultado.
+
+Las respuestas circulan ya normalizadas (grading.normalizar): índice de la
+opción en preguntas con opciones, texto en las abiertas.
+
+El intento queda fijado a la versión del examen con la que empezó
+(ExamenResultado.examen_version): se califica contra esa clave aunque el
+profesor edite el examen mientras tanto (ver versiones.py).
+
+El intento vence a los duracion_minutos de fecha_inicio (más
+INTENTO_GRACIA_SEGUNDOS por la latencia del envío automático): desde ahí no
+se aceptan autosaves y el envío final se califica solo con lo guardado a
+tiempo. La fecha_limite del examen solo impide abrir intentos nuevos.
+"""
+import atexit
+import threading
+import time
+import weakref
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, select, tuple_, update
+
+from . import grading, reportes, stats
+from .cache import LRUCache
+from .extensions import db
+from .models import Examen, ExamenResultado, Respuesta, User
+
+Intento = namedtuple("Intento", "resultado_id examen_id estudiante_id version vence",
+                     defaults=(None,))
+Guardada = namedtuple("Guardada", "id valor es_correcta")
+
+PREFIJO = "pregunta_"
+
+# Intentos abiertos en este proceso: (examen_id, estudiante_id) -> Intento
+_abiertos = LRUCache(maxsize=4096)
+
+
+class _Pendientes:
+    """Respuestas recibidas y aún no escritas, coalescidas por pregunta."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}  # (examen_id, estudiante_id, pregunta_id) -> (valor, fecha, version)
+        self._desde = None
+        self.lote = 200
+        self.segundos = 5.0
+
+    def agregar(self, intento, respuestas):
+        """Encolar {pregunta_id: valor}; True si ya toca escribir el lote."""
+        ahora = datetime.now()
+        with self._lock:
+            for pregunta_id, valor in respuestas.items():
+                self._datos[(intento.examen_id, intento.estudiante_id, pregunta_id)] = (
+                    valor, ahora, intento.version)
+            if self._desde is None and self._datos:
+                self._desde = time.monotonic()
+            return self._vencido()
+
+    def _vencido(self):
+        return bool(self._datos) and (
+            len(self._datos) >= self.lote or time.monotonic() - self._desde >= self.segundos)
+
+    def vencido(self):
+        with self._lock:
+            return self._vencido()
+
+    def espera(self):
+        """Segundos hasta que venza la pendiente más antigua (None si no hay)."""
+        with self._lock:
+            if self._desde is None:
+                return None
+            return max(0.0, self.segundos - (time.monotonic() - self._desde))
+
+    def tomar(self, examen_id=None, estudiante_id=None):
+        """Sacar las pendientes (todas, o solo las de un intento)."""
+        with self._lock:
+            if examen_id is None:
+                tomadas, self._datos = self._datos, {}
+            else:
+                tomadas = {clave: valor for clave, valor in self._datos.items()
+                           if clave[0] == examen_id and clave[1] == estudiante_id}
+                for clave in tomadas:
+                    del self._datos[clave]
+            if not self._datos:
+                self._desde = None
+            return tomadas
+
+    def devolver(self, tomadas):
+        """Reencolar un lote que no se pudo escribir sin pisar respuestas más nuevas."""
+        with self._lock:
+            for clave, valor in tomadas.items():
+                self._datos.setdefault(clave, valor)
+            if self._datos and self._desde is None:
+                self._desde = time.monotonic()
+
+    def de_intento(self, examen_id, estudiante_id):
+        """{pregunta_id: (valor, fecha, version)} pendientes del intento."""
+        with self._lock:
+            return {clave[2]: valor for clave, valor in self._datos.items()
+                    if clave[0] == examen_id and clave[1] == estudiante_id}
+
+    def __len__(self):
+        return len(self._datos)
+
+
+pendientes = _Pendientes()
+
+
+# ============= INTENTOS =============
+
+def resultado_de(examen_id, estudiante_id):
+    """Último ExamenResultado del estudiante en el examen (o None)."""
+    return ExamenResultado.query.filter_by(
+        examen_id=examen_id, estudiante_id=estudiante_id
+    ).order_by(ExamenResultado.id.desc()).first()
+
+
+def iniciar(examen, estudiante_id):
+    """Crear el ExamenResultado del intento con fecha_inicio (y hacer commit).
+
+    Si otra petición ya creó el resultado del estudiante en este examen (dos
+    pestañas abriendo el examen a la vez) devuelve ese en lugar de duplicarlo.
+    """
+    # Serializa las aperturas del mismo estudiante (FOR UPDATE; SQLite ya
+    # serializa las escrituras y omite la cláusula)
+    db.session.execute(select(User.id).where(User.id == estudiante_id).with_for_update())
+    # INSERT ... SELECT: la comprobación y la inserción son una sola sentencia
+    existe = select(ExamenResultado.id).where(
+        ExamenResultado.examen_id == examen.id,
+        ExamenResultado.estudiante_id == estudiante_id,
+    ).exists()
+    db.session.execute(insert(ExamenResultado).from_select(
+        ["examen_id", "estudiante_id", "examen_version", "fecha_inicio", "completado"],
+        select(
+            literal(examen.id), literal(estudiante_id), literal(examen.version),
+            literal(datetime.now()), literal(False),
+        ).where(~existe)
+    ))
+    db.session.commit()
+    resultado = resultado_de(examen.id, estudiante_id)
+    if not resultado.completado:
+        _registrar(resultado, resultado.examen_version or examen.version, examen.duracion_minutos)
+    return resultado
+
+
+def _registrar(resultado, version, duracion_minutos):
+    vence = (resultado.fecha_inicio + timedelta(minutes=duracion_minutos)
+             if resultado.fecha_inicio and duracion_minutos else None)
+    intento = Intento(resultado.id, resultado.examen_id, resultado.estudiante_id, version, vence)
+    _abiertos.set((resultado.examen_id, resultado.estudiante_id), intento)
+    return intento
+
+
+def abierto(examen_id, estudiante_id):
+    """Intento sin terminar del estudiante en el examen, o None.
+
+    Sale de memoria si el intento se abrió en este proceso; si no, de la base.
+    """
+    intento = _abiertos.get((examen_id, estudiante_id))
+    if intento is not None:
+        return intento
+    # Los intentos anteriores a examen_version siguen la versión actual del examen
+    fila = db.session.query(
+        ExamenResultado, func.coalesce(ExamenResultado.examen_version, Examen.version),
+        Examen.duracion_minutos
+    ).join(
+        Examen, Examen.id == ExamenResultado.examen_id
+    ).filter(
+        ExamenResultado.examen_id == examen_id,
+        ExamenResultado.estudiante_id == estudiante_id,
+    ).order_by(ExamenResultado.id.desc()).first()
+    if fila is None or fila[0].completado:
+        return None
+    return _registrar(*fila)
+
+
+def vencido(intento, ahora=None):
+    """True si ya pasó la duración del intento (con el margen de gracia)."""
+    if intento.vence is None:
+        return False
+    gracia = current_app.config.get("INTENTO_GRACIA_SEGUNDOS", 60)
+    return (ahora or datetime.now()) > intento.vence + timedelta(seconds=gracia)
+
+
+def olvidar(examen_id, estudiante_id):
+    """Sacar el intento de la memoria del proceso (ya se envió)."""
+    _abiertos.pop((examen_id, estudiante_id))
+
+
+def tiempo_restante(examen, resultado, ahora=None):
+    """Segundos que le quedan al intento según duracion_minutos."""
+    ahora = ahora or datetime.now()
+    transcurrido = (ahora - resultado.fecha_inicio).total_seconds() if resultado.fecha_inicio else 0
+    return max(0, int((examen.duracion_minutos or 0) * 60 - transcurrido))
+
+
+def _filas_guardadas(examen_id, estudiante_id):
+    """{pregunta_id: Guardada} con la última respuesta escrita de cada pregunta."""
+    filas = db.session.query(
+        Respuesta.id, Respuesta.pregunta_id, Respuesta.opcion_indice, Respuesta.respuesta_texto,
+        Respuesta.es_correcta
+    ).filter(
+        Respuesta.examen_id == examen_id,
+        Respuesta.estudiante_id == estudiante_id,
+    ).order_by(Respuesta.id)
+    return {pregunta_id: Guardada(rid, texto if indice is None else indice, es_correcta)
+            for rid, pregunta_id, indice, texto, es_correcta in filas}
+
+
+def respuestas_guardadas(examen_id, estudiante_id):
+    """{pregunta_id: valor} para reanudar el intento (escritas + pendientes)."""
+    guardadas = {pid: fila.valor for pid, fila in _filas_guardadas(examen_id, estudiante_id).items()}
+    guardadas.update((pid, valor[0]) for pid, valor in pendientes.de_intento(
+        examen_id, estudiante_id).items())
+    return guardadas
+
+
+def delta(intento, datos):
+    """{pregunta_id: valor normalizado} de un cuerpo {"pregunta_<id>": respuesta}."""
+    clave = grading.answer_key_for(intento.examen_id, intento.version)
+    respuestas = {}
+    for nombre, respuesta in datos.items():
+        if not nombre.startswith(PREFIJO):
+            continue
+        try:
+            pregunta_id = int(nombre[len(PREFIJO):])
+        except ValueError:
+            continue
+        item = clave.por_pregunta.get(pregunta_id)
+        if item is not None and isinstance(respuesta, (str, int)):
+            respuestas[pregunta_id] = grading.normalizar(item, respuesta)
+    return respuestas
+
+
+def guardar(intento, datos):
+    """Encolar las respuestas cambiadas del intento; escribe el lote si toca.
+
+    Devuelve cuántas respuestas se aceptaron.
+    """
+    respuestas = delta(intento, datos)
+    if respuestas:
+        if pendientes.agregar(intento, respuestas):
+            vaciar()
+        else:
+            _vaciador(current_app).despertar()
+    return len(respuestas)
+
+
+# ============= ESCRITURA POR LOTES =============
+
+def escribir(tomadas):
+    """Escribir un lote de respuestas: UPDATE por id o INSERT, ya calificadas (sin commit).
+
+    `tomadas` es {(examen_id, estudiante_id, pregunta_id): (valor, fecha, version)};
+    lo usan el autosave y el vaciado del diario de envíos.
+    """
+    intentos = {(examen_id, estudiante_id) for examen_id, estudiante_id, _ in tomadas}
+    # Un proceso que escribe tarde no debe pisar un intento ya enviado
+    cerrados = set(db.session.query(
+        ExamenResultado.examen_id, ExamenResultado.estudiante_id
+    ).filter(
+        tuple_(ExamenResultado.examen_id, ExamenResultado.estudiante_id).in_(intentos),
+        ExamenResultado.completado == True,
+    ))
+    existentes = {
+        (examen_id, estudiante_id, pregunta_id): rid
+        for rid, examen_id, estudiante_id, pregunta_id in db.session.query(
+            Respuesta.id, Respuesta.examen_id, Respuesta.estudiante_id, Respuesta.pregunta_id
+        ).filter(
+            tuple_(Respuesta.examen_id, Respuesta.estudiante_id).in_(intentos - cerrados)
+        ).order_by(Respuesta.id)
+    } if intentos - cerrados else {}
+
+    actualizar, insertar = [], []
+    for (examen_id, estudiante_id, pregunta_id), (valor, fecha, version) in tomadas.items():
+        if (examen_id, estudiante_id) in cerrados:
+            continue
+        item = grading.answer_key_for(examen_id, version).por_pregunta.get(pregunta_id)
+        if item is None:
+            continue
+        # Los envíos anotados en el diario antes de usar índices traen el texto
+        valor = grading.normalizar(item, valor)
+        es_correcta = item.correcta is not None and valor == item.correcta
+        fila = {
+            **grading.columnas(valor),
+            "es_correcta": es_correcta,
+            "puntos_obtenidos": item.puntos if es_correcta else 0,
+            "fecha_respuesta": fecha,
+        }
+        rid = existentes.get((examen_id, estudiante_id, pregunta_id))
+        if rid is not None:
+            actualizar.append(dict(fila, id=rid))
+        elif valor not in (None, ""):
+            # Una respuesta en blanco sin fila previa no se guarda (queda sin responder)
+            insertar.append(dict(fila, examen_id=examen_id, estudiante_id=estudiante_id,
+                                 pregunta_id=pregunta_id))
+    if actualizar:
+        db.session.execute(update(Respuesta), actualizar)
+    if insertar:
+        db.session.execute(insert(Respuesta), insertar)
+    return len(actualizar) + len(insertar)
+
+
+def recalificar(versiones):
+    """Recalificar las respuestas guardadas de los intentos {(examen_id, estudiante_id): version}
+    contra la clave de su versión (sin commit).
+
+    Corrige filas escritas con otra versión de la clave (por ejemplo por un
+    autosave anterior a una edición). Las preguntas abiertas no se tocan.
+    Devuelve cuántas filas cambiaron.
+    """
+    if not versiones:
+        return 0
+    corregir = []
+    for rid, examen_id, estudiante_id, pregunta_id, indice, texto, guardada in db.session.query(
+        Respuesta.id, Respuesta.examen_id, Respuesta.estudiante_id, Respuesta.pregunta_id,
+        Respuesta.opcion_indice, Respuesta.respuesta_texto, Respuesta.es_correcta
+    ).filter(
+        tuple_(Respuesta.examen_id, Respuesta.estudiante_id).in_(versiones)
+    ):
+        version = versiones[(examen_id, estudiante_id)]
+        item = grading.answer_key_for(examen_id, version).por_pregunta.get(pregunta_id)
+        if item is None or item.correcta is None:
+            continue
+        es_correcta = (texto if indice is None else indice) == item.correcta
+        if bool(guardada) != es_correcta:
+            corregir.append({"id": rid, "es_correcta": es_correcta,
+                             "puntos_obtenidos": item.puntos if es_correcta else 0})
+    if corregir:
+        db.session.execute(update(Respuesta), corregir)
+    return len(corregir)
+
+
+def vaciar(examen_id=None, estudiante_id=None, commit=True):
+    """Escribir las respuestas pendientes (todas, o las de un intento)."""
+    tomadas = pendientes.tomar(examen_id, estudiante_id)
+    if not tomadas:
+        return 0
+    try:
+        escritas = escribir(tomadas)
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        pendientes.devolver(tomadas)
+        raise
+    return escritas
+
+
+# ============= ENVÍO FINAL =============
+
+def _finales(intento, guardadas, en_cola, respuestas_data):
+    valores = {pid: fila.valor for pid, fila in guardadas.items()}
+    valores.update((pid, valor[0]) for pid, valor in en_cola.items())
+    # Vencido el intento, el formulario final no cambia nada: cuenta lo guardado a tiempo
+    formulario = {} if vencido(intento) else respuestas_data
+    cambios = {pid: valor for pid, valor in delta(intento, formulario).items()
+               if (valores[pid] != valor if pid in valores else valor not in (None, ""))}
+    valores.update(cambios)
+    return valores, cambios
+
+
+def respuestas_finales(intento, respuestas_data, en_cola):
+    """(valores, cambios) con los que se cierra el intento.
+
+    `valores` es el estado completo que se califica: lo escrito, lo pendiente
+    `en_cola` ({pregunta_id: (valor, fecha, version)}) y el formulario final.
+    `cambios` son las respuestas del formulario que difieren de lo anterior
+    (ninguna si el intento ya venció).
+    """
+    return _finales(intento, _filas_guardadas(intento.examen_id, intento.estudiante_id),
+                    en_cola, respuestas_data)
+
+
+def finalizar(examen, estudiante_id, respuestas_data):
+    """Cerrar el intento: escribir lo que falte, calificar y completar el resultado.
+
+    `respuestas_data` es el estado final del formulario; solo se escriben las
+    respuestas que difieren de lo ya guardado. Si el estudiante no tenía un
+    intento abierto (cliente sin autosave) se califica el envío completo como
+    antes. Devuelve (resultado_id, calificacion), o None si el intento ya
+    estaba completado.
+    """
+    intento = abierto(examen.id, estudiante_id)
+    if intento is None:
+        if resultado_de(examen.id, estudiante_id) is not None:
+            return None
+        resultado, calificacion = grading.submit(examen, estudiante_id, respuestas_data)
+        return resultado.id, calificacion
+
+    guardadas = _filas_guardadas(examen.id, estudiante_id)
+    en_cola = pendientes.de_intento(examen.id, estudiante_id)
+    valores, cambios = _finales(intento, guardadas, en_cola, respuestas_data)
+    # Lo pendiente calificado con otra versión de la clave se vuelve a encolar con la del intento
+    cambios.update((pid, valor[0]) for pid, valor in en_cola.items()
+                   if valor[2] != intento.version and pid not in cambios)
+    if cambios:
+        pendientes.agregar(intento, cambios)
+
+    try:
+        vaciar(examen.id, estudiante_id, commit=False)
+
+        # Recalificar contra la clave de la versión del intento (filas escritas por un
+        # proceso con otra versión); lo recién escrito ya está calificado
+        clave = grading.answer_key_for(examen.id, intento.version)
+        calificacion = grading.grade(
+            clave, {f"{PREFIJO}{pid}": valor for pid, valor in valores.items()})
+        corregir = [{
+            "id": guardadas[item.pregunta_id].id,
+            "es_correcta": es_correcta,
+            "puntos_obtenidos": item.puntos if es_correcta else 0,
+        } for item, _, es_correcta in calificacion.detalle
+            if item.pregunta_id in guardadas and item.pregunta_id not in en_cola
+            and item.pregunta_id not in cambios
+            and bool(guardadas[item.pregunta_id].es_correcta) != es_correcta]
+        if corregir:
+            db.session.execute(update(Respuesta), corregir)
+
+        ahora = datetime.now()
+        cerrado = db.session.execute(update(ExamenResultado).where(
+            ExamenResultado.id == intento.resultado_id,
+            ExamenResultado.completado == False,
+        ).values(
+            calificacion=calificacion.calificacion,
+            puntaje_escalado=calificacion.puntaje,
+            total_puntos=calificacion.total_puntos,
+            completado=True,
+            fecha_fin=ahora,
+            fecha_presentacion=ahora,
+            tiempo_utilizado=respuestas_data.get("tiempo_utilizado", 0),
+        ).execution_options(synchronize_session=False)).rowcount
+        if not cerrado:
+            db.session.rollback()
+            return None
+
+        if stats.registrar_resultado(examen.profesor_id, estudiante_id, calificacion.calificacion):
+            reportes.registrar_resultado(examen, calificacion.calificacion, ahora)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        olvidar(examen.id, estudiante_id)
+    return intento.resultado_id, calificacion
+
+
+class _Vaciador:
+    """Hilo que escribe las pendientes cuando la más antigua cumple
+    AUTOSAVE_FLUSH_SECONDS, aunque el proceso no reciba más autosaves."""
+
+    def __init__(self, app):
+        self.app = app
+        self._evento = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._detenido = False
+
+    def despertar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="autosave-flush",
+                                              daemon=True)
+                self._hilo.start()
+        self._evento.set()
+
+    def _ciclo(self):
+        while not self._detenido:
+            # Sin pendientes duerme hasta el próximo autosave
+            self._evento.wait(pendientes.espera())
+            self._evento.clear()
+            if self._detenido or not pendientes.vencido():
+                continue
+            try:
+                with self.app.app_context():
+                    vaciar()
+            except Exception:
+                # vaciar ya las devolvió a la cola; se reintenta en el próximo plazo
+                self.app.logger.exception("Error escribiendo respuestas del autosave")
+
+    def detener(self):
+        self._detenido = True
+        self._evento.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+
+
+def _vaciador(app):
+    return app.extensions["intentos.vaciador"]
+
+
+# Una sola función atexit por proceso. Los vaciadores se guardan con referencia
+# débil: crear apps (tests, fábrica) no las mantiene vivas hasta la salida.
+_vaciadores = weakref.WeakSet()
+
+
+def _vaciar_al_salir():
+    vaciadores = list(_vaciadores)
+    for vaciador in vaciadores:
+        vaciador.detener()
+    # Las pendientes son del proceso: se escriben con la app que siga viva
+    if len(pendientes) and vaciadores:
+        with vaciadores[-1].app.app_context():
+            vaciar()
+
+
+atexit.register(_vaciar_al_salir)
+
+
+def init_app(app):
+    pendientes.lote = app.config.get("AUTOSAVE_BATCH_SIZE", 200)
+    pendientes.segundos = app.config.get("AUTOSAVE_FLUSH_SECONDS", 5.0)
+    vaciador = _Vaciador(app)
+    app.extensions["intentos.vaciador"] = vaciador
+    _vaciadores.add(vaciador)
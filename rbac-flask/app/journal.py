@@ -0,0 +1,356 @@
+"""
+Escritura diferida de envíos de examen (SUBMIT_WRITE_BEHIND).
+
+Con el modo activo, /estudiante/examen/<id>/enviar califica contra la clave en
+caché, anota el envío en un diario local y responde de inmediato. El diario
+es una tabla en un archivo SQLite aparte (SUBMIT_JOURNAL_PATH, modo WAL): un
+INSERT por envío, sin competir por el candado de la base principal. Un hilo
+de fondo lo vacía hacia Respuesta / ExamenResultado en transacciones de hasta
+SUBMIT_DRAIN_BATCH envíos y borra lo aplicado.
+
+Aplicar es idempotente: un intento que ya está completado se salta, así que
+si el proceso cae entre el commit y el borrado del diario no se duplica nada.
+Entre procesos, solo vacía quien tiene el turno (fila `turno` del diario).
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import insert, tuple_, update
+
+from . import grading, intentos, reportes, stats
+from .extensions import db
+from .models import Examen, ExamenResultado
+
+Envio = namedtuple(
+    "Envio",
+    "id examen_id estudiante_id resultado_id version respuestas calificacion total_puntos "
+    "tiempo_utilizado fecha puntaje",
+    # Los envíos anotados antes del puntaje escalado no lo traen
+    defaults=(None,))
+
+TURNO_SEGUNDOS = 30
+
+_ESQUEMA = (
+    """CREATE TABLE IF NOT EXISTS envios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        examen_id INTEGER NOT NULL,
+        estudiante_id INTEGER NOT NULL,
+        datos TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_envios_intento ON envios (examen_id, estudiante_id)",
+    "CREATE TABLE IF NOT EXISTS turno (id INTEGER PRIMARY KEY, dueno TEXT, hasta REAL)",
+    "INSERT OR IGNORE INTO turno (id, dueno, hasta) VALUES (1, NULL, 0)",
+)
+
+
+class Diario:
+    """Cola durable de envíos sobre SQLite, una conexión por hilo."""
+
+    def __init__(self, ruta, sincronizacion="FULL"):
+        self.ruta = str(ruta)
+        self.sincronizacion = sincronizacion
+        self.dueno = f"{os.getpid()}-{id(self)}"
+        self._local = threading.local()
+        with self._escritura() as conn:
+            for sentencia in _ESQUEMA:
+                conn.execute(sentencia)
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.sincronizacion}")
+            self._local.conn = conn
+        return conn
+
+    def _escritura(self):
+        return _Transaccion(self._conexion())
+
+    def anotar(self, examen_id, estudiante_id, datos):
+        with self._escritura() as conn:
+            conn.execute("INSERT INTO envios (examen_id, estudiante_id, datos) VALUES (?, ?, ?)",
+                         (examen_id, estudiante_id, json.dumps(datos)))
+
+    def pendiente(self, examen_id, estudiante_id):
+        return self._conexion().execute(
+            "SELECT 1 FROM envios WHERE examen_id = ? AND estudiante_id = ?",
+            (examen_id, estudiante_id)).fetchone() is not None
+
+    def leer(self, limite):
+        filas = self._conexion().execute(
+            "SELECT id, datos FROM envios ORDER BY id LIMIT ?", (limite,)).fetchall()
+        return [Envio(id=envio_id, **json.loads(datos)) for envio_id, datos in filas]
+
+    def borrar(self, ids):
+        with self._escritura() as conn:
+            conn.executemany("DELETE FROM envios WHERE id = ?", [(i,) for i in ids])
+
+    def tomar_turno(self):
+        """True si este proceso puede vaciar el diario durante TURNO_SEGUNDOS."""
+        ahora = time.time()
+        with self._escritura() as conn:
+            return conn.execute(
+                "UPDATE turno SET dueno = ?, hasta = ? WHERE id = 1 AND (hasta < ? OR dueno = ?)",
+                (self.dueno, ahora + TURNO_SEGUNDOS, ahora, self.dueno)).rowcount == 1
+
+    def __len__(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM envios").fetchone()[0]
+
+
+class _Transaccion:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, tipo, *_):
+        self.conn.execute("ROLLBACK" if tipo else "COMMIT")
+
+
+# ============= ENVÍO =============
+
+def activo(app):
+    return bool(app.config.get("SUBMIT_WRITE_BEHIND")) and "journal.diario" in app.extensions
+
+
+def _diario(app):
+    return app.extensions["journal.diario"]
+
+
+def encolar(app, examen, estudiante_id, respuestas_data):
+    """Calificar el envío, anotarlo en el diario y devolver sin tocar la base.
+
+    Devuelve (resultado_id, calificacion); resultado_id es None si el
+    estudiante no tenía un intento abierto (el resultado se crea al vaciar).
+    Devuelve None si el examen ya fue enviado.
+    """
+    diario = _diario(app)
+    intento = intentos.abierto(examen.id, estudiante_id)
+    if intento is None and intentos.resultado_de(examen.id, estudiante_id) is not None:
+        return None
+    if diario.pendiente(examen.id, estudiante_id):
+        return None
+
+    # El intento se califica con la versión con la que empezó (versiones.py)
+    actual = intento or intentos.Intento(None, examen.id, estudiante_id, examen.version)
+    clave = grading.answer_key_for(examen.id, actual.version)
+    if intento is None:
+        en_cola = {}
+        por_escribir = intentos.delta(actual, respuestas_data)
+        calificacion = grading.grade(clave, respuestas_data)
+    else:
+        # Mismo estado final que intentos.finalizar: lo escrito, lo que el
+        # autosave tenía en cola y lo que cambió en el formulario. Lo que
+        # estaba en cola pasa al diario para escribirse al vaciar.
+        en_cola = intentos.pendientes.tomar(examen.id, estudiante_id)
+        valores, cambios = intentos.respuestas_finales(
+            intento, respuestas_data, {clave_cola[2]: valor for clave_cola, valor in en_cola.items()})
+        por_escribir = {clave_cola[2]: valor[0] for clave_cola, valor in en_cola.items()}
+        por_escribir.update(cambios)
+        calificacion = grading.grade(
+            clave, {f"{intentos.PREFIJO}{pid}": valor for pid, valor in valores.items()})
+    try:
+        diario.anotar(examen.id, estudiante_id, {
+            "examen_id": examen.id,
+            "estudiante_id": estudiante_id,
+            "resultado_id": intento.resultado_id if intento else None,
+            "version": actual.version,
+            "respuestas": {str(pid): valor for pid, valor in por_escribir.items()},
+            "calificacion": calificacion.calificacion,
+            "puntaje": calificacion.puntaje,
+            "total_puntos": calificacion.total_puntos,
+            "tiempo_utilizado": respuestas_data.get("tiempo_utilizado", 0),
+            "fecha": datetime.now().isoformat(),
+        })
+    except Exception:
+        intentos.pendientes.devolver(en_cola)
+        raise
+    intentos.olvidar(examen.id, estudiante_id)
+    _trabajador(app).despertar()
+    return (intento.resultado_id if intento else None), calificacion
+
+
+def pendiente(app, examen_id, estudiante_id):
+    """True si hay un envío del estudiante en el diario sin aplicar."""
+    return activo(app) and _diario(app).pendiente(examen_id, estudiante_id)
+
+
+# ============= VACIADO =============
+
+def aplicar(envios):
+    """Aplicar un lote de envíos a la base principal en una transacción (sin commit).
+
+    Devuelve cuántos envíos se aplicaron (los ya completados se saltan).
+    """
+    pares = {(e.examen_id, e.estudiante_id) for e in envios}
+    resultados = {}
+    for rid, examen_id, estudiante_id, completado in db.session.query(
+        ExamenResultado.id, ExamenResultado.examen_id, ExamenResultado.estudiante_id,
+        ExamenResultado.completado
+    ).filter(
+        tuple_(ExamenResultado.examen_id, ExamenResultado.estudiante_id).in_(pares)
+    ).order_by(ExamenResultado.id):
+        resultados[(examen_id, estudiante_id)] = (rid, completado)
+    examenes = {e.id: e for e in Examen.query.filter(Examen.id.in_({e.examen_id for e in envios}))}
+
+    aplicables = []
+    for envio in envios:
+        par = (envio.examen_id, envio.estudiante_id)
+        if resultados.get(par, (None, False))[1] or envio.examen_id not in examenes:
+            continue
+        resultados[par] = (resultados.get(par, (None, False))[0], True)
+        aplicables.append(envio)
+    if not aplicables:
+        return 0
+
+    respuestas = {}
+    for envio in aplicables:
+        fecha = datetime.fromisoformat(envio.fecha)
+        for pregunta_id, valor in envio.respuestas.items():
+            respuestas[(envio.examen_id, envio.estudiante_id, int(pregunta_id))] = (
+                valor, fecha, envio.version)
+    intentos.escribir(respuestas)
+    # Lo que el autosave ya había escrito con otra versión de la clave
+    intentos.recalificar({(e.examen_id, e.estudiante_id): e.version for e in aplicables})
+
+    cerrar, crear = [], []
+    for envio in aplicables:
+        fecha = datetime.fromisoformat(envio.fecha)
+        fila = {
+            "calificacion": envio.calificacion,
+            "puntaje_escalado": envio.puntaje,
+            "total_puntos": envio.total_puntos,
+            "completado": True,
+            "fecha_fin": fecha,
+            "fecha_presentacion": fecha,
+            "tiempo_utilizado": envio.tiempo_utilizado,
+        }
+        rid = resultados[(envio.examen_id, envio.estudiante_id)][0]
+        if rid is not None:
+            cerrar.append(dict(fila, id=rid))
+        else:
+            crear.append(dict(fila, examen_id=envio.examen_id, estudiante_id=envio.estudiante_id,
+                              examen_version=envio.version, fecha_inicio=fecha))
+    if cerrar:
+        db.session.execute(update(ExamenResultado), cerrar)
+    if crear:
+        db.session.execute(insert(ExamenResultado), crear)
+
+    # Si un envío reconstruye las estadísticas de su profesor, la reconstrucción
+    # ya cuenta todo el lote de ese profesor (los resultados están cerrados arriba)
+    reconstruidos = set()
+    for envio in aplicables:
+        examen = examenes[envio.examen_id]
+        if examen.profesor_id in reconstruidos:
+            continue
+        if stats.registrar_resultado(examen.profesor_id, envio.estudiante_id, envio.calificacion):
+            reportes.registrar_resultado(examen, envio.calificacion,
+                                         datetime.fromisoformat(envio.fecha))
+        else:
+            reconstruidos.add(examen.profesor_id)
+    return len(aplicables)
+
+
+def vaciar(app, limite=None):
+    """Aplicar el diario completo por lotes. Devuelve cuántos envíos se aplicaron."""
+    diario = _diario(app)
+    limite = limite or app.config.get("SUBMIT_DRAIN_BATCH", 500)
+    total = 0
+    with app.app_context():
+        while diario.tomar_turno():
+            envios = diario.leer(limite)
+            if not envios:
+                break
+            try:
+                total += aplicar(envios)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("No se pudo aplicar un lote de %d envíos; se reintenta "
+                                     "de a uno", len(envios))
+                total += _aplicar_de_a_uno(app, diario, envios)
+                break
+            diario.borrar([e.id for e in envios])
+    return total
+
+
+def _aplicar_de_a_uno(app, diario, envios):
+    aplicados = 0
+    for envio in envios:
+        try:
+            aplicados += aplicar([envio])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Envío %s del diario no aplicable; queda pendiente", envio.id)
+            continue
+        diario.borrar([envio.id])
+    return aplicados
+
+
+class _Trabajador:
+    """Hilo que vacía el diario cada SUBMIT_DRAIN_INTERVAL o al llenarse un lote."""
+
+    def __init__(self, app):
+        self.app = app
+        self.intervalo = app.config.get("SUBMIT_DRAIN_INTERVAL", 1.0)
+        self._evento = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._detenido = False
+
+    def despertar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="journal-drain", daemon=True)
+                self._hilo.start()
+        self._evento.set()
+
+    def _ciclo(self):
+        while not self._detenido:
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            try:
+                vaciar(self.app)
+            except Exception:
+                self.app.logger.exception("Error vaciando el diario de envíos")
+
+    def detener(self):
+        self._detenido = True
+        self._evento.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+
+
+def _trabajador(app):
+    return app.extensions["journal.trabajador"]
+
+
+def init_app(app):
+    if not app.config.get("SUBMIT_WRITE_BEHIND"):
+        return
+    diario = Diario(app.config["SUBMIT_JOURNAL_PATH"],
+                    app.config.get("SUBMIT_JOURNAL_SYNC", "FULL"))
+    trabajador = _Trabajador(app)
+    app.extensions["journal.diario"] = diario
+    app.extensions["journal.trabajador"] = trabajador
+
+    # Envíos que quedaron sin aplicar de una ejecución anterior
+    if len(diario):
+        trabajador.despertar()
+
+    def _vaciar_al_salir():
+        trabajador.detener()
+        vaciar(app)
+
+    atexit.register(_vaciar_al_salir)
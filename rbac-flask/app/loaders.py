@@ -0,0 +1,58 @@
+"""
+Perfiles de carga para las vistas de listado.
+
+Cada perfil agrupa las opciones (joinedload / selectinload / conteos
+agregados) que necesita la plantilla de una vista, para que pintar la lista
+no dispare una consulta por fila. Uso:
+
+    Examen.query.options(*loaders.perfil("examenes_profesor"))
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, with_expression
+
+from .models import Examen, ExamenResultado, Pregunta, estudiante_examen
+
+
+def con_conteos():
+    """Carga Examen.num_preguntas y Examen.num_estudiantes como subconsultas
+    correlacionadas en la misma consulta."""
+    num_preguntas = select(func.count(Pregunta.id)).where(
+        Pregunta.examen_id == Examen.id
+    ).correlate(Examen).scalar_subquery()
+    num_estudiantes = select(func.count()).select_from(estudiante_examen).where(
+        estudiante_examen.c.examen_id == Examen.id
+    ).correlate(Examen).scalar_subquery()
+    return (
+        with_expression(Examen.num_preguntas, num_preguntas),
+        with_expression(Examen.num_estudiantes, num_estudiantes),
+    )
+
+
+_PERFILES = {
+    # profesor/examenes.html y dashboard_profesor.html: categoría + número de
+    # preguntas y de estudiantes
+    "examenes_profesor": lambda: (joinedload(Examen.categoria), *con_conteos()),
+    # dashboard_profesor.html / resultados_examen.html: nombre del estudiante
+    "resultados_con_estudiante": lambda: (joinedload(ExamenResultado.estudiante),),
+    # dashboard_profesor.html: estudiante y examen de cada presentación
+    "resultados_recientes": lambda: (
+        joinedload(ExamenResultado.estudiante),
+        joinedload(ExamenResultado.examen),
+    ),
+    # estudiante/resultados.html y progreso_detallado.html
+    "resultados_estudiante": lambda: (
+        joinedload(ExamenResultado.examen).joinedload(Examen.categoria),
+    ),
+}
+
+
+def perfil(nombre):
+    """Opciones de carga del perfil `nombre`."""
+    try:
+        return _PERFILES[nombre]()
+    except KeyError:
+        raise ValueError(f"Perfil de carga desconocido: {nombre}") from None
+
+
+def perfiles():
+    return sorted(_PERFILES)
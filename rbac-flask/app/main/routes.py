@@ -1,14 +1,18 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import (Blueprint, render_template, request, jsonify, flash, redirect, url_for, Response,
+                   current_app)
 from flask_login import login_required, current_user
-from sqlalchemy import func, desc, case
-from datetime import datetime, timedelta
-import json
+from sqlalchemy import func, desc
+from sqlalchemy.orm import joinedload
+from datetime import datetime
 import uuid
 
 from ..extensions import db
-from ..models import (User, Examen, Pregunta, ExamenResultado, Categoria, 
-                      Respuesta, Notificacion, Certificado)
+from ..models import (User, Examen, Pregunta, ExamenResultado,
+                      Notificacion, Certificado)
 from ..decorators import role_required
+from .. import acceso, formularios, grading, intentos, journal, loaders, metrics, paginacion, queries, reportes, revision, stats
+from ..budget import query_budget
+from ..replicas import lee_de_replica
 
 main_bp = Blueprint("main", __name__)
 
@@ -19,24 +23,23 @@ def index():
 
 
 @main_bp.route("/dashboard_estudiante")
+@query_budget(3)
 @login_required
 @role_required("estudiante")
 def dashboard_estudiante():
-    # Obtener estadísticas del estudiante
-    total_asignados = len(current_user.examenes_asignados)
+    # Exámenes asignados con su último resultado (una sola consulta)
+    examenes_info = queries.examenes_estudiante(current_user.id)
+    total_asignados = len(examenes_info)
     
-    # Contar exámenes completados
-    completados = ExamenResultado.query.filter_by(estudiante_id=current_user.id).count()
-    
-    # Calcular promedio general
-    resultados = ExamenResultado.query.filter_by(estudiante_id=current_user.id).all()
-    promedio = sum(r.calificacion for r in resultados) / len(resultados) if resultados else 0
+    # Contar exámenes completados y calcular promedio general
+    completados, promedio = queries.resumen_resultados_estudiante(current_user.id)
     
     # Exámenes próximos a vencer
-    hoy = datetime.now()
-    proximos = [e for e in current_user.examenes_asignados 
-                if e.fecha_limite and e.fecha_limite > hoy 
-                and not ExamenResultado.query.filter_by(estudiante_id=current_user.id, examen_id=e.id).first()]
+    proximos = sorted(
+        (info['examen'] for info in examenes_info
+         if info['estado'] in ("disponible", "por_vencer", "en_curso") and info['examen'].fecha_limite),
+        key=lambda e: e.fecha_limite
+    )
     
     return render_template("dashboard_estudiante.html",
                          total_asignados=total_asignados,
@@ -46,6 +49,8 @@ def dashboard_estudiante():
 
 
 @main_bp.route("/dashboard_profesor")
+@query_budget(9)
+@lee_de_replica
 @login_required
 @role_required("profesor")
 def dashboard_profesor():
@@ -58,7 +63,9 @@ def dashboard_profesor():
     total_estudiantes = User.query.filter_by(role="estudiante", is_active=True).count()
     
     # Exámenes recientes (últimos 5)
-    examenes_recientes = Examen.query.filter_by(
+    examenes_recientes = Examen.query.options(
+        *loaders.perfil("examenes_profesor")
+    ).filter_by(
         profesor_id=current_user.id
     ).order_by(desc(Examen.fecha_creacion)).limit(5).all()
     
@@ -71,45 +78,20 @@ def dashboard_profesor():
     ).order_by(Examen.fecha_limite).limit(5).all()
     
     # Resultados recientes (últimas presentaciones)
-    resultados_recientes = ExamenResultado.query.join(
+    resultados_recientes = ExamenResultado.query.options(
+        *loaders.perfil("resultados_recientes")
+    ).join(
         Examen, ExamenResultado.examen_id == Examen.id
     ).filter(
-        Examen.profesor_id == current_user.id
+        Examen.profesor_id == current_user.id,
+        ExamenResultado.completado == True
     ).order_by(desc(ExamenResultado.fecha_presentacion)).limit(10).all()
     
-    # Estadísticas de rendimiento
-    stats_rendimiento = db.session.query(
-        func.avg(ExamenResultado.calificacion).label('promedio'),
-        func.max(ExamenResultado.calificacion).label('maxima'),
-        func.min(ExamenResultado.calificacion).label('minima'),
-        func.count(ExamenResultado.id).label('total')
-    ).join(
-        Examen, ExamenResultado.examen_id == Examen.id
-    ).filter(
-        Examen.profesor_id == current_user.id
-    ).first()
+    # Estadísticas de rendimiento (materializadas, ver app/stats.py)
+    stats_rendimiento = stats.rendimiento(current_user.id)
     
     # Estudiantes con bajo rendimiento (promedio < 3.0 en escala 0-5)
-    avg_calif_normalizada = func.avg(
-        case(
-            (ExamenResultado.calificacion > 5.0, ExamenResultado.calificacion / 20.0),
-            else_=ExamenResultado.calificacion
-        )
-    ).label('promedio')
-
-    estudiantes_bajo_rendimiento = db.session.query(
-        User.id,
-        User.username,
-        avg_calif_normalizada
-    ).join(
-        ExamenResultado, User.id == ExamenResultado.estudiante_id
-    ).join(
-        Examen, ExamenResultado.examen_id == Examen.id
-    ).filter(
-        Examen.profesor_id == current_user.id
-    ).group_by(User.id, User.username).having(
-        avg_calif_normalizada < 3.0
-    ).limit(5).all()
+    estudiantes_bajo_rendimiento = stats.estudiantes_bajo_rendimiento(current_user.id)
     
     return render_template(
         "dashboard_profesor.html",
@@ -126,185 +108,28 @@ def dashboard_profesor():
 
 
 @main_bp.route("/reporte_examenes")
+@query_budget(6)
+@lee_de_replica
 @login_required
 @role_required("profesor")
 def reporte_examenes():
     """FASE 2: Reporte detallado de exámenes calificados y progreso de estudiantes"""
     
-    # Estadísticas generales
-    total_examenes = Examen.query.filter_by(profesor_id=current_user.id).count()
-    total_presentaciones = db.session.query(ExamenResultado).join(
-        Examen
-    ).filter(
-        Examen.profesor_id == current_user.id,
-        ExamenResultado.completado == True
-    ).count()
+    # Servido desde los rollups y estadísticas, en caché hasta la próxima presentación
+    reporte = reportes.reporte_profesor(current_user.id)
     
-    # Análisis por categoría
-    stats_por_categoria = db.session.query(
-        Categoria.nombre,
-        Categoria.icono,
-        func.count(Examen.id).label('total_examenes'),
-        func.count(ExamenResultado.id).label('total_presentaciones'),
-        func.avg(ExamenResultado.calificacion).label('promedio_calificacion')
-    ).select_from(Categoria).outerjoin(
-        Examen, Categoria.id == Examen.categoria_id
-    ).outerjoin(
-        ExamenResultado, Examen.id == ExamenResultado.examen_id
-    ).filter(
-        Examen.profesor_id == current_user.id
-    ).group_by(Categoria.id, Categoria.nombre, Categoria.icono).all()
-    
-    # Progreso de estudiantes (Top 10)
-    progreso_estudiantes = db.session.query(
-        User.id,
-        User.username,
-        User.email,
-        func.count(ExamenResultado.id).label('examenes_presentados'),
-        func.avg(ExamenResultado.calificacion).label('promedio'),
-        func.max(ExamenResultado.calificacion).label('mejor_nota'),
-        func.min(ExamenResultado.calificacion).label('peor_nota'),
-        func.sum(ExamenResultado.total_puntos).label('total_puntos_posibles'),
-        func.sum(ExamenResultado.calificacion).label('total_puntos_obtenidos')
-    ).join(
-        ExamenResultado, User.id == ExamenResultado.estudiante_id
-    ).join(
-        Examen, ExamenResultado.examen_id == Examen.id
-    ).filter(
-        Examen.profesor_id == current_user.id,
-        ExamenResultado.completado == True
-    ).group_by(User.id, User.username, User.email).order_by(
-        desc(func.avg(ExamenResultado.calificacion))
-    ).limit(20).all()
-    
-    # Exámenes con más presentaciones
-    examenes_populares = db.session.query(
-        Examen.id,
-        Examen.titulo,
-        Categoria.nombre.label('categoria_nombre'),
-        Categoria.icono.label('categoria_icono'),
-        func.count(ExamenResultado.id).label('num_presentaciones'),
-        func.avg(ExamenResultado.calificacion).label('promedio')
-    ).outerjoin(
-        ExamenResultado, Examen.id == ExamenResultado.examen_id
-    ).outerjoin(
-        Categoria, Examen.categoria_id == Categoria.id
-    ).filter(
-        Examen.profesor_id == current_user.id
-    ).group_by(
-        Examen.id, Examen.titulo, Categoria.nombre, Categoria.icono
-    ).order_by(
-        desc(func.count(ExamenResultado.id))
-    ).limit(10).all()
-    
-    # Distribución de calificaciones (rangos)
-    rango_calificaciones = db.session.query(
-        func.count(ExamenResultado.id).label('count'),
-        ExamenResultado.calificacion
-    ).join(
-        Examen, ExamenResultado.examen_id == Examen.id
-    ).filter(
-        Examen.profesor_id == current_user.id,
-        ExamenResultado.completado == True
-    ).all()
-    
-    # Calcular distribución por rangos
-    rangos = {
-        'excelente': 0,  # 4.5-5.0
-        'bueno': 0,      # 3.5-4.49
-        'aceptable': 0,  # 3.0-3.49
-        'insuficiente': 0 # 0-2.99
-    }
-    
-    for _, calificacion in rango_calificaciones:
-        if calificacion is not None:
-            if calificacion > 5.0: # Escala antigua 0-100
-                if calificacion >= 90:
-                    rangos['excelente'] += 1
-                elif calificacion >= 70:
-                    rangos['bueno'] += 1
-                elif calificacion >= 60:
-                    rangos['aceptable'] += 1
-                else:
-                    rangos['insuficiente'] += 1
-            else: # Nueva escala 0-5
-                if calificacion >= 4.5:
-                    rangos['excelente'] += 1
-                elif calificacion >= 3.5:
-                    rangos['bueno'] += 1
-                elif calificacion >= 3.0:
-                    rangos['aceptable'] += 1
-                else:
-                    rangos['insuficiente'] += 1
-    
-    # Tendencia temporal (últimos 6 meses)
-    hace_6_meses = datetime.now() - timedelta(days=180)
-    tendencia_mensual = db.session.query(
-        func.date_format(ExamenResultado.fecha_presentacion, '%Y-%m').label('mes'),
-        func.count(ExamenResultado.id).label('total'),
-        func.avg(ExamenResultado.calificacion).label('promedio')
-    ).join(
-        Examen, ExamenResultado.examen_id == Examen.id
-    ).filter(
-        Examen.profesor_id == current_user.id,
-        ExamenResultado.completado == True,
-        ExamenResultado.fecha_presentacion >= hace_6_meses
-    ).group_by(
-        func.date_format(ExamenResultado.fecha_presentacion, '%Y-%m')
-    ).order_by('mes').all()
-    
-    return render_template(
-        "profesor/reporte_examenes.html",
-        total_examenes=total_examenes,
-        total_presentaciones=total_presentaciones,
-        stats_por_categoria=stats_por_categoria,
-        progreso_estudiantes=progreso_estudiantes,
-        examenes_populares=examenes_populares,
-        rangos=rangos,
-        tendencia_mensual=tendencia_mensual
-    )
+    return render_template("profesor/reporte_examenes.html", **reporte)
 
 
 # ============= RUTAS PARA ESTUDIANTES =============
 
 @main_bp.route("/estudiante/examenes")
+@query_budget(2)
 @login_required
 @role_required("estudiante")
 def estudiante_examenes():
     """Lista de exámenes asignados al estudiante"""
-    hoy = datetime.now()
-    
-    examenes_info = []
-    for examen in current_user.examenes_asignados:
-        # Verificar si ya completó el examen
-        resultado = ExamenResultado.query.filter_by(
-            estudiante_id=current_user.id,
-            examen_id=examen.id
-        ).first()
-        
-        # Determinar estado
-        if resultado:
-            estado = "completado"
-            fecha_completado = resultado.fecha_presentacion
-        elif examen.fecha_limite and examen.fecha_limite < hoy:
-            estado = "vencido"
-            fecha_completado = None
-        elif examen.fecha_limite and (
-            examen.fecha_limite - hoy).days <= 3:
-            estado = "por_vencer"
-            fecha_completado = None
-        else:
-            estado = "disponible"
-            fecha_completado = None
-        
-        examenes_info.append({
-            'examen': examen,
-            'estado': estado,
-            'resultado': resultado,
-            'fecha_completado': fecha_completado,
-            'dias_restantes': (examen.fecha_limite - hoy).days if (
-                examen.fecha_limite and examen.fecha_limite > hoy) else None
-        })
+    examenes_info = queries.examenes_estudiante(current_user.id)
     
     return render_template(
         "estudiante/examenes.html",
@@ -316,39 +141,67 @@ def estudiante_examenes():
 @login_required
 @role_required("estudiante")
 def estudiante_presentar_examen(examen_id):
-    """Vista para presentar un examen"""
+    """Vista para presentar un examen (crea o retoma el intento)"""
     examen = Examen.query.get_or_404(examen_id)
     
     # Verificar que el examen esté asignado
-    if examen not in current_user.examenes_asignados:
+    if not acceso.asignado(current_user.id, examen.id):
         return "No tienes acceso a este examen", 403
     
     # Verificar si ya lo completó
-    resultado_existente = ExamenResultado.query.filter_by(
-        estudiante_id=current_user.id,
-        examen_id=examen.id
-    ).first()
+    resultado = intentos.resultado_de(examen.id, current_user.id)
     
-    if resultado_existente:
+    if (resultado and resultado.completado) or journal.pendiente(
+            current_app, examen.id, current_user.id):
         return "Ya has completado este examen", 400
     
-    # Verificar fecha límite
-    if examen.fecha_limite and examen.fecha_limite < datetime.now():
-        return "Este examen ha vencido", 400
+    if resultado is None:
+        # Verificar fecha límite (un intento ya iniciado se puede terminar)
+        if examen.fecha_limite and examen.fecha_limite < datetime.now():
+            return "Este examen ha vencido", 400
+        resultado = intentos.iniciar(examen, current_user.id)
     
     return render_template(
         "estudiante/presentar_examen.html",
-        examen=examen
+        examen=examen,
+        # el intento se presenta con la versión con la que empezó
+        formulario=formularios.formulario(examen, current_user.id, resultado.examen_version),
+        guardadas=intentos.respuestas_guardadas(examen.id, current_user.id),
+        tiempo_restante=intentos.tiempo_restante(examen, resultado),
+        autosave_segundos=current_app.config.get("AUTOSAVE_INTERVAL_SECONDS", 10)
     )
 
 
+@main_bp.route("/estudiante/examen/<int:examen_id>/autosave", methods=["POST"])
+@login_required
+@role_required("estudiante")
+def estudiante_autosave_examen(examen_id):
+    """Guardar las respuestas que cambiaron desde el último autosave"""
+    if not acceso.asignado(current_user.id, examen_id):
+        return jsonify({"error": "No autorizado"}), 403
+    
+    intento = intentos.abierto(examen_id, current_user.id)
+    if intento is None:
+        return jsonify({"error": "No hay un intento abierto para este examen"}), 409
+    
+    if intentos.vencido(intento):
+        return jsonify({"error": "Se acabó el tiempo de este intento"}), 409
+    
+    aceptadas = intentos.guardar(intento, request.get_json(silent=True) or {})
+    return jsonify({"success": True, "guardadas": aceptadas})
+
+
 @main_bp.route("/estudiante/mis-resultados")
+@query_budget(2)
 @login_required
 @role_required("estudiante")
 def estudiante_resultados():
     """Historial de resultados del estudiante"""
-    resultados = ExamenResultado.query.filter_by(
-        estudiante_id=current_user.id
+    resultados = ExamenResultado.query.options(
+        *loaders.perfil("resultados_estudiante")
+    ).filter_by(
+        estudiante_id=current_user.id,
+        completado=True
     ).order_by(desc(ExamenResultado.fecha_presentacion)).all()
     
     # Calcular estadísticas
@@ -388,19 +241,30 @@ def estudiante_resultados():
 
 
 @main_bp.route("/estudiante/resultado/<int:resultado_id>")
+@query_budget(3)
 @login_required
 @role_required("estudiante")
 def estudiante_detalle_resultado(resultado_id):
     """Detalle de un resultado específico"""
-    resultado = ExamenResultado.query.get_or_404(resultado_id)
+    resultado = ExamenResultado.query.options(
+        joinedload(ExamenResultado.examen).joinedload(Examen.categoria)
+    ).filter_by(id=resultado_id).first_or_404()
     
     # Verificar que sea del estudiante actual
     if resultado.estudiante_id != current_user.id:
         return "No tienes acceso a este resultado", 403
     
+    # Un intento sin terminar no se revisa: se retoma
+    if not resultado.completado:
+        return redirect(url_for('main.estudiante_presentar_examen', examen_id=resultado.examen_id))
+    
+    # Preguntas, opciones y respuestas ya resueltas (la plantilla solo itera)
+    preguntas = revision.revision_resultado(resultado)
+    
     return render_template(
         "estudiante/detalle_resultado.html",
-        resultado=resultado
+        resultado=resultado,
+        preguntas=preguntas
     )
 
 
@@ -412,80 +276,31 @@ def estudiante_enviar_examen(examen_id):
     examen = Examen.query.get_or_404(examen_id)
     
     # Verificar acceso
-    if examen not in current_user.examenes_asignados:
+    if not acceso.asignado(current_user.id, examen.id):
         return jsonify({"error": "No autorizado"}), 403
     
-    # Verificar si ya completó
-    resultado_existente = ExamenResultado.query.filter_by(
-        estudiante_id=current_user.id,
-        examen_id=examen.id
-    ).first()
-    
-    if resultado_existente:
-        return jsonify({"error": "Ya completaste este examen"}), 400
-    
     # Obtener respuestas del formulario
-    respuestas_data = request.get_json()
-    
-    # Calcular calificación
-    total_preguntas = len(examen.preguntas)
-    correctas = 0
-    
-    respuestas_guardadas = []
-    
-    for pregunta in examen.preguntas:
-        respuesta_estudiante = respuestas_data.get(
-            f'pregunta_{pregunta.id}', '')
-        
-        # Verificar si es correcta
-        es_correcta = False
-        if pregunta.tipo == 'opcion_multiple':
-            opciones = json.loads(pregunta.opciones)
-            respuesta_correcta = next(
-                (opt['texto'] for opt in opciones if opt['correcta']), None)
-            es_correcta = respuesta_estudiante == respuesta_correcta
-        elif pregunta.tipo == 'verdadero_falso':
-            es_correcta = respuesta_estudiante == pregunta.respuesta_correcta
-        
-        if es_correcta:
-            correctas += 1
-        
-        # Guardar respuesta
-        respuesta = Respuesta(
-            examen_id=examen.id,
-            pregunta_id=pregunta.id,
-            estudiante_id=current_user.id,
-            respuesta_texto=respuesta_estudiante,
-            es_correcta=es_correcta
-        )
-        respuestas_guardadas.append(respuesta)
+    respuestas_data = request.get_json() or {}
     
-    # Calcular calificación de 0.0 a 5.0
-    calificacion = round((correctas / total_preguntas) * 5.0, 2) if (
-        total_preguntas > 0) else 0.0
-    
-    # Crear resultado
-    resultado = ExamenResultado(
-        examen_id=examen.id,
-        estudiante_id=current_user.id,
-        calificacion=calificacion,
-        completado=True,
-        fecha_presentacion=datetime.now(),
-        tiempo_utilizado=respuestas_data.get('tiempo_utilizado', 0)
-    )
-    
-    db.session.add(resultado)
-    for resp in respuestas_guardadas:
-        db.session.add(resp)
-    
-    db.session.commit()
+    # Escritura diferida: calificar, anotar en el diario y responder sin esperar a la base
+    diferido = journal.activo(current_app)
+    if diferido:
+        enviado = journal.encolar(current_app, examen, current_user.id, respuestas_data)
+    else:
+        # Escribir lo que falte del intento, calificar y cerrarlo en una sola transacción
+        enviado = intentos.finalizar(examen, current_user.id, respuestas_data)
+    if enviado is None:
+        return jsonify({"error": "Ya completaste este examen"}), 400
+    resultado_id, calificacion = enviado
     
     return jsonify({
         "success": True,
-        "calificacion": calificacion,
-        "correctas": correctas,
-        "total": total_preguntas,
-        "resultado_id": resultado.id
+        "calificacion": calificacion.calificacion,
+        "puntaje": calificacion.puntaje,
+        "correctas": calificacion.correctas,
+        "total": calificacion.total,
+        "resultado_id": resultado_id,
+        "pendiente": diferido
     })
 
 
@@ -495,19 +310,42 @@ def estudiante_enviar_examen(examen_id):
 @login_required
 @role_required("admin")
 def dashboard_admin():
-    usuarios = User.query.all()
-    return render_template("dashboard_admin.html", usuarios=usuarios)
+    conteos = paginacion.conteo_por_rol()
+    filtro, pagina = paginacion.usuarios_de_peticion(request.args)
+    return render_template("dashboard_admin.html", conteos=conteos,
+                           total_usuarios=sum(conteos.values()), filtro=filtro, pagina=pagina)
+
+
+@main_bp.route("/admin/metrics")
+@login_required
+@role_required("admin")
+def admin_metrics():
+    """Métricas de peticiones y SQL del proceso en formato Prometheus"""
+    return Response(metrics.exponer(current_app),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @main_bp.route("/usuarios")
 @login_required
 @role_required("admin", "profesor")
 def usuarios():
-    if current_user.role == "profesor":
-        data = User.query.filter_by(role="estudiante").all()
-    else:
-        data = User.query.all()
-    return render_template("usuarios.html", usuarios=data)
+    # Los profesores solo ven estudiantes
+    rol = "estudiante" if current_user.role == "profesor" else None
+    filtro, pagina = paginacion.usuarios_de_peticion(request.args, rol)
+    return render_template("usuarios.html", filtro=filtro, pagina=pagina, rol_fijo=rol)
+
+
+@main_bp.route("/api/usuarios")
+@login_required
+@role_required("admin", "profesor")
+def api_usuarios():
+    """Página de usuarios en JSON (mismos filtros y cursor que /usuarios)"""
+    rol = "estudiante" if current_user.role == "profesor" else None
+    _, pagina = paginacion.usuarios_de_peticion(request.args, rol)
+    return jsonify({
+        "usuarios": [paginacion.usuario_json(u) for u in pagina.items],
+        "siguiente": pagina.siguiente,
+    })
 
 
 # ============================================================================
@@ -515,11 +353,15 @@ def usuarios():
 # ============================================================================
 
 @main_bp.route("/estudiante/progreso-detallado")
+@query_budget(2)
+@lee_de_replica
 @login_required
 @role_required("estudiante")
 def estudiante_progreso_detallado():
     """Dashboard de progreso personal más detallado con análisis por categoría"""
-    resultados = ExamenResultado.query.filter_by(
+    resultados = ExamenResultado.query.options(
+        *loaders.perfil("resultados_estudiante")
+    ).filter_by(
         estudiante_id=current_user.id,
         completado=True
     ).all()
@@ -550,13 +392,13 @@ def estudiante_progreso_detallado():
     fortalezas = []
     debilidades = []
     
-    for cat, stats in categorias_stats.items():
-        if stats['promedio'] >= 80:
-            fortalezas.append({'nombre': cat, 'promedio': stats['promedio'], 
-                             'color': stats['color'], 'icono': stats['icono']})
-        elif stats['promedio'] < 60:
-            debilidades.append({'nombre': cat, 'promedio': stats['promedio'],
-                              'color': stats['color'], 'icono': stats['icono']})
+    for cat, datos in categorias_stats.items():
+        if datos['promedio'] >= 80:
+            fortalezas.append({'nombre': cat, 'promedio': datos['promedio'], 
+                             'color': datos['color'], 'icono': datos['icono']})
+        elif datos['promedio'] < 60:
+            debilidades.append({'nombre': cat, 'promedio': datos['promedio'],
+                              'color': datos['color'], 'icono': datos['icono']})
     
     # Progreso en el tiempo
     progreso_tiempo = []
@@ -672,13 +514,14 @@ def estudiante_modo_practica(examen_id):
     examen = Examen.query.get_or_404(examen_id)
     
     # Verificar que el examen esté asignado
-    if examen not in current_user.examenes_asignados:
+    if not acceso.asignado(current_user.id, examen.id):
         flash("No tienes acceso a este examen", "danger")
         return redirect(url_for('main.estudiante_examenes'))
     
     return render_template(
         "estudiante/presentar_examen.html",
         examen=examen,
+        formulario=formularios.formulario(examen, current_user.id),
         modo_practica=True
     )
 
@@ -692,56 +535,31 @@ def estudiante_enviar_practica(examen_id):
     examen = Examen.query.get_or_404(examen_id)
     
     # Verificar acceso
-    if examen not in current_user.examenes_asignados:
+    if not acceso.asignado(current_user.id, examen.id):
         return jsonify({"error": "No autorizado"}), 403
     
     # Obtener respuestas del formulario
-    respuestas_data = request.get_json()
+    respuestas_data = request.get_json() or {}
     
-    # Calcular calificación (sin guardar)
-    total_preguntas = len(examen.preguntas)
-    correctas = 0
-    resultados_preguntas = []
+    # Calcular calificación (sin guardar) contra la clave en caché
+    calificacion = grading.grade(grading.get_answer_key(examen), respuestas_data)
     
-    for pregunta in examen.preguntas:
-        respuesta_estudiante = respuestas_data.get(
-            f'pregunta_{pregunta.id}', '')
-        
-        # Verificar si es correcta
-        es_correcta = False
-        respuesta_correcta = ""
-        
-        if pregunta.tipo == 'opcion_multiple':
-            opciones = json.loads(pregunta.opciones)
-            respuesta_correcta = next(
-                (opt['texto'] for opt in opciones if opt['correcta']), None)
-            es_correcta = respuesta_estudiante == respuesta_correcta
-        elif pregunta.tipo == 'verdadero_falso':
-            respuesta_correcta = pregunta.respuesta_correcta
-            es_correcta = respuesta_estudiante == respuesta_correcta
-        
-        if es_correcta:
-            correctas += 1
-        
-        resultados_preguntas.append({
-            'pregunta_id': pregunta.id,
-            'pregunta_texto': pregunta.texto,
-            'respuesta_estudiante': respuesta_estudiante,
-            'respuesta_correcta': respuesta_correcta,
-            'es_correcta': es_correcta,
-            'explicacion': pregunta.explicacion
-        })
-    
-    # Calcular calificación de 0.0 a 5.0
-    calificacion = round((correctas / total_preguntas) * 5.0, 2) if (
-        total_preguntas > 0) else 0.0
+    resultados_preguntas = [{
+        'pregunta_id': item.pregunta_id,
+        'pregunta_texto': item.texto,
+        'respuesta_estudiante': grading.texto_de(item, respuesta_estudiante),
+        'respuesta_correcta': grading.texto_de(item, item.correcta),
+        'es_correcta': es_correcta,
+        'explicacion': item.explicacion
+    } for item, respuesta_estudiante, es_correcta in calificacion.detalle]
     
     return jsonify({
         "success": True,
         "modo_practica": True,
-        "calificacion": calificacion,
-        "correctas": correctas,
-        "total": total_preguntas,
+        "calificacion": calificacion.calificacion,
+        "puntaje": calificacion.puntaje,
+        "correctas": calificacion.correctas,
+        "total": calificacion.total,
         "resultados": resultados_preguntas
     })
 
@@ -887,6 +705,7 @@ def ver_certificado(codigo):
     )
 
 @main_bp.route('/profesor/examen/<int:examen_id>/resultados', methods=['GET', 'POST'])
+@query_budget(3)
 @login_required
 @role_required('profesor')
 def profesor_resultados_examen(examen_id):
@@ -896,14 +715,20 @@ def profesor_resultados_examen(examen_id):
         return redirect(url_for('main.dashboard_profesor'))
 
     if request.method == 'POST':
-        for resultado in examen.resultados:
-            comentario = request.form.get(f'comentario-{resultado.id}')
-            recomendaciones = request.form.get(f'recomendaciones-{resultado.id}')
-            resultado.comentario_profesor = comentario
-            resultado.recomendaciones = recomendaciones
+        # El formulario trae solo los resultados de la página enviada
+        ids = [int(clave.split('-', 1)[1]) for clave in request.form
+               if clave.startswith('comentario-') and clave.split('-', 1)[1].isdigit()]
+        for resultado in ExamenResultado.query.filter(
+                ExamenResultado.examen_id == examen.id, ExamenResultado.id.in_(ids)):
+            resultado.comentario_profesor = request.form.get(f'comentario-{resultado.id}')
+            resultado.recomendaciones = request.form.get(f'recomendaciones-{resultado.id}')
         db.session.commit()
         flash('Comentarios guardados exitosamente.', 'success')
-        return redirect(url_for('main.profesor_resultados_examen', examen_id=examen.id))
-
-    resultados = ExamenResultado.query.filter_by(examen_id=examen.id).all()
-    return render_template('profesor/resultados_examen.html', examen=examen, resultados=resultados)
+        return redirect(url_for('main.profesor_resultados_examen', examen_id=examen.id,
+                                cursor=request.args.get('cursor')))
+
+    pagina = paginacion.resultados_examen(
+        examen.id, request.args.get('cursor'), paginacion.limite(request.args.get('limite')),
+        opciones=loaders.perfil("resultados_con_estudiante"))
+    return render_template('profesor/resultados_examen.html', examen=examen,
+                           resultados=pagina.items, pagina=pagina)
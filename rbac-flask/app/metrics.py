@@ -0,0 +1,222 @@
+"""
+Instrumentación por petición: latencia por endpoint, número y tiempo de
+sentencias SQL, y las sentencias más lentas.
+
+Se engancha en create_app con los eventos before/after_cursor_execute de
+SQLAlchemy y los hooks de petición de Flask. Los datos quedan en memoria del
+proceso y se publican en /admin/metrics (formato de texto de Prometheus) y en
+la cabecera Server-Timing de cada respuesta.
+"""
+import bisect
+import re
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .extensions import db
+
+# Límites de los buckets de latencia (segundos), como los de los clientes de Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+class _Histograma:
+    __slots__ = ("conteos", "suma", "total")
+
+    def __init__(self):
+        self.conteos = [0] * (len(BUCKETS) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(BUCKETS, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    """Métricas acumuladas del proceso (seguro entre hilos)."""
+
+    def __init__(self, lentas=10):
+        self._lock = threading.Lock()
+        self._lentas_max = lentas
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.latencia = {}       # endpoint -> _Histograma
+            self.peticiones = {}     # (endpoint, método, estado) -> n
+            self.sql_sentencias = {}  # endpoint -> n
+            self.sql_segundos = {}   # endpoint -> s
+            self._lentas = {}        # (sentencia, endpoint) -> segundos, las más lentas
+            self._umbral = 0.0
+
+    def registrar_peticion(self, endpoint, metodo, estado, segundos, sentencias, segundos_sql):
+        with self._lock:
+            histograma = self.latencia.get(endpoint)
+            if histograma is None:
+                histograma = self.latencia[endpoint] = _Histograma()
+            histograma.observar(segundos)
+            clave = (endpoint, metodo, estado)
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            self.sql_sentencias[endpoint] = self.sql_sentencias.get(endpoint, 0) + sentencias
+            self.sql_segundos[endpoint] = self.sql_segundos.get(endpoint, 0.0) + segundos_sql
+
+    def registrar_sentencia(self, segundos, sentencia, endpoint):
+        # Comparación sin lock: casi todas las sentencias son más rápidas que el umbral
+        if segundos <= self._umbral:
+            return
+        clave = (_ESPACIOS.sub(" ", sentencia).strip()[:300], endpoint)
+        with self._lock:
+            if segundos <= self._lentas.get(clave, 0.0):
+                return
+            self._lentas[clave] = segundos
+            if len(self._lentas) > self._lentas_max:
+                del self._lentas[min(self._lentas, key=self._lentas.get)]
+            if len(self._lentas) >= self._lentas_max:
+                self._umbral = min(self._lentas.values())
+
+    def lentas(self):
+        """[(segundos, sentencia, endpoint)] de la más lenta a la más rápida."""
+        with self._lock:
+            return sorted(((s, sql, e) for (sql, e), s in self._lentas.items()), reverse=True)
+
+    # ============= EXPOSICIÓN =============
+
+    def prometheus(self):
+        """Métricas en formato de texto de Prometheus (0.0.4)."""
+        lentas = self.lentas()
+        with self._lock:
+            latencia = {e: (list(h.conteos), h.suma, h.total) for e, h in self.latencia.items()}
+            peticiones = dict(self.peticiones)
+            sentencias = dict(self.sql_sentencias)
+            segundos_sql = dict(self.sql_segundos)
+
+        lineas = [
+            "# HELP http_request_duration_seconds Latencia de las peticiones por endpoint.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for endpoint in sorted(latencia):
+            conteos, suma, total = latencia[endpoint]
+            acumulado = 0
+            for limite, conteo in zip(BUCKETS, conteos):
+                acumulado += conteo
+                lineas.append(f'http_request_duration_seconds_bucket{{endpoint="{_etiqueta(endpoint)}",'
+                              f'le="{limite}"}} {acumulado}')
+            lineas.append(f'http_request_duration_seconds_bucket{{endpoint="{_etiqueta(endpoint)}",'
+                          f'le="+Inf"}} {total}')
+            lineas.append(f'http_request_duration_seconds_sum{{endpoint="{_etiqueta(endpoint)}"}} {suma:.6f}')
+            lineas.append(f'http_request_duration_seconds_count{{endpoint="{_etiqueta(endpoint)}"}} {total}')
+
+        lineas += [
+            "# HELP http_requests_total Peticiones atendidas por endpoint, método y estado.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (endpoint, metodo, estado), n in sorted(peticiones.items()):
+            lineas.append(f'http_requests_total{{endpoint="{_etiqueta(endpoint)}",method="{metodo}",'
+                          f'status="{estado}"}} {n}')
+
+        lineas += [
+            "# HELP sql_statements_total Sentencias SQL ejecutadas por endpoint.",
+            "# TYPE sql_statements_total counter",
+        ]
+        for endpoint in sorted(sentencias):
+            lineas.append(f'sql_statements_total{{endpoint="{_etiqueta(endpoint)}"}} {sentencias[endpoint]}')
+
+        lineas += [
+            "# HELP sql_duration_seconds_total Tiempo en SQL por endpoint.",
+            "# TYPE sql_duration_seconds_total counter",
+        ]
+        for endpoint in sorted(segundos_sql):
+            lineas.append(f'sql_duration_seconds_total{{endpoint="{_etiqueta(endpoint)}"}} '
+                          f'{segundos_sql[endpoint]:.6f}')
+
+        lineas += [
+            "# HELP sql_slowest_statement_seconds Sentencias SQL más lentas observadas.",
+            "# TYPE sql_slowest_statement_seconds gauge",
+        ]
+        for posicion, (segundos, sentencia, endpoint) in enumerate(lentas, 1):
+            lineas.append(f'sql_slowest_statement_seconds{{rank="{posicion}",'
+                          f'endpoint="{_etiqueta(endpoint)}",statement="{_etiqueta(sentencia)}"}} '
+                          f'{segundos:.6f}')
+        return "\n".join(lineas) + "\n"
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registro = Registro()
+
+
+def agregar_colector(app, colector):
+    """Registrar una función que devuelve líneas extra para /admin/metrics."""
+    app.extensions.setdefault("metrics.colectores", []).append(colector)
+
+
+def exponer(app):
+    """Texto completo de /admin/metrics: el registro y los colectores de la app."""
+    texto = registro.prometheus()
+    for colector in app.extensions.get("metrics.colectores", ()):
+        texto += "\n".join(colector()) + "\n"
+    return texto
+
+
+# ============= HOOKS =============
+
+def _endpoint():
+    return request.endpoint or str(getattr(request.routing_exception, "code", "sin_ruta"))
+
+
+def _antes_sentencia(conn, cursor, statement, parameters, context, executemany):
+    context._metricas_inicio = time.perf_counter()
+
+
+def _despues_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_metricas_inicio", None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    if has_request_context():
+        g._metricas_sql_n = g.get("_metricas_sql_n", 0) + 1
+        g._metricas_sql_s = g.get("_metricas_sql_s", 0.0) + segundos
+        registro.registrar_sentencia(segundos, statement, _endpoint())
+    else:
+        registro.registrar_sentencia(segundos, statement, "-")
+
+
+def _inicio_peticion():
+    g._metricas_inicio = time.perf_counter()
+
+
+def _fin_peticion(response):
+    inicio = g.pop("_metricas_inicio", None)
+    if inicio is None:
+        return response
+    total = time.perf_counter() - inicio
+    sentencias = g.get("_metricas_sql_n", 0)
+    segundos_sql = g.get("_metricas_sql_s", 0.0)
+    registro.registrar_peticion(_endpoint(), request.method, response.status_code,
+                                total, sentencias, segundos_sql)
+    if current_app.config.get("METRICS_SERVER_TIMING", True):
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={segundos_sql * 1000:.2f};desc="{sentencias} consultas", '
+            f"app;dur={(total - segundos_sql) * 1000:.2f}, total;dur={total * 1000:.2f}")
+    return response
+
+
+def init_app(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    registro._lentas_max = app.config.get("METRICS_SLOW_STATEMENTS", 10)
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _antes_sentencia):
+                event.listen(engine, "before_cursor_execute", _antes_sentencia)
+                event.listen(engine, "after_cursor_execute", _despues_sentencia)
+    app.before_request(_inicio_peticion)
+    app.after_request(_fin_peticion)
@@ -1,8 +1,9 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.orm import query_expression
 
-from .extensions import db, login_manager
+from .extensions import db
+from . import passwords
 
 ROLES = ("admin", "profesor", "estudiante")
 NIVELES_DIFICULTAD = ("basico", "intermedio", "avanzado")
@@ -24,16 +25,25 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False, default="estudiante")
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    grupo = db.Column(db.String(50), index=True)  # curso/grupo del estudiante (ej. 11A)
+    
+    __table_args__ = (
+        # Listados paginados por rol y prefijo de username (paginacion.usuarios)
+        db.Index('ix_users_role_username', 'role', 'username'),
+    )
     
     # Relaciones
     examenes_creados = db.relationship('Examen', backref='profesor', lazy=True, foreign_keys='Examen.profesor_id')
     examenes_asignados = db.relationship('Examen', secondary=estudiante_examen, backref=db.backref('estudiantes', lazy='dynamic'))
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        from . import identidad
+        self.password_hash = passwords.hash_password(password)
+        if self.id is not None:
+            identidad.invalidar(self.id)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return passwords.verificar(self.password_hash, password)
 
     @property
     def is_admin(self):
@@ -82,10 +92,23 @@ class Examen(db.Model):
     mostrar_respuestas = db.Column(db.Boolean, default=True)  # mostrar respuestas correctas después
     barajar_preguntas = db.Column(db.Boolean, default=False)  # randomizar orden preguntas
     calificacion_minima = db.Column(db.Float, default=60.0)  # porcentaje mínimo para aprobar
+    version = db.Column(db.Integer, default=1, nullable=False)  # se incrementa al editar preguntas
+    calibrado_en = db.Column(db.DateTime)  # última calibración Rasch (flask calibrate)
+    calibrado_con = db.Column(db.Integer)  # estudiantes usados en esa calibración
+    
+    __table_args__ = (
+        db.Index('ix_examenes_profesor_fecha', 'profesor_id', 'fecha_creacion'),
+    )
     
     # Relaciones
     preguntas = db.relationship('Pregunta', backref='examen', lazy=True, cascade='all, delete-orphan')
     resultados = db.relationship('ExamenResultado', backref='examen', lazy=True, cascade='all, delete-orphan')
+    versiones_publicadas = db.relationship('ExamenVersion', lazy=True, cascade='all, delete-orphan')
+    estadisticas = db.relationship('ExamenStats', lazy=True, uselist=False, cascade='all, delete-orphan')
+    
+    # Conteos agregados, solo presentes si la consulta usó loaders.con_conteos()
+    num_preguntas = query_expression()
+    num_estudiantes = query_expression()
 
     def __repr__(self):
         return f'<Examen {self.titulo}>'
@@ -107,6 +130,7 @@ class Pregunta(db.Model):
     tiempo_estimado = db.Column(db.Integer, default=60)  # segundos
     explicacion = db.Column(db.Text)  # Explicación de la respuesta correcta
     imagen_url = db.Column(db.String(255))  # Ruta a imagen adjunta
+    rasch_dificultad = db.Column(db.Float)  # dificultad calibrada en logits (None = a priori)
     
     # Relaciones
     respuestas = db.relationship('Respuesta', backref='pregunta', lazy=True, cascade='all, delete-orphan')
@@ -115,17 +139,35 @@ class Pregunta(db.Model):
         return f'<Pregunta {self.id}: {self.texto[:30]}>'
 
 
+class ExamenVersion(db.Model):
+    """Contenido congelado de un examen publicado (ver versiones.py)."""
+    __tablename__ = "examenes_versiones"
+    examen_id = db.Column(db.Integer, db.ForeignKey('examenes.id'), primary_key=True)
+    version = db.Column(db.Integer, primary_key=True)
+    contenido = db.Column(db.Text(length=16777215), nullable=False)  # JSON; MEDIUMTEXT en MySQL
+    publicado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExamenVersion {self.examen_id} v{self.version}>'
+
+
 class Respuesta(db.Model):
     __tablename__ = "respuestas"
     id = db.Column(db.Integer, primary_key=True)
     examen_id = db.Column(db.Integer, db.ForeignKey('examenes.id'), nullable=False)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     pregunta_id = db.Column(db.Integer, db.ForeignKey('preguntas.id'), nullable=False)
-    respuesta_texto = db.Column(db.Text)
+    respuesta_texto = db.Column(db.Text)  # solo preguntas abiertas
+    opcion_indice = db.Column(db.SmallInteger)  # opción elegida (opción múltiple y V/F)
     es_correcta = db.Column(db.Boolean, default=False)
     puntos_obtenidos = db.Column(db.Float, default=0)
     fecha_respuesta = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Relación viewonly ExamenResultado.respuestas
+        db.Index('ix_respuestas_examen_estudiante', 'examen_id', 'estudiante_id'),
+    )
+    
     def __repr__(self):
         return f'<Respuesta {self.id}>'
 
@@ -136,6 +178,8 @@ class ExamenResultado(db.Model):
     examen_id = db.Column(db.Integer, db.ForeignKey('examenes.id'), nullable=False)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     calificacion = db.Column(db.Float, default=0)
+    examen_version = db.Column(db.Integer)  # versión del examen con la que se presentó
+    puntaje_escalado = db.Column(db.Integer)  # escala ICFES 0-100 (modelo de Rasch)
     total_puntos = db.Column(db.Float, default=0)
     fecha_inicio = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_fin = db.Column(db.DateTime)
@@ -153,6 +197,12 @@ class ExamenResultado(db.Model):
     revision_completada = db.Column(db.Boolean, default=False)
     fecha_solicitud_revision = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_resultados_estudiante_examen', 'estudiante_id', 'examen_id'),
+        db.Index('ix_resultados_examen_completado', 'examen_id', 'completado'),
+        db.Index('ix_resultados_fecha_presentacion', 'fecha_presentacion'),
+    )
+    
     # Relación con estudiante y respuestas
     estudiante = db.relationship('User', foreign_keys=[estudiante_id], backref='mis_resultados')
     respuestas = db.relationship('Respuesta', 
@@ -177,6 +227,10 @@ class Notificacion(db.Model):
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     url_destino = db.Column(db.String(255))  # URL para redirigir al hacer clic
     
+    __table_args__ = (
+        db.Index('ix_notificaciones_usuario_leida_fecha', 'usuario_id', 'leida', 'fecha_creacion'),
+    )
+    
     # Relación
     usuario = db.relationship('User', backref='notificaciones')
     
@@ -205,6 +259,67 @@ class Certificado(db.Model):
         return f'<Certificado {self.codigo_verificacion}>'
 
 
-@login_manager.user_loader
-def load_user(user_id):  # pragma: no cover
-    return User.query.get(int(user_id))
+# Estadísticas materializadas del dashboard del profesor
+# (se actualizan en la misma transacción en que se envía un examen)
+class ProfesorStats(db.Model):
+    __tablename__ = "profesor_stats"
+    profesor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_resultados = db.Column(db.Integer, default=0, nullable=False)
+    suma_calificaciones = db.Column(db.Float, default=0, nullable=False)
+    calificacion_maxima = db.Column(db.Float)
+    calificacion_minima = db.Column(db.Float)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def promedio(self):
+        if not self.total_resultados:
+            return None
+        return self.suma_calificaciones / self.total_resultados
+    
+    def __repr__(self):
+        return f'<ProfesorStats {self.profesor_id}>'
+
+
+class ProfesorEstudianteStats(db.Model):
+    __tablename__ = "profesor_estudiante_stats"
+    profesor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_resultados = db.Column(db.Integer, default=0, nullable=False)
+    suma_normalizada = db.Column(db.Float, default=0, nullable=False)  # calificaciones en escala 0-5
+    suma_calificaciones = db.Column(db.Float, default=0, nullable=False)  # escala original
+    calificacion_maxima = db.Column(db.Float)
+    calificacion_minima = db.Column(db.Float)
+    
+    def __repr__(self):
+        return f'<ProfesorEstudianteStats {self.profesor_id}/{self.estudiante_id}>'
+
+
+# Presentaciones por examen para el reporte de exámenes
+class ExamenStats(db.Model):
+    __tablename__ = "examenes_stats"
+    examen_id = db.Column(db.Integer, db.ForeignKey('examenes.id'), primary_key=True)
+    total_presentaciones = db.Column(db.Integer, default=0, nullable=False)
+    suma_calificaciones = db.Column(db.Float, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<ExamenStats {self.examen_id}>'
+
+
+# Rollup mensual por profesor y categoría para el reporte de exámenes
+class ReporteMensual(db.Model):
+    __tablename__ = "reporte_mensual"
+    profesor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    mes = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    categoria_id = db.Column(db.Integer, primary_key=True, default=0)  # 0 = sin categoría
+    total = db.Column(db.Integer, default=0, nullable=False)
+    suma_calificaciones = db.Column(db.Float, default=0, nullable=False)
+    
+    # Distribución de calificaciones por rango
+    excelente = db.Column(db.Integer, default=0, nullable=False)
+    bueno = db.Column(db.Integer, default=0, nullable=False)
+    aceptable = db.Column(db.Integer, default=0, nullable=False)
+    insuficiente = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReporteMensual {self.profesor_id} {self.mes} {self.categoria_id}>'
+
@@ -0,0 +1,161 @@
+"""
+Paginación por clave (keyset / seek) de los listados de usuarios y resultados.
+
+En lugar de OFFSET, cada página pide las filas posteriores a la última clave
+vista (`WHERE clave > :cursor ORDER BY clave LIMIT n`), así que la página 400
+cuesta lo mismo que la primera y un alta o baja entre páginas no duplica ni
+salta filas. El cursor viaja como texto opaco en `?cursor=`.
+
+- Usuarios: ordenados por username (único). El filtro por rol + prefijo de
+  username usa el índice ix_users_role_username.
+- Resultados de un examen: por id descendente (los últimos primero), sobre
+  ix_resultados_examen_completado (el id va implícito en el índice).
+
+Las vistas HTML y la API JSON (/api/usuarios) usan las mismas funciones.
+"""
+import base64
+import json
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import case, func, select
+
+from .extensions import db
+from .models import ROLES, ExamenResultado, User
+
+Pagina = namedtuple("Pagina", "items siguiente")
+FiltroUsuarios = namedtuple("FiltroUsuarios", "rol activo prefijo")
+
+
+# ============= CURSOR =============
+
+def codificar(valor):
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip("=")
+
+
+def decodificar(cursor):
+    """Valor de la última clave vista, o None si el cursor falta o no es válido."""
+    if not cursor:
+        return None
+    try:
+        valor = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    return valor if isinstance(valor, (str, int)) else None
+
+
+def limite(valor=None):
+    """Tamaño de página pedido, acotado a PAGE_SIZE_MAX."""
+    config = current_app.config
+    try:
+        valor = int(valor) if valor else config.get("PAGE_SIZE", 50)
+    except ValueError:
+        valor = config.get("PAGE_SIZE", 50)
+    return max(1, min(valor, config.get("PAGE_SIZE_MAX", 200)))
+
+
+def _paginar(consulta, columna, cursor, tamano, descendente=False):
+    despues = decodificar(cursor)
+    if despues is not None:
+        consulta = consulta.where(columna < despues if descendente else columna > despues)
+    consulta = consulta.order_by(columna.desc() if descendente else columna).limit(tamano + 1)
+    filas = db.session.execute(consulta).scalars().all()
+    if len(filas) <= tamano:
+        return Pagina(filas, None)
+    filas = filas[:tamano]
+    return Pagina(filas, codificar(getattr(filas[-1], columna.key)))
+
+
+def _prefijo(columna, texto):
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return columna.like(f"{escapado}%", escape="\\")
+
+
+# ============= USUARIOS =============
+
+def filtro_usuarios(args, rol=None):
+    """FiltroUsuarios desde los parámetros de la petición (`rol` fuerza el rol)."""
+    pedido = args.get("rol") or None
+    activo = args.get("activo")
+    return FiltroUsuarios(
+        rol=rol or (pedido if pedido in ROLES else None),
+        activo={"1": True, "0": False}.get(activo),
+        prefijo=(args.get("q") or "").strip() or None,
+    )
+
+
+def _filtrar_usuarios(consulta, filtro):
+    if filtro.rol:
+        consulta = consulta.where(User.role == filtro.rol)
+    if filtro.activo is not None:
+        consulta = consulta.where(User.is_active == filtro.activo)
+    if filtro.prefijo:
+        consulta = consulta.where(_prefijo(User.username, filtro.prefijo))
+    return consulta
+
+
+def usuarios(filtro, cursor=None, tamano=None):
+    """Página de usuarios ordenada por username."""
+    consulta = _filtrar_usuarios(select(User), filtro)
+    return _paginar(consulta, User.username, cursor, tamano or limite())
+
+
+def usuarios_de_peticion(args, rol=None):
+    """(filtro, página) de usuarios según los parámetros de la petición."""
+    filtro = filtro_usuarios(args, rol)
+    return filtro, usuarios(filtro, args.get("cursor"), limite(args.get("limite")))
+
+
+def conteo_por_rol():
+    """{rol: total} con un solo GROUP BY."""
+    return dict(db.session.execute(
+        select(User.role, func.count()).group_by(User.role)
+    ).all())
+
+
+def usuario_json(u):
+    return {
+        "id": u.id,
+        "username": u.username,
+        "email": u.email,
+        "role": u.role,
+        "is_active": u.is_active,
+        "grupo": u.grupo,
+    }
+
+
+# ============= RESULTADOS =============
+
+def resultados_examen(examen_id, cursor=None, tamano=None, opciones=()):
+    """Página de resultados completados de un examen, los últimos primero."""
+    consulta = select(ExamenResultado).options(*opciones).where(
+        ExamenResultado.examen_id == examen_id,
+        ExamenResultado.completado == True,
+    )
+    return _paginar(consulta, ExamenResultado.id, cursor, tamano or limite(), descendente=True)
+
+
+def resumen_resultados_examen(examen_id, calificacion_minima=None):
+    """(total, promedio, aprobados) de los resultados completados, calculado en SQL.
+
+    Aprobar es igual que en el historial del estudiante: calificación y mínimo
+    (porcentaje del examen, 60 por defecto) llevados a la escala 0-5.
+    """
+    minima = calificacion_minima or 60
+    if minima > 5.0:
+        minima = minima / 100 * 5.0
+    calificacion = case(
+        (ExamenResultado.calificacion > 5.0, ExamenResultado.calificacion / 100 * 5.0),
+        else_=ExamenResultado.calificacion
+    )
+    total, promedio, aprobados = db.session.execute(
+        select(
+            func.count(),
+            func.avg(ExamenResultado.calificacion),
+            func.sum(case((calificacion >= minima, 1), else_=0)),
+        ).where(
+            ExamenResultado.examen_id == examen_id,
+            ExamenResultado.completado == True,
+        )
+    ).one()
+    return total, promedio or 0, aprobados or 0
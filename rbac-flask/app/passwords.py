@@ -0,0 +1,150 @@
+"""
+Política de hash de contraseñas.
+
+El algoritmo y su costo se configuran con PASSWORD_HASH_ALGORITHM y
+PASSWORD_HASH_COST (ver config.py); `flask bench-hash` calibra el costo para
+una latencia objetivo en la máquina actual. Los hashes generados con una
+política anterior se actualizan después de un login exitoso, en un hilo aparte
+para no alargar la petición.
+"""
+import statistics
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .extensions import db
+
+ALGORITMOS = ("scrypt", "pbkdf2")
+
+# Costo por defecto de werkzeug: scrypt n=2**15, pbkdf2 1.000.000 iteraciones
+COSTO_POR_DEFECTO = {"scrypt": 15, "pbkdf2": 1_000_000}
+
+# Límites de calibración (scrypt usa ~128 * 8 * 2**costo bytes de memoria)
+RANGO_SCRYPT = range(12, 19)
+MINIMO_PBKDF2 = 100_000
+
+Politica = namedtuple("Politica", "algoritmo costo")
+
+_rehash_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rehash")
+
+
+def metodo(politica):
+    """Cadena de método de werkzeug para la política."""
+    if politica.algoritmo == "scrypt":
+        return f"scrypt:{2 ** politica.costo}:8:1"
+    if politica.algoritmo == "pbkdf2":
+        return f"pbkdf2:sha256:{politica.costo}"
+    raise ValueError(f"Algoritmo de hash no soportado: {politica.algoritmo}")
+
+
+def politica_actual():
+    algoritmo = current_app.config.get("PASSWORD_HASH_ALGORITHM") or "scrypt"
+    costo = current_app.config.get("PASSWORD_HASH_COST") or COSTO_POR_DEFECTO.get(algoritmo)
+    return Politica(algoritmo, costo)
+
+
+def hash_password(password, politica=None):
+    return generate_password_hash(password, method=metodo(politica or politica_actual()))
+
+
+def verificar(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def necesita_rehash(password_hash, politica=None):
+    """True si el hash no fue generado con la política vigente."""
+    return password_hash.split("$", 1)[0] != metodo(politica or politica_actual())
+
+
+# ============= REHASH EN SEGUNDO PLANO =============
+
+def _rehash(app, user_id, hash_anterior, password, politica):
+    from .models import User
+    with app.app_context():
+        nuevo = hash_password(password, politica)
+        # Solo si nadie cambió la contraseña mientras tanto
+        db.session.execute(update(User).where(
+            User.id == user_id,
+            User.password_hash == hash_anterior,
+        ).values(password_hash=nuevo).execution_options(synchronize_session=False))
+        db.session.commit()
+
+
+def _avisar_fallo(app, user_id, futuro):
+    # El Future no se espera en ninguna parte: sin esto el error se perdería
+    error = futuro.exception()
+    if error is not None:
+        app.logger.error("No se pudo actualizar el hash de la contraseña del usuario %s",
+                         user_id, exc_info=error)
+
+
+def programar_rehash(user, password):
+    """Actualizar el hash de `user` a la política vigente si hace falta.
+
+    Devuelve el Future del rehash, o None si el hash ya estaba al día.
+    """
+    politica = politica_actual()
+    if not necesita_rehash(user.password_hash, politica):
+        return None
+    app = current_app._get_current_object()
+    if not app.config.get("PASSWORD_REHASH_ASYNC", True):
+        _rehash(app, user.id, user.password_hash, password, politica)
+        return None
+    futuro = _rehash_pool.submit(_rehash, app, user.id, user.password_hash, password, politica)
+    futuro.add_done_callback(partial(_avisar_fallo, app, user.id))
+    return futuro
+
+
+# ============= CALIBRACIÓN =============
+
+def medir(politica, repeticiones=3):
+    """Mediana en ms de generar un hash con la política."""
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        generate_password_hash("calibracion", method=metodo(politica))
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(muestras)
+
+
+def calibrar(algoritmo, objetivo_ms, repeticiones=3):
+    """Mayor costo cuyo hash tarda como máximo `objetivo_ms` en esta máquina.
+
+    Devuelve una lista de (Politica, ms) con las mediciones y la política
+    elegida (o None si ni el costo mínimo cumple el objetivo).
+    """
+    mediciones = []
+    if algoritmo == "scrypt":
+        elegida = None
+        for costo in RANGO_SCRYPT:
+            politica = Politica("scrypt", costo)
+            ms = medir(politica, repeticiones)
+            mediciones.append((politica, ms))
+            if ms > objetivo_ms:
+                break
+            elegida = politica
+        return mediciones, elegida
+    if algoritmo == "pbkdf2":
+        # El tiempo de pbkdf2 es lineal en las iteraciones
+        base = Politica("pbkdf2", MINIMO_PBKDF2)
+        ms = medir(base, repeticiones)
+        mediciones.append((base, ms))
+        if ms > objetivo_ms:
+            return mediciones, None
+        iteraciones = int(MINIMO_PBKDF2 * objetivo_ms / ms) // 10_000 * 10_000
+        elegida = Politica("pbkdf2", max(MINIMO_PBKDF2, iteraciones))
+        mediciones.append((elegida, medir(elegida, repeticiones)))
+        return mediciones, elegida
+    raise ValueError(f"Algoritmo de hash no soportado: {algoritmo}")
+
+
+def describir(politica):
+    if politica.algoritmo == "scrypt":
+        return f"scrypt n=2^{politica.costo} ({2 ** politica.costo})"
+    return f"pbkdf2-sha256 {politica.costo:,} iteraciones".replace(",", ".")
+
@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify,
+                   Response, stream_with_context)
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
 from datetime import datetime
@@ -7,16 +8,55 @@ import json
 from ..extensions import db
 from ..models import User, Examen, Pregunta, Respuesta, ExamenResultado, Categoria
 from ..decorators import role_required
+from .. import analisis, bulk, export, grading, identidad, loaders, paginacion, stats, versiones
+from ..budget import query_budget
 
 profesor_bp = Blueprint("profesor", __name__, url_prefix="/profesor")
 
 
+@profesor_bp.errorhandler(versiones.VersionEnConflicto)
+def version_en_conflicto(error):
+    # Otra edición del mismo examen ganó la versión: no se guarda nada
+    db.session.rollback()
+    flash("El examen cambió mientras lo editabas. Revisa los cambios e inténtalo de nuevo",
+          "warning")
+    return redirect(url_for("profesor.lista_examenes"))
+
+
 @profesor_bp.route("/estudiantes")
+@query_budget(2)
 @login_required
 @role_required("profesor")
 def lista_estudiantes():
-    estudiantes = User.query.filter_by(role="estudiante").all()
-    return render_template("profesor/estudiantes.html", estudiantes=estudiantes)
+    filtro, pagina = paginacion.usuarios_de_peticion(request.args, rol="estudiante")
+    return render_template("profesor/estudiantes.html", estudiantes=pagina.items,
+                           filtro=filtro, pagina=pagina)
+
+
+@profesor_bp.route("/estudiantes/importar", methods=["GET", "POST"])
+@login_required
+@role_required("profesor")
+def importar_estudiantes():
+    if request.method == "POST":
+        archivo = request.files.get("archivo")
+        if not archivo or not archivo.filename:
+            flash("Selecciona un archivo CSV", "warning")
+            return render_template("profesor/importar_estudiantes.html")
+        
+        try:
+            filas, errores = bulk.leer_csv(archivo.stream)
+        except UnicodeDecodeError:
+            flash("El archivo debe estar codificado en UTF-8", "danger")
+            return render_template("profesor/importar_estudiantes.html")
+        
+        resultado = bulk.importar_estudiantes(filas)
+        errores += resultado.errores
+        flash(f"{resultado.creados} estudiante(s) importado(s)", "success" if resultado.creados else "info")
+        if errores:
+            flash(f"{len(errores)} fila(s) omitida(s)", "warning")
+        return render_template("profesor/importar_estudiantes.html", errores=errores)
+    
+    return render_template("profesor/importar_estudiantes.html")
 
 
 @profesor_bp.route("/estudiante/<int:id>/toggle", methods=["POST"])
@@ -30,6 +70,7 @@ def toggle_estudiante(id):
     
     estudiante.is_active = not estudiante.is_active
     db.session.commit()
+    identidad.invalidar(estudiante.id)
     estado = "activado" if estudiante.is_active else "desactivado"
     flash(f"Estudiante {estudiante.username} {estado}", "success")
     return redirect(url_for("profesor.lista_estudiantes"))
@@ -45,17 +86,24 @@ def eliminar_estudiante(id):
         return redirect(url_for("profesor.lista_estudiantes"))
     
     username = estudiante.username
+    profesores = stats.profesores_de_estudiante(estudiante.id)
     db.session.delete(estudiante)
+    for profesor_id in profesores:
+        stats.recalcular(profesor_id)
     db.session.commit()
+    identidad.invalidar(id)
     flash(f"Estudiante {username} eliminado", "success")
     return redirect(url_for("profesor.lista_estudiantes"))
 
 
 @profesor_bp.route("/examenes")
+@query_budget(2)
 @login_required
 @role_required("profesor")
 def lista_examenes():
-    examenes = Examen.query.filter_by(profesor_id=current_user.id).all()
+    examenes = Examen.query.options(*loaders.perfil("examenes_profesor")).filter_by(
+        profesor_id=current_user.id
+    ).all()
     return render_template("profesor/examenes.html", examenes=examenes)
 
 
@@ -129,6 +177,7 @@ def editar_examen(id):
         
         # Categoría
         categoria_id = request.form.get("categoria_id")
+        categoria_anterior = examen.categoria_id
         examen.categoria_id = int(categoria_id) if categoria_id else None
         
         # Duración y fecha límite
@@ -159,6 +208,10 @@ def editar_examen(id):
         examen.mostrar_respuestas = 'mostrar_respuestas' in request.form
         examen.barajar_preguntas = 'barajar_preguntas' in request.form
         
+        versiones.nueva_version(examen)
+        if examen.categoria_id != categoria_anterior:
+            # Las presentaciones ya acumuladas cambian de categoría en el reporte
+            stats.recalcular(current_user.id)
         db.session.commit()
         flash(f"Examen '{examen.titulo}' actualizado exitosamente", "success")
         return redirect(url_for("profesor.lista_examenes"))
@@ -180,28 +233,85 @@ def asignar_examen(id):
         return redirect(url_for("profesor.lista_examenes"))
     
     if request.method == "POST":
-        estudiante_ids = request.form.getlist("estudiantes")
-        
-        # Limpiar asignaciones previas
-        examen.estudiantes = []
-        
-        # Agregar nuevas asignaciones
-        for est_id in estudiante_ids:
-            estudiante = User.query.get(int(est_id))
-            if estudiante and estudiante.role == "estudiante":
-                examen.estudiantes.append(estudiante)
+        estudiante_ids = request.form.getlist("estudiantes", type=int)
         
+        # Diferencia de conjuntos contra las asignaciones actuales
+        resultado = bulk.sincronizar_asignaciones(examen.id, estudiante_ids)
         db.session.commit()
-        flash(f"Estudiantes asignados al examen '{examen.titulo}'", "success")
+        flash(f"Estudiantes asignados al examen '{examen.titulo}' "
+              f"(+{resultado.agregados} / -{resultado.eliminados})", "success")
         return redirect(url_for("profesor.lista_examenes"))
     
-    estudiantes = User.query.filter_by(role="estudiante", is_active=True).all()
-    asignados_ids = [e.id for e in examen.estudiantes.all()]
+    estudiantes = User.query.filter_by(role="estudiante", is_active=True).order_by(User.grupo, User.username).all()
+    asignados_ids = bulk.asignados(examen.id)
     
     return render_template("profesor/asignar_examen.html",
                          examen=examen,
                          estudiantes=estudiantes,
-                         asignados_ids=asignados_ids)
+                         asignados_ids=asignados_ids,
+                         grupos=bulk.grupos())
+
+
+@profesor_bp.route("/examen/<int:id>/asignar/grupo", methods=["POST"])
+@login_required
+@role_required("profesor")
+def asignar_examen_grupo(id):
+    examen = Examen.query.get_or_404(id)
+    
+    if examen.profesor_id != current_user.id:
+        flash("No tienes permiso para gestionar este examen", "danger")
+        return redirect(url_for("profesor.lista_examenes"))
+    
+    modo = request.form.get("modo", "agregar")
+    grupo = request.form.get("grupo", "").strip() or None
+    buscar = request.form.get("buscar", "").strip() or None
+    if modo not in ("agregar", "quitar"):
+        flash("Modo de asignación no válido", "warning")
+        return redirect(url_for("profesor.asignar_examen", id=id))
+    
+    try:
+        resultado = bulk.asignar_por_filtro(examen.id, modo, grupo=grupo, buscar=buscar)
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("profesor.asignar_examen", id=id))
+    db.session.commit()
+    flash(f"Asignación por filtro aplicada (+{resultado.agregados} / -{resultado.eliminados}, "
+          f"{resultado.total} asignados)", "success")
+    return redirect(url_for("profesor.asignar_examen", id=id))
+
+
+@profesor_bp.route("/api/examen/<int:id>/asignaciones", methods=["POST"])
+@login_required
+@role_required("profesor")
+def api_asignaciones(id):
+    """Asignación masiva en JSON.
+    
+    {"modo": "reemplazar|agregar|quitar", "estudiantes": [ids]}
+    o {"modo": "agregar|quitar", "grupo": "11A", "buscar": "texto"}
+    """
+    examen = Examen.query.get_or_404(id)
+    
+    if examen.profesor_id != current_user.id:
+        return jsonify({"error": "No autorizado"}), 403
+    
+    data = request.get_json(silent=True) or {}
+    modo = data.get("modo", "reemplazar" if "estudiantes" in data else "agregar")
+    try:
+        if "estudiantes" in data:
+            resultado = bulk.sincronizar_asignaciones(
+                examen.id, [int(e) for e in data["estudiantes"]], modo)
+        elif data.get("grupo") or data.get("buscar"):
+            if modo == "reemplazar":
+                raise ValueError("El modo reemplazar requiere la lista de estudiantes")
+            resultado = bulk.asignar_por_filtro(
+                examen.id, modo, grupo=data.get("grupo"), buscar=data.get("buscar"))
+        else:
+            raise ValueError("Indica 'estudiantes' o un filtro ('grupo' / 'buscar')")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    db.session.commit()
+    return jsonify(resultado._asdict())
 
 
 @profesor_bp.route("/examen/<int:id>/duplicar", methods=["POST"])
@@ -282,7 +392,9 @@ def eliminar_examen(id):
     
     titulo = examen.titulo
     db.session.delete(examen)
+    stats.recalcular(current_user.id)
     db.session.commit()
+    grading.discard_answer_key(id)
     flash(f"Examen '{titulo}' eliminado", "success")
     return redirect(url_for("profesor.lista_examenes"))
 
@@ -391,6 +503,7 @@ def crear_pregunta(id):
         )
         
         db.session.add(pregunta)
+        versiones.nueva_version(examen)
         db.session.commit()
         flash("Pregunta agregada exitosamente", "success")
         return redirect(url_for("profesor.gestionar_preguntas", id=id))
@@ -457,6 +570,7 @@ def editar_pregunta(id):
             pregunta.opciones = None
             pregunta.respuesta_correcta = request.form.get("respuesta_correcta", "")
         
+        versiones.nueva_version(examen)
         db.session.commit()
         flash("Pregunta actualizada exitosamente", "success")
         return redirect(url_for("profesor.gestionar_preguntas", id=examen.id))
@@ -478,6 +592,7 @@ def eliminar_pregunta(id):
     
     examen_id = pregunta.examen_id
     db.session.delete(pregunta)
+    versiones.nueva_version(examen)
     db.session.commit()
     flash("Pregunta eliminada", "success")
     return redirect(url_for("profesor.gestionar_preguntas", id=examen_id))
@@ -499,12 +614,14 @@ def publicar_examen(id):
         return redirect(url_for("profesor.gestionar_preguntas", id=id))
     
     examen.publicado = True
+    versiones.congelar(examen)
     db.session.commit()
     flash(f"Examen '{examen.titulo}' publicado correctamente", "success")
     return redirect(url_for("profesor.lista_examenes"))
 
 
 @profesor_bp.route("/examen/<int:id>/resultados")
+@query_budget(3)
 @login_required
 @role_required("profesor")
 def ver_resultados(id):
@@ -514,23 +631,85 @@ def ver_resultados(id):
         flash("No tienes permiso", "danger")
         return redirect(url_for("profesor.lista_examenes"))
     
-    resultados = ExamenResultado.query.filter_by(examen_id=id, completado=True).all()
+    pagina = paginacion.resultados_examen(
+        id, request.args.get("cursor"), paginacion.limite(request.args.get("limite")),
+        opciones=loaders.perfil("resultados_con_estudiante"))
     
-    # Estadísticas
-    if resultados:
-        promedio = sum([r.calificacion for r in resultados]) / len(resultados)
-        aprobados = len([r for r in resultados if r.calificacion >= 60])
-    else:
-        promedio = 0
-        aprobados = 0
+    # Estadísticas sobre todos los resultados, no solo la página
+    _, promedio, aprobados = paginacion.resumen_resultados_examen(id, examen.calificacion_minima)
     
     return render_template("profesor/resultados_examen.html",
                          examen=examen,
-                         resultados=resultados,
+                         resultados=pagina.items,
+                         pagina=pagina,
                          promedio=promedio,
                          aprobados=aprobados)
 
 
+@profesor_bp.route("/examen/<int:id>/analisis")
+@login_required
+@role_required("profesor")
+def analisis_examen(id):
+    examen = Examen.query.get_or_404(id)
+
+    if examen.profesor_id != current_user.id:
+        flash("No tienes permiso", "danger")
+        return redirect(url_for("profesor.lista_examenes"))
+
+    if not analisis.disponible():
+        flash("El análisis de preguntas requiere NumPy instalado en el servidor", "warning")
+        return redirect(url_for("profesor.ver_resultados", id=id))
+
+    return render_template("profesor/analisis_examen.html",
+                           examen=examen,
+                           analisis=analisis.analisis_examen(examen),
+                           umbral_discriminacion=analisis.DISCRIMINACION_BAJA)
+
+
+@profesor_bp.route("/examen/<int:id>/exportar/<any(resultados, respuestas):tipo>.csv")
+@login_required
+@role_required("profesor")
+def exportar_csv(id, tipo):
+    examen = Examen.query.get_or_404(id)
+    
+    if examen.profesor_id != current_user.id:
+        flash("No tienes permiso", "danger")
+        return redirect(url_for("profesor.lista_examenes"))
+    
+    if tipo == "resultados":
+        contenido = export.generar_csv(export.COLUMNAS_RESULTADOS, export.filas_resultados(id))
+    else:
+        contenido = export.generar_csv(export.COLUMNAS_RESPUESTAS, export.filas_respuestas(id))
+    
+    return Response(
+        stream_with_context(contenido),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=examen_{id}_{tipo}.csv"}
+    )
+
+
+@profesor_bp.route("/examen/<int:id>/exportar.xlsx")
+@login_required
+@role_required("profesor")
+def exportar_xlsx(id):
+    examen = Examen.query.get_or_404(id)
+    
+    if examen.profesor_id != current_user.id:
+        flash("No tienes permiso", "danger")
+        return redirect(url_for("profesor.lista_examenes"))
+    
+    contenido = export.generar_xlsx([
+        ("Resultados", export.COLUMNAS_RESULTADOS, lambda: export.filas_resultados(id)),
+        ("Respuestas", export.COLUMNAS_RESPUESTAS, lambda: export.filas_respuestas(id)),
+    ])
+    
+    return Response(
+        stream_with_context(contenido),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename=examen_{id}.xlsx"}
+    )
+
+
 # FASE 1 - Comentarios del Profesor: Ver detalle de resultado
 @profesor_bp.route("/examen/resultado/<int:id>")
 @login_required
@@ -0,0 +1,100 @@
+"""
+Capa de acceso a datos para las vistas de estudiante.
+
+Cada función resuelve con una sola consulta lo que antes eran N+1 consultas
+por examen asignado.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload
+
+from .extensions import db
+from .models import Examen, ExamenResultado, Pregunta, estudiante_examen
+
+DIAS_POR_VENCER = 3
+
+
+def examenes_asignados_con_resultado(estudiante_id):
+    """Exámenes asignados al estudiante con su último resultado (o None).
+
+    Una sola consulta: asignaciones + examen + categoría + número de preguntas
+    + último resultado, unidos con outer join.
+    Devuelve una lista de (examen, resultado, num_preguntas).
+    """
+    ultimo = select(
+        ExamenResultado.examen_id.label("examen_id"),
+        func.max(ExamenResultado.id).label("resultado_id")
+    ).where(
+        ExamenResultado.estudiante_id == estudiante_id
+    ).group_by(ExamenResultado.examen_id).subquery()
+
+    num_preguntas = select(
+        func.count(Pregunta.id)
+    ).where(
+        Pregunta.examen_id == Examen.id
+    ).correlate(Examen).scalar_subquery()
+
+    resultado = aliased(ExamenResultado)
+    filas = db.session.query(
+        Examen, resultado, num_preguntas.label("num_preguntas")
+    ).join(
+        estudiante_examen, estudiante_examen.c.examen_id == Examen.id
+    ).outerjoin(
+        ultimo, ultimo.c.examen_id == Examen.id
+    ).outerjoin(
+        resultado, resultado.id == ultimo.c.resultado_id
+    ).options(
+        joinedload(Examen.categoria)
+    ).filter(
+        estudiante_examen.c.estudiante_id == estudiante_id
+    ).order_by(estudiante_examen.c.asignado_en, Examen.id).all()
+
+    return [tuple(fila) for fila in filas]
+
+
+def clasificar_examenes(filas, hoy=None):
+    """Clasificar en una sola pasada cada examen asignado según su estado."""
+    hoy = hoy or datetime.now()
+    examenes_info = []
+    for examen, resultado, num_preguntas in filas:
+        fecha_limite = examen.fecha_limite
+        if resultado and resultado.completado:
+            estado = "completado"
+        elif resultado:
+            estado = "en_curso"
+        elif fecha_limite and fecha_limite < hoy:
+            estado = "vencido"
+        elif fecha_limite and (fecha_limite - hoy).days <= DIAS_POR_VENCER:
+            estado = "por_vencer"
+        else:
+            estado = "disponible"
+
+        examenes_info.append({
+            'examen': examen,
+            'estado': estado,
+            'resultado': resultado,
+            'num_preguntas': num_preguntas,
+            'fecha_completado': resultado.fecha_presentacion if (
+                resultado and resultado.completado) else None,
+            'dias_restantes': (fecha_limite - hoy).days if (
+                fecha_limite and fecha_limite > hoy) else None
+        })
+    return examenes_info
+
+
+def examenes_estudiante(estudiante_id, hoy=None):
+    """Listado clasificado de los exámenes asignados al estudiante."""
+    return clasificar_examenes(examenes_asignados_con_resultado(estudiante_id), hoy)
+
+
+def resumen_resultados_estudiante(estudiante_id):
+    """(total, promedio) de los resultados del estudiante en una consulta."""
+    total, promedio = db.session.query(
+        func.count(ExamenResultado.id),
+        func.avg(ExamenResultado.calificacion)
+    ).filter(
+        ExamenResultado.estudiante_id == estudiante_id,
+        ExamenResultado.completado == True
+    ).one()
+    return total, promedio or 0
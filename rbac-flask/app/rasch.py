@@ -0,0 +1,142 @@
+"""
+Modelo de Rasch para puntajes escalados estilo ICFES.
+
+En el modelo de Rasch la probabilidad de acertar una pregunta de dificultad b
+con habilidad θ es 1 / (1 + e^(b - θ)), y el número de aciertos es estadístico
+suficiente de θ: dos estudiantes con los mismos aciertos en el mismo examen
+tienen la misma habilidad estimada. De ahí salen las dos mitades del módulo:
+
+- `ajustar` (fuera de línea, con NumPy): estima las dificultades por máxima
+  verosimilitud conjunta. Como θ solo depende del puntaje bruto, las
+  iteraciones trabajan sobre los grupos de puntaje (matrices k × k) y no sobre
+  la matriz de estudiantes: el costo por iteración no crece con la cohorte.
+- `tabla_puntajes` (Python puro): a partir de las dificultades precalcula el
+  puntaje escalado de cada número de aciertos, una vez por versión de la clave
+  de respuestas. Calificar un envío es contar aciertos y leer la tabla.
+
+Las preguntas sin calibrar usan una dificultad a priori según
+Pregunta.nivel_dificultad. La escala es la de las pruebas del ICFES: media 50,
+desviación 10, acotada a 0-100.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+# Dificultad a priori (en logits) de las preguntas aún no calibradas
+DIFICULTAD_PREVIA = {"basico": -1.0, "intermedio": 0.0, "avanzado": 1.0}
+
+ESCALA_MEDIA = 50
+ESCALA_DESVIACION = 10
+ESCALA_MAXIMA = 100
+
+# Los puntajes extremos (0 o todos los aciertos) no tienen θ finito: se estiman
+# como si les faltara o sobrara media respuesta
+AJUSTE_EXTREMOS = 0.5
+
+
+def dificultad_previa(nivel):
+    return DIFICULTAD_PREVIA.get(nivel, 0.0)
+
+
+# ============= CALIBRACIÓN =============
+
+def ajustar(aciertos, iteraciones=100, tolerancia=1e-4):
+    """Dificultades de Rasch por máxima verosimilitud conjunta (JML).
+
+    `aciertos` es la matriz estudiantes × preguntas de 0/1. Los estudiantes
+    con puntaje nulo o perfecto no informan sobre las dificultades y se
+    excluyen; a las preguntas que nadie (o todos) acertó se les asigna una
+    dificultad un logit por encima (o por debajo) del resto. Las dificultades
+    quedan centradas en 0 y con la corrección de sesgo (k - 1) / k de JML.
+
+    Devuelve (dificultades, estudiantes usados, iteraciones, convergió).
+    """
+    x = np.asarray(aciertos, dtype=np.int8)
+    n, k = x.shape
+    items = np.ones(k, dtype=bool)
+    personas = np.ones(n, dtype=bool)
+    # Quitar extremos hasta que no cambie nada (normalmente una o dos pasadas)
+    while True:
+        brutos = x[:, items].sum(axis=1, dtype=np.int64)
+        nuevas = personas & (brutos > 0) & (brutos < items.sum())
+        aciertos_item = x[nuevas].sum(axis=0, dtype=np.int64)
+        nuevos = items & (aciertos_item > 0) & (aciertos_item < nuevas.sum())
+        if (nuevas == personas).all() and (nuevos == items).all():
+            break
+        personas, items = nuevas, nuevos
+    m, k_util = int(personas.sum()), int(items.sum())
+    if k_util < 2 or m == 0:
+        raise ValueError("No hay suficientes respuestas no extremas para calibrar")
+
+    s = aciertos_item[items].astype(np.float64)
+    # Estudiantes por puntaje bruto 1..k_util-1: todos los del grupo comparten θ
+    grupos = np.bincount(brutos[personas], minlength=k_util + 1)[1:k_util].astype(np.float64)
+    puntajes = np.arange(1, k_util, dtype=np.float64)
+    theta = np.log(puntajes / (k_util - puntajes))
+    b = -np.log(s / (m - s))
+    b -= b.mean()
+
+    convergio = False
+    for iteracion in range(1, iteraciones + 1):
+        p = 1.0 / (1.0 + np.exp(b[None, :] - theta[:, None]))
+        w = p * (1.0 - p)
+        paso_theta = np.clip((puntajes - p.sum(axis=1)) / w.sum(axis=1), -1.0, 1.0)
+        theta = theta + paso_theta
+
+        p = 1.0 / (1.0 + np.exp(b[None, :] - theta[:, None]))
+        w = p * (1.0 - p)
+        paso_b = np.clip((s - grupos @ p) / (grupos @ w), -1.0, 1.0)
+        b = b - paso_b
+        b -= b.mean()
+
+        if max(np.abs(paso_theta).max(), np.abs(paso_b).max()) < tolerancia:
+            convergio = True
+            break
+    b *= (k_util - 1) / k_util
+
+    dificultades = np.empty(k, dtype=np.float64)
+    dificultades[items] = b
+    nadie = ~items & (aciertos_item == 0)
+    dificultades[nadie] = b.max() + 1.0
+    dificultades[~items & ~nadie] = b.min() - 1.0
+    return dificultades, m, iteracion, convergio
+
+
+# ============= PUNTAJES =============
+
+def escalar(theta):
+    """Puntaje entero en la escala 0-100 a partir de la habilidad en logits."""
+    puntaje = ESCALA_MEDIA + ESCALA_DESVIACION * theta
+    return int(round(min(ESCALA_MAXIMA, max(0.0, puntaje))))
+
+
+def tabla_theta(dificultades):
+    """Habilidad estimada (logits) para cada número de aciertos 0..k."""
+    k = len(dificultades)
+    tabla = []
+    theta = 0.0
+    for bruto in range(k + 1):
+        objetivo = min(max(bruto, AJUSTE_EXTREMOS), k - AJUSTE_EXTREMOS)
+        # Newton sobre Σ P_i(θ) = objetivo, arrancando del θ del puntaje anterior
+        for _ in range(50):
+            esperado = informacion = 0.0
+            for b in dificultades:
+                p = 1.0 / (1.0 + math.exp(b - theta))
+                esperado += p
+                informacion += p * (1.0 - p)
+            paso = max(-1.0, min(1.0, (objetivo - esperado) / informacion))
+            theta += paso
+            if abs(paso) < 1e-6:
+                break
+        tabla.append(theta)
+    return tuple(tabla)
+
+
+def tabla_puntajes(dificultades):
+    """Puntaje escalado para cada número de aciertos 0..k (vacía si k = 0)."""
+    if not dificultades:
+        return ()
+    return tuple(escalar(theta) for theta in tabla_theta(dificultades))
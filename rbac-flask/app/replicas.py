@@ -0,0 +1,85 @@
+"""
+Lecturas desde una réplica para las vistas de solo lectura.
+
+Con DB_REPLICA_URL configurada, create_app registra el bind "replica" en
+SQLALCHEMY_BINDS. Las vistas marcadas con @lee_de_replica mandan sus SELECT a
+la réplica; todo lo demás va a la primaria:
+
+- escrituras (flush, INSERT/UPDATE/DELETE) y SQL textual,
+- cualquier lectura posterior a una escritura dentro de la misma petición,
+- las peticiones de un usuario que escribió hace menos de DB_REPLICA_STICKY_SECONDS,
+  para que vea sus propios cambios aunque la réplica vaya atrasada.
+
+Para probar en local, DB_REPLICA_URL puede ser otro archivo SQLite y
+`flask db-sync-replica` copia la primaria sobre él.
+"""
+import sqlite3
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+from sqlalchemy.engine import make_url
+
+BIND = "replica"
+_CLAVE_SESION = "_primaria_hasta"
+
+
+def lee_de_replica(f):
+    """Mandar a la réplica las lecturas de la vista (si hay réplica configurada)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g._replica = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+class RoutingSession(Session):
+    """Session de Flask-SQLAlchemy que elige primaria o réplica por sentencia."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or not isinstance(clause, Select):
+                g._replica_escritura = True
+            elif g.get("_replica") and not g.get("_replica_escritura") and not _reciente():
+                replica = self._db.engines.get(BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _reciente():
+    hasta = session.get(_CLAVE_SESION)
+    return hasta is not None and hasta > time.time()
+
+
+def _recordar_escritura(response):
+    if g.get("_replica_escritura"):
+        session[_CLAVE_SESION] = time.time() + current_app.config.get(
+            "DB_REPLICA_STICKY_SECONDS", 5)
+    return response
+
+
+def binds(config, opciones):
+    """SQLALCHEMY_BINDS con la réplica agregada (si hay DB_REPLICA_URL)."""
+    binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+    url = config.get("DB_REPLICA_URL")
+    if url and BIND not in binds:
+        binds[BIND] = dict(opciones(url, config), url=url)
+    return binds
+
+
+def sincronizar(primaria, replica):
+    """Copiar una base SQLite sobre otra (sustituto local de la replicación)."""
+    origen = make_url(primaria)
+    destino = make_url(replica)
+    if origen.get_backend_name() != "sqlite" or destino.get_backend_name() != "sqlite":
+        raise ValueError("La sincronización local solo funciona entre archivos SQLite")
+    with sqlite3.connect(origen.database) as fuente, sqlite3.connect(destino.database) as copia:
+        fuente.backup(copia)
+
+
+def init_app(app):
+    if BIND in (app.config.get("SQLALCHEMY_BINDS") or {}):
+        app.after_request(_recordar_escritura)
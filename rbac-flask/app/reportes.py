@@ -0,0 +1,330 @@
+"""
+Motor del reporte de exámenes del profesor.
+
+Las presentaciones se acumulan en ReporteMensual (profesor x mes x categoría,
+con la distribución por rangos ya binned) y en ExamenStats (por examen). Los
+rollups se actualizan en cada envío y se reconstruyen junto con las
+estadísticas del profesor (app/stats.py), que también dan el progreso de cada
+estudiante. Ninguna sección del reporte recorre el historial de resultados. El
+reporte completo se guarda en caché por profesor y marca de agua (última
+presentación + versión de sus exámenes).
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, case, delete, desc, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from .cache import LRUCache
+from .extensions import db
+from .models import (User, Examen, ExamenResultado, ExamenStats, Categoria, ReporteMensual,
+                     ProfesorStats, ProfesorEstudianteStats)
+
+RANGOS = ("excelente", "bueno", "aceptable", "insuficiente")
+MESES_TENDENCIA = 6
+
+CategoriaStats = namedtuple(
+    "CategoriaStats", "nombre icono total_examenes total_presentaciones promedio_calificacion")
+MesStats = namedtuple("MesStats", "mes total promedio")
+
+_reportes = LRUCache(maxsize=128)
+
+
+# ============= BUCKETING PORTABLE =============
+
+class mes_de(FunctionElement):
+    """'YYYY-MM' de una fecha, compilado según el dialecto."""
+    type = String()
+    inherit_cache = True
+
+
+@compiles(mes_de)
+def _mes_de_default(element, compiler, **kw):
+    return "SUBSTR(CAST(%s AS VARCHAR(32)), 1, 7)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(mes_de, "sqlite")
+def _mes_de_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m', %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(mes_de, "mysql")
+@compiles(mes_de, "mariadb")
+def _mes_de_mysql(element, compiler, **kw):
+    return "DATE_FORMAT(%s, '%%Y-%%m')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(mes_de, "postgresql")
+def _mes_de_postgresql(element, compiler, **kw):
+    return "to_char(%s, 'YYYY-MM')" % compiler.process(element.clauses, **kw)
+
+
+def rango(calificacion):
+    """Rango de una calificación (acepta la escala antigua 0-100 y la 0-5)."""
+    if calificacion > 5.0:
+        cortes = (90, 70, 60)
+    else:
+        cortes = (4.5, 3.5, 3.0)
+    if calificacion >= cortes[0]:
+        return "excelente"
+    if calificacion >= cortes[1]:
+        return "bueno"
+    if calificacion >= cortes[2]:
+        return "aceptable"
+    return "insuficiente"
+
+
+def _rango_sql(columna):
+    """Mismo binning que `rango`, como expresión CASE."""
+    return case(
+        (columna > 5.0, case(
+            (columna >= 90, "excelente"),
+            (columna >= 70, "bueno"),
+            (columna >= 60, "aceptable"),
+            else_="insuficiente")),
+        (columna >= 4.5, "excelente"),
+        (columna >= 3.5, "bueno"),
+        (columna >= 3.0, "aceptable"),
+        else_="insuficiente"
+    )
+
+
+# ============= MANTENIMIENTO DEL ROLLUP =============
+
+def _sumar_examen(examen_id, calificacion):
+    incremento = update(ExamenStats).where(ExamenStats.examen_id == examen_id).values(
+        total_presentaciones=ExamenStats.total_presentaciones + 1,
+        suma_calificaciones=ExamenStats.suma_calificaciones + calificacion,
+    ).execution_options(synchronize_session=False)
+
+    if db.session.execute(incremento).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ExamenStats).values(
+                examen_id=examen_id, total_presentaciones=1, suma_calificaciones=calificacion))
+    except IntegrityError:
+        # Otra petición creó la fila al mismo tiempo
+        db.session.execute(incremento)
+
+
+def registrar_resultado(examen, calificacion, fecha):
+    """Sumar una presentación al rollup mensual y al del examen (sin hacer commit)."""
+    _sumar_examen(examen.id, calificacion)
+    clave = (
+        ReporteMensual.profesor_id == examen.profesor_id,
+        ReporteMensual.mes == fecha.strftime("%Y-%m"),
+        ReporteMensual.categoria_id == (examen.categoria_id or 0),
+    )
+    bucket = rango(calificacion)
+    incremento = update(ReporteMensual).where(*clave).values({
+        "total": ReporteMensual.total + 1,
+        "suma_calificaciones": ReporteMensual.suma_calificaciones + calificacion,
+        bucket: getattr(ReporteMensual, bucket) + 1,
+    }).execution_options(synchronize_session=False)
+
+    if db.session.execute(incremento).rowcount:
+        return
+    fila = {r: 0 for r in RANGOS}
+    fila.update({
+        "profesor_id": examen.profesor_id,
+        "mes": fecha.strftime("%Y-%m"),
+        "categoria_id": examen.categoria_id or 0,
+        "total": 1,
+        "suma_calificaciones": calificacion,
+        bucket: 1,
+    })
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ReporteMensual).values(fila))
+    except IntegrityError:
+        # Otra petición creó la fila al mismo tiempo
+        db.session.execute(incremento)
+
+
+def recalcular(profesor_id=None, sesion=None):
+    """Reconstruir los rollups mensual y por examen desde cero (sin hacer commit).
+
+    La agrupación por mes, categoría y rango se hace en SQL.
+    """
+    sesion = sesion or db.session
+    filtros = [ExamenResultado.completado == True]
+    if profesor_id is not None:
+        filtros.append(Examen.profesor_id == profesor_id)
+        sesion.execute(delete(ReporteMensual).where(
+            ReporteMensual.profesor_id == profesor_id))
+        sesion.execute(delete(ExamenStats).where(ExamenStats.examen_id.in_(
+            select(Examen.id).where(Examen.profesor_id == profesor_id))))
+    else:
+        sesion.execute(delete(ReporteMensual))
+        sesion.execute(delete(ExamenStats))
+
+    sesion.execute(insert(ExamenStats).from_select(
+        ["examen_id", "total_presentaciones", "suma_calificaciones"],
+        select(
+            ExamenResultado.examen_id,
+            func.count(ExamenResultado.id),
+            func.coalesce(func.sum(ExamenResultado.calificacion), 0),
+        ).join(
+            Examen, ExamenResultado.examen_id == Examen.id
+        ).where(*filtros).group_by(ExamenResultado.examen_id)
+    ))
+
+    mes = mes_de(func.coalesce(ExamenResultado.fecha_presentacion, ExamenResultado.fecha_inicio))
+    bucket = _rango_sql(ExamenResultado.calificacion)
+    filas = sesion.query(
+        Examen.profesor_id,
+        mes.label("mes"),
+        func.coalesce(Examen.categoria_id, 0).label("categoria_id"),
+        bucket.label("rango"),
+        func.count(ExamenResultado.id),
+        func.sum(ExamenResultado.calificacion),
+    ).join(
+        Examen, ExamenResultado.examen_id == Examen.id
+    ).filter(*filtros).group_by(
+        Examen.profesor_id, mes, func.coalesce(Examen.categoria_id, 0), bucket
+    ).all()
+
+    rollup = {}
+    for pid, mes_valor, categoria_id, rango_valor, total, suma in filas:
+        fila = rollup.setdefault((pid, mes_valor, categoria_id), dict(
+            {r: 0 for r in RANGOS},
+            profesor_id=pid, mes=mes_valor, categoria_id=categoria_id,
+            total=0, suma_calificaciones=0.0,
+        ))
+        fila["total"] += total
+        fila["suma_calificaciones"] += suma or 0
+        fila[rango_valor] += total
+
+    if rollup:
+        sesion.execute(insert(ReporteMensual), list(rollup.values()))
+    return len(rollup)
+
+
+# ============= LECTURA =============
+
+def _marca_de_agua(profesor_id):
+    """Cambia con cada presentación y con cada alta, baja o edición de exámenes
+    (una consulta)."""
+    def de_stats(columna):
+        return select(columna).where(
+            ProfesorStats.profesor_id == profesor_id).scalar_subquery()
+
+    total_examenes, suma_versiones, total_resultados, actualizado_en = db.session.query(
+        func.count(Examen.id),
+        func.coalesce(func.sum(Examen.version), 0),
+        de_stats(ProfesorStats.total_resultados),
+        de_stats(ProfesorStats.actualizado_en),
+    ).filter(Examen.profesor_id == profesor_id).one()
+    return (total_resultados, actualizado_en, total_examenes, suma_versiones)
+
+
+def _construir(profesor_id, total_examenes, hoy):
+    rollup = db.session.query(ReporteMensual).filter(
+        ReporteMensual.profesor_id == profesor_id
+    ).all()
+
+    rangos = {r: 0 for r in RANGOS}
+    por_categoria = {}
+    por_mes = {}
+    total_presentaciones = 0
+    for fila in rollup:
+        total_presentaciones += fila.total
+        for r in RANGOS:
+            rangos[r] += getattr(fila, r)
+        cat = por_categoria.setdefault(fila.categoria_id, [0, 0.0])
+        cat[0] += fila.total
+        cat[1] += fila.suma_calificaciones
+        mes = por_mes.setdefault(fila.mes, [0, 0.0])
+        mes[0] += fila.total
+        mes[1] += fila.suma_calificaciones
+
+    # Categorías con exámenes del profesor
+    examenes_por_categoria = db.session.query(
+        Categoria.id, Categoria.nombre, Categoria.icono, func.count(Examen.id)
+    ).join(
+        Examen, Categoria.id == Examen.categoria_id
+    ).filter(
+        Examen.profesor_id == profesor_id
+    ).group_by(Categoria.id, Categoria.nombre, Categoria.icono).all()
+
+    stats_por_categoria = []
+    for cid, nombre, icono, num_examenes in examenes_por_categoria:
+        total, suma = por_categoria.get(cid, (0, 0.0))
+        stats_por_categoria.append(CategoriaStats(
+            nombre=nombre,
+            icono=icono,
+            total_examenes=num_examenes,
+            total_presentaciones=total,
+            promedio_calificacion=(suma / total) if total else None,
+        ))
+
+    desde = (hoy - timedelta(days=30 * MESES_TENDENCIA)).strftime("%Y-%m")
+    tendencia_mensual = [
+        MesStats(mes=mes, total=total, promedio=(suma / total) if total else None)
+        for mes, (total, suma) in sorted(por_mes.items()) if mes >= desde
+    ]
+
+    # Progreso de estudiantes (Top 20), desde las estadísticas del profesor
+    promedio_estudiante = (ProfesorEstudianteStats.suma_calificaciones /
+                           ProfesorEstudianteStats.total_resultados)
+    progreso_estudiantes = db.session.query(
+        User.id,
+        User.username,
+        User.email,
+        ProfesorEstudianteStats.total_resultados.label('examenes_presentados'),
+        promedio_estudiante.label('promedio'),
+        ProfesorEstudianteStats.calificacion_maxima.label('mejor_nota'),
+        ProfesorEstudianteStats.calificacion_minima.label('peor_nota'),
+    ).select_from(ProfesorEstudianteStats).join(
+        User, User.id == ProfesorEstudianteStats.estudiante_id
+    ).filter(
+        ProfesorEstudianteStats.profesor_id == profesor_id,
+        ProfesorEstudianteStats.total_resultados > 0
+    ).order_by(
+        desc(promedio_estudiante)
+    ).limit(20).all()
+
+    # Exámenes con más presentaciones, desde el rollup por examen
+    num_presentaciones = func.coalesce(ExamenStats.total_presentaciones, 0)
+    examenes_populares = db.session.query(
+        Examen.id,
+        Examen.titulo,
+        Categoria.nombre.label('categoria_nombre'),
+        Categoria.icono.label('categoria_icono'),
+        num_presentaciones.label('num_presentaciones'),
+        (ExamenStats.suma_calificaciones /
+         func.nullif(ExamenStats.total_presentaciones, 0)).label('promedio')
+    ).outerjoin(
+        ExamenStats, Examen.id == ExamenStats.examen_id
+    ).outerjoin(
+        Categoria, Examen.categoria_id == Categoria.id
+    ).filter(
+        Examen.profesor_id == profesor_id
+    ).order_by(
+        desc(num_presentaciones)
+    ).limit(10).all()
+
+    return {
+        "total_examenes": total_examenes,
+        "total_presentaciones": total_presentaciones,
+        "stats_por_categoria": stats_por_categoria,
+        "progreso_estudiantes": progreso_estudiantes,
+        "examenes_populares": examenes_populares,
+        "rangos": rangos,
+        "tendencia_mensual": tendencia_mensual,
+    }
+
+
+def reporte_profesor(profesor_id, hoy=None):
+    """Contexto del reporte de exámenes, servido desde caché mientras no haya
+    nuevas presentaciones ni cambios en los exámenes del profesor."""
+    hoy = hoy or datetime.now()
+    marca = _marca_de_agua(profesor_id)
+    return _reportes.get_or_set(
+        (profesor_id, hoy.strftime("%Y-%m"), marca),
+        lambda: _construir(profesor_id, marca[2], hoy)
+    )
+
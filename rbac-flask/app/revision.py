@@ -0,0 +1,117 @@
+"""
+Modelo de revisión de un resultado (estudiante/detalle_resultado.html).
+
+Las preguntas salen del contenido de la versión del examen que presentó el
+estudiante (versiones.py) y sus respuestas de una sola consulta; se arman en
+una lista lista para pintar: opciones ya decodificadas, respuesta elegida y
+estado de cada pregunta. La plantilla solo itera.
+
+Si el examen baraja preguntas, la revisión muestra el orden que vio el
+estudiante (reconstruido desde su semilla, ver formularios.py).
+
+Un resultado completado no cambia y la versión congelada tampoco, así que la
+revisión se guarda en caché por (resultado, versión del examen).
+"""
+from collections import namedtuple
+
+from . import formularios, versiones
+from .cache import LRUCache
+from .extensions import db
+from .models import Respuesta
+
+LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+OpcionRevision = namedtuple("OpcionRevision", "etiqueta texto correcta elegida")
+PreguntaRevision = namedtuple(
+    "PreguntaRevision",
+    "numero texto tipo nivel_dificultad explicacion estado respuesta_texto opciones")
+
+_revisiones = LRUCache(maxsize=512)
+
+
+def _opciones(pregunta, elegida, semilla=None):
+    opciones = pregunta["opciones"]
+    if pregunta["tipo"] == "opcion_multiple":
+        orden = (formularios.orden_opciones(semilla, pregunta["id"], len(opciones))
+                 if semilla else range(len(opciones)))
+        # La etiqueta sigue la posición en pantalla; elegida compara el índice original
+        return tuple(
+            OpcionRevision(
+                etiqueta=f"{LETRAS[posicion]})" if posicion < len(LETRAS) else f"{posicion + 1})",
+                texto=opciones[i],
+                correcta=pregunta["correcta"] == i,
+                elegida=elegida == i,
+            )
+            for posicion, i in enumerate(orden)
+        )
+    if pregunta["tipo"] == "verdadero_falso":
+        return tuple(
+            OpcionRevision(
+                etiqueta=etiqueta,
+                texto=texto,
+                correcta=pregunta["correcta"] == i,
+                elegida=elegida == i,
+            )
+            for i, (etiqueta, texto) in enumerate(zip(("✓", "✗"), opciones))
+        )
+    return ()
+
+
+def version_de(resultado):
+    """Versión del examen que presentó el estudiante.
+
+    Los resultados anteriores a examen_version se revisan con la actual.
+    """
+    return resultado.examen_version or resultado.examen.version
+
+
+def construir(resultado):
+    """Lista de PreguntaRevision del resultado (contenido de la versión + una consulta)."""
+    preguntas = {p["id"]: p
+                 for p in versiones.contenido(resultado.examen_id, version_de(resultado))["preguntas"]}
+    # Si hay varias respuestas a la misma pregunta se toma la primera
+    respuestas = {}
+    for pregunta_id, *respuesta in db.session.query(
+        Respuesta.pregunta_id, Respuesta.respuesta_texto, Respuesta.opcion_indice,
+        Respuesta.es_correcta
+    ).filter(
+        Respuesta.examen_id == resultado.examen_id,
+        Respuesta.estudiante_id == resultado.estudiante_id,
+    ).order_by(Respuesta.id):
+        respuestas.setdefault(pregunta_id, respuesta)
+
+    semilla = (formularios.semilla(resultado.examen_id, resultado.estudiante_id)
+               if resultado.examen.barajar_preguntas else None)
+    orden = formularios.orden_preguntas(semilla, preguntas) if semilla else preguntas
+
+    revision = []
+    for pregunta_id in orden:
+        pregunta = preguntas[pregunta_id]
+        respuesta_texto, opcion_indice, es_correcta = respuestas.get(pregunta_id, (None, None, None))
+        if pregunta_id not in respuestas:
+            estado = "sin_responder"
+        elif es_correcta:
+            estado = "correcta"
+        else:
+            estado = "incorrecta"
+        revision.append(PreguntaRevision(
+            numero=len(revision) + 1,
+            texto=pregunta["texto"],
+            tipo=pregunta["tipo"],
+            nivel_dificultad=pregunta["nivel_dificultad"],
+            explicacion=pregunta["explicacion"],
+            estado=estado,
+            respuesta_texto=respuesta_texto,
+            opciones=_opciones(pregunta, opcion_indice, semilla),
+        ))
+    return tuple(revision)
+
+
+def revision_resultado(resultado):
+    """Revisión del resultado, desde caché si ya está completado."""
+    if not resultado.completado:
+        return construir(resultado)
+    return _revisiones.get_or_set(
+        (resultado.id, version_de(resultado), resultado.examen.barajar_preguntas),
+        lambda: construir(resultado)
+    )
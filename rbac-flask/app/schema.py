@@ -0,0 +1,691 @@
+"""
+Gestión del esquema de base de datos.
+
+Reemplaza los scripts sueltos de migración (migrate_config.py, migrate_icfes.py,
+migrate_comentarios.py, fix_columns.py, ...) por una lista versionada de pasos
+que se ejecuta una sola vez al arrancar la aplicación o desde la CLI
+(`flask db-upgrade`). La versión aplicada se guarda en la tabla `schema_version`,
+así que las peticiones HTTP ya no ejecutan DDL ni reflexión de metadatos.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData,
+                        String, Table, Text, bindparam, inspect, text)
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+MIGRATIONS = []
+
+
+def migration(version, nombre):
+    """Registrar una función como paso de migración con número de versión."""
+    def decorator(fn):
+        MIGRATIONS.append((version, nombre, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+# ============= HELPERS =============
+
+def _columnas(conn, tabla):
+    return {col["name"] for col in inspect(conn).get_columns(tabla)}
+
+
+def _agregar_columnas(conn, tabla, columnas):
+    """Agregar las columnas que falten en `tabla` (idempotente)."""
+    existentes = _columnas(conn, tabla)
+    agregadas = []
+    for columna, ddl in columnas.items():
+        if columna not in existentes:
+            conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {ddl}"))
+            agregadas.append(columna)
+    return agregadas
+
+
+def _crear_tabla(conn, nombre, *columnas, referencias=()):
+    """Crear `nombre` si no existe, con la definición escrita en la migración.
+
+    Las migraciones no usan los modelos: un modelo cambia con el tiempo y la
+    migración debe crear siempre la tabla tal como era en su versión.
+    `referencias` son las tablas a las que apuntan sus claves foráneas.
+    """
+    metadata = MetaData()
+    if referencias:
+        metadata.reflect(conn, only=list(referencias))
+    Table(nombre, metadata, *columnas).create(conn, checkfirst=True)
+
+
+def _crear_indice(conn, tabla, nombre, *columnas):
+    """Crear el índice `nombre` sobre `tabla` si no existe (idempotente)."""
+    if nombre not in {indice["name"] for indice in inspect(conn).get_indexes(tabla)}:
+        conn.execute(text(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)})"))
+
+
+# ============= ESQUEMA BASE (congelado) =============
+# Tablas tal como las definían los modelos antes de las migraciones versionadas.
+# Las columnas e índices posteriores los agrega cada migración.
+
+_BASE = MetaData()
+
+Table(
+    "users", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("email", String(120), unique=True, nullable=False, index=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("role", String(20), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "categorias", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(100), nullable=False, unique=True),
+    Column("descripcion", Text),
+    Column("color", String(7)),
+    Column("icono", String(50)),
+    Column("activo", Boolean),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "examenes", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("titulo", String(200), nullable=False),
+    Column("descripcion", Text),
+    Column("fecha_creacion", DateTime),
+    Column("duracion_minutos", Integer),
+    Column("fecha_limite", DateTime),
+    Column("publicado", Boolean),
+    Column("profesor_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("categoria_id", Integer, ForeignKey("categorias.id")),
+    Column("intentos_maximos", Integer),
+    Column("mostrar_respuestas", Boolean),
+    Column("barajar_preguntas", Boolean),
+    Column("calificacion_minima", Float),
+)
+
+Table(
+    "estudiante_examen", _BASE,
+    Column("estudiante_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("examen_id", Integer, ForeignKey("examenes.id"), primary_key=True),
+    Column("asignado_en", DateTime),
+)
+
+Table(
+    "preguntas", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("examen_id", Integer, ForeignKey("examenes.id"), nullable=False),
+    Column("texto", Text, nullable=False),
+    Column("tipo", String(20), nullable=False),
+    Column("opciones", Text),
+    Column("respuesta_correcta", Text),
+    Column("puntos", Integer),
+    Column("orden", Integer),
+    Column("nivel_dificultad", String(20)),
+    Column("tiempo_estimado", Integer),
+    Column("explicacion", Text),
+    Column("imagen_url", String(255)),
+)
+
+Table(
+    "respuestas", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("examen_id", Integer, ForeignKey("examenes.id"), nullable=False),
+    Column("estudiante_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("pregunta_id", Integer, ForeignKey("preguntas.id"), nullable=False),
+    Column("respuesta_texto", Text),
+    Column("es_correcta", Boolean),
+    Column("puntos_obtenidos", Float),
+    Column("fecha_respuesta", DateTime),
+)
+
+Table(
+    "examenes_resultados", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("examen_id", Integer, ForeignKey("examenes.id"), nullable=False),
+    Column("estudiante_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("calificacion", Float),
+    Column("total_puntos", Float),
+    Column("fecha_inicio", DateTime),
+    Column("fecha_fin", DateTime),
+    Column("completado", Boolean),
+    Column("tiempo_utilizado", Integer),
+    Column("comentario_profesor", Text),
+    Column("recomendaciones", Text),
+    Column("fecha_presentacion", DateTime),
+    Column("es_modo_practica", Boolean),
+    Column("solicitud_revision", Boolean),
+    Column("revision_completada", Boolean),
+    Column("fecha_solicitud_revision", DateTime),
+)
+
+Table(
+    "notificaciones", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("titulo", String(200), nullable=False),
+    Column("mensaje", Text, nullable=False),
+    Column("tipo", String(50)),
+    Column("leida", Boolean),
+    Column("fecha_creacion", DateTime),
+    Column("url_destino", String(255)),
+)
+
+Table(
+    "certificados", _BASE,
+    Column("id", Integer, primary_key=True),
+    Column("estudiante_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("examen_id", Integer, ForeignKey("examenes.id"), nullable=False),
+    Column("resultado_id", Integer, ForeignKey("examenes_resultados.id"), nullable=False),
+    Column("codigo_verificacion", String(100), unique=True, nullable=False),
+    Column("fecha_emision", DateTime),
+    Column("calificacion", Float, nullable=False),
+    Column("archivo_pdf", String(255)),
+)
+
+
+# ============= MIGRACIONES =============
+
+@migration(1, "esquema_base")
+def _m001_esquema_base(conn):
+    # Crea las tablas base que falten (antes migrate_db.py y
+    # migrate_fase2_fase3.py). No altera tablas existentes.
+    _BASE.create_all(conn, checkfirst=True)
+
+
+@migration(2, "configuracion_examenes")
+def _m002_configuracion_examenes(conn):
+    # Antes migrate_config.py y fix_columns.py
+    _agregar_columnas(conn, "examenes", {
+        "duracion_minutos": "INTEGER DEFAULT 60",
+        "fecha_limite": "DATETIME",
+        "publicado": "BOOLEAN DEFAULT 0",
+        "intentos_maximos": "INTEGER DEFAULT 1",
+        "mostrar_respuestas": "BOOLEAN DEFAULT 1",
+        "barajar_preguntas": "BOOLEAN DEFAULT 0",
+        "calificacion_minima": "FLOAT DEFAULT 60.0",
+        "categoria_id": "INTEGER",
+    })
+
+
+@migration(3, "icfes")
+def _m003_icfes(conn):
+    # Antes migrate_icfes.py
+    _agregar_columnas(conn, "preguntas", {
+        "nivel_dificultad": "VARCHAR(20) DEFAULT 'basico'",
+        "tiempo_estimado": "INTEGER DEFAULT 60",
+        "explicacion": "TEXT",
+        "imagen_url": "VARCHAR(255)",
+    })
+
+    categorias_default = [
+        ("Matemáticas", "Razonamiento matemático y cuantitativo", "#1976d2", "🔢"),
+        ("Lectura Crítica", "Comprensión lectora y análisis textual", "#388e3c", "📖"),
+        ("Ciencias Naturales", "Biología, Física y Química", "#7b1fa2", "🔬"),
+        ("Ciencias Sociales", "Historia, Geografía y Política", "#f57c00", "🌍"),
+        ("Inglés", "Comprensión y uso del idioma inglés", "#0097a7", "🌐"),
+        ("General", "Conocimientos generales y misceláneos", "#00695c", "📚"),
+    ]
+    existentes = {row[0] for row in conn.execute(text("SELECT nombre FROM categorias"))}
+    for nombre, desc, color, icono in categorias_default:
+        if nombre not in existentes:
+            conn.execute(text("""
+                INSERT INTO categorias (nombre, descripcion, color, icono, activo, created_at)
+                VALUES (:nombre, :desc, :color, :icono, :activo, :created_at)
+            """), {"nombre": nombre, "desc": desc, "color": color, "icono": icono,
+                   "activo": True, "created_at": datetime.utcnow()})
+
+
+@migration(4, "comentarios_profesor")
+def _m004_comentarios_profesor(conn):
+    # Antes migrate_comentarios.py
+    agregadas = _agregar_columnas(conn, "examenes_resultados", {
+        "comentario_profesor": "TEXT",
+        "recomendaciones": "TEXT",
+        "fecha_presentacion": "DATETIME",
+    })
+    if "fecha_presentacion" in agregadas:
+        conn.execute(text("""
+            UPDATE examenes_resultados
+            SET fecha_presentacion = fecha_fin
+            WHERE fecha_fin IS NOT NULL
+        """))
+
+
+@migration(5, "campos_estudiante")
+def _m005_campos_estudiante(conn):
+    # Antes migrate_estudiante_fields.py
+    _agregar_columnas(conn, "respuestas", {
+        "es_correcta": "BOOLEAN DEFAULT 0",
+    })
+    _agregar_columnas(conn, "examenes_resultados", {
+        "tiempo_utilizado": "INTEGER DEFAULT 0",
+    })
+
+
+@migration(6, "modo_practica_revision")
+def _m006_modo_practica_revision(conn):
+    # Antes add_new_columns.py
+    _agregar_columnas(conn, "examenes_resultados", {
+        "es_modo_practica": "BOOLEAN DEFAULT 0",
+        "solicitud_revision": "BOOLEAN DEFAULT 0",
+        "revision_completada": "BOOLEAN DEFAULT 0",
+        "fecha_solicitud_revision": "DATETIME",
+    })
+
+
+@migration(7, "version_examen")
+def _m007_version_examen(conn):
+    _agregar_columnas(conn, "examenes", {
+        "version": "INTEGER NOT NULL DEFAULT 1",
+    })
+
+
+@migration(8, "indices_compuestos")
+def _m008_indices_compuestos(conn):
+    _crear_indice(conn, "examenes", "ix_examenes_profesor_fecha", "profesor_id", "fecha_creacion")
+    _crear_indice(conn, "respuestas", "ix_respuestas_examen_estudiante",
+                  "examen_id", "estudiante_id")
+    _crear_indice(conn, "examenes_resultados", "ix_resultados_estudiante_examen",
+                  "estudiante_id", "examen_id")
+    _crear_indice(conn, "examenes_resultados", "ix_resultados_examen_completado",
+                  "examen_id", "completado")
+    _crear_indice(conn, "examenes_resultados", "ix_resultados_fecha_presentacion",
+                  "fecha_presentacion")
+    _crear_indice(conn, "notificaciones", "ix_notificaciones_usuario_leida_fecha",
+                  "usuario_id", "leida", "fecha_creacion")
+
+
+@migration(9, "estadisticas_profesor")
+def _m009_estadisticas_profesor(conn):
+    # Se llenan en la migración 16 (y con `flask rebuild-stats`)
+    _crear_tabla(
+        conn, "profesor_stats",
+        Column("profesor_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("total_resultados", Integer, nullable=False),
+        Column("suma_calificaciones", Float, nullable=False),
+        Column("calificacion_maxima", Float),
+        Column("calificacion_minima", Float),
+        Column("actualizado_en", DateTime),
+        referencias=("users",),
+    )
+    _crear_tabla(
+        conn, "profesor_estudiante_stats",
+        Column("profesor_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("estudiante_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("total_resultados", Integer, nullable=False),
+        Column("suma_normalizada", Float, nullable=False),
+        referencias=("users",),
+    )
+
+
+@migration(10, "reporte_mensual")
+def _m010_reporte_mensual(conn):
+    _crear_tabla(
+        conn, "reporte_mensual",
+        Column("profesor_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("mes", String(7), primary_key=True),
+        Column("categoria_id", Integer, primary_key=True),
+        Column("total", Integer, nullable=False),
+        Column("suma_calificaciones", Float, nullable=False),
+        Column("excelente", Integer, nullable=False),
+        Column("bueno", Integer, nullable=False),
+        Column("aceptable", Integer, nullable=False),
+        Column("insuficiente", Integer, nullable=False),
+        referencias=("users",),
+    )
+    # Estadísticas y rollups se reconstruyen juntos (migración 16)
+    conn.execute(text("DELETE FROM profesor_estudiante_stats"))
+    conn.execute(text("DELETE FROM profesor_stats"))
+
+
+@migration(11, "grupo_estudiante")
+def _m011_grupo_estudiante(conn):
+    _agregar_columnas(conn, "users", {
+        "grupo": "VARCHAR(50)",
+    })
+    _crear_indice(conn, "users", "ix_users_grupo", "grupo")
+
+
+@migration(12, "indice_usuarios_rol")
+def _m012_indice_usuarios_rol(conn):
+    # Listado de usuarios filtrado por rol y paginado por username
+    _crear_indice(conn, "users", "ix_users_role_username", "role", "username")
+
+
+# Copias congeladas de grading.py tal como estaban en la migración 13: la
+# migración no debe cambiar de resultado si grading.py cambia después
+_V13_TIPOS_CON_OPCIONES = ("opcion_multiple", "verdadero_falso")
+_V13_OPCIONES_VF = ("Verdadero", "Falso")
+
+
+def _v13_opciones_de(tipo, opciones):
+    if tipo == "verdadero_falso":
+        return _V13_OPCIONES_VF
+    if tipo == "opcion_multiple":
+        try:
+            opciones = json.loads(opciones) if opciones else []
+        except (ValueError, TypeError):
+            return ()
+        return tuple(opt.get("texto") if isinstance(opt, dict) else opt for opt in opciones)
+    return ()
+
+
+@migration(13, "opcion_indice_respuestas")
+def _m013_opcion_indice_respuestas(conn, lote=5000):
+    # Las respuestas a preguntas con opciones pasan de repetir el texto de la
+    # opción a guardar su índice. Se recorre la tabla una vez, por lotes de id.
+    _agregar_columnas(conn, "respuestas", {
+        "opcion_indice": "SMALLINT",
+    })
+    indices = {
+        pregunta_id: {texto: i for i, texto in reversed(list(enumerate(_v13_opciones_de(tipo, opciones))))}
+        for pregunta_id, tipo, opciones in conn.execute(text(
+            "SELECT id, tipo, opciones FROM preguntas WHERE tipo IN :tipos"
+        ).bindparams(bindparam("tipos", expanding=True)), {"tipos": list(_V13_TIPOS_CON_OPCIONES)})
+    }
+    ultimo = 0
+    while indices:
+        filas = conn.execute(text("""
+            SELECT id, pregunta_id, respuesta_texto FROM respuestas
+            WHERE id > :ultimo AND respuesta_texto IS NOT NULL
+            ORDER BY id LIMIT :lote
+        """), {"ultimo": ultimo, "lote": lote}).all()
+        if not filas:
+            break
+        ultimo = filas[-1][0]
+        # En blanco queda sin opción elegida; un texto que no coincide con
+        # ninguna opción (la pregunta se editó después) se conserva tal cual
+        cambios = [
+            {"id": rid, "indice": indices[pregunta_id].get(texto)}
+            for rid, pregunta_id, texto in filas
+            if pregunta_id in indices and (texto in indices[pregunta_id] or texto == "")
+        ]
+        if cambios:
+            conn.execute(text(
+                "UPDATE respuestas SET opcion_indice = :indice, respuesta_texto = NULL WHERE id = :id"
+            ), cambios)
+
+
+@migration(14, "calibracion_rasch")
+def _m014_calibracion_rasch(conn):
+    _agregar_columnas(conn, "preguntas", {
+        "rasch_dificultad": "FLOAT",
+    })
+    _agregar_columnas(conn, "examenes", {
+        "calibrado_en": "DATETIME",
+        "calibrado_con": "INTEGER",
+    })
+    _agregar_columnas(conn, "examenes_resultados", {
+        "puntaje_escalado": "INTEGER",
+    })
+
+
+# Formato del contenido congelado tal como lo escribía versiones.py en la
+# migración 15 (filas en el orden de `columnas`)
+def _v15_correcta(tipo, opciones, respuesta_correcta):
+    if tipo == "opcion_multiple":
+        try:
+            opciones = json.loads(opciones) if opciones else []
+        except (ValueError, TypeError):
+            return None
+        return next((i for i, opt in enumerate(opciones)
+                     if (opt.get("correcta") if isinstance(opt, dict) else opt == respuesta_correcta)),
+                    None)
+    if tipo == "verdadero_falso":
+        return (_V13_OPCIONES_VF.index(respuesta_correcta)
+                if respuesta_correcta in _V13_OPCIONES_VF else None)
+    return None
+
+
+def _v15_contenido(filas):
+    return {"preguntas": [
+        {
+            "id": pid,
+            "texto": texto,
+            "tipo": tipo,
+            "opciones": list(_v13_opciones_de(tipo, opciones)),
+            "correcta": _v15_correcta(tipo, opciones, correcta),
+            "puntos": puntos,
+            "imagen_url": imagen_url,
+            "explicacion": explicacion,
+            "nivel_dificultad": nivel,
+            "rasch_dificultad": calibrada,
+        }
+        for (pid, texto, tipo, opciones, correcta, puntos, imagen_url, explicacion,
+             nivel, calibrada) in filas
+    ]}
+
+
+@migration(15, "versiones_examen")
+def _m015_versiones_examen(conn):
+    # Los exámenes ya publicados se congelan en su versión actual
+    _crear_tabla(
+        conn, "examenes_versiones",
+        Column("examen_id", Integer, ForeignKey("examenes.id"), primary_key=True),
+        Column("version", Integer, primary_key=True),
+        Column("contenido", Text(length=16777215), nullable=False),
+        Column("publicado_en", DateTime),
+        referencias=("examenes",),
+    )
+    _agregar_columnas(conn, "examenes_resultados", {
+        "examen_version": "INTEGER",
+    })
+    # Mismo orden que _v15_contenido
+    columnas = ("id, texto, tipo, opciones, respuesta_correcta, puntos, imagen_url, "
+                "explicacion, nivel_dificultad, rasch_dificultad")
+    publicados = conn.execute(text("SELECT id, version FROM examenes WHERE publicado = :si"),
+                              {"si": True}).all()
+    for examen_id, version in publicados:
+        filas = conn.execute(text(
+            f"SELECT {columnas} FROM preguntas WHERE examen_id = :examen ORDER BY orden, id"
+        ), {"examen": examen_id}).all()
+        conn.execute(text("""
+            INSERT INTO examenes_versiones (examen_id, version, contenido, publicado_en)
+            VALUES (:examen, :version, :contenido, :ahora)
+        """), {"examen": examen_id, "version": version or 1, "ahora": datetime.utcnow(),
+               "contenido": json.dumps(_v15_contenido(filas), ensure_ascii=False,
+                                       separators=(",", ":"))})
+
+
+# Rangos de calificación de reportes.py en la migración 16 (escala 0-100 y 0-5)
+_V16_RANGOS = ("excelente", "bueno", "aceptable", "insuficiente")
+
+
+def _v16_rango(calificacion):
+    cortes = (90, 70, 60) if calificacion > 5.0 else (4.5, 3.5, 3.0)
+    for nombre, corte in zip(_V16_RANGOS, cortes):
+        if calificacion >= corte:
+            return nombre
+    return "insuficiente"
+
+
+@migration(16, "estadisticas_iniciales")
+def _m016_estadisticas_iniciales(conn):
+    # Construir estadísticas y rollups de todos los profesores de una vez (con
+    # fila vacía para los que no tienen resultados): el dashboard solo lee.
+    # Mismo cálculo que stats.recalcular, sobre las tablas de esta versión.
+    ahora = datetime.now()
+    profesores = {}
+    estudiantes = {}
+    rollup = {}
+    resultados = conn.execute(text("""
+        SELECT e.profesor_id, COALESCE(e.categoria_id, 0), r.estudiante_id, r.calificacion,
+               COALESCE(r.fecha_presentacion, r.fecha_inicio)
+        FROM examenes_resultados r JOIN examenes e ON e.id = r.examen_id
+        WHERE r.completado = :si
+    """), {"si": True})
+    for profesor_id, categoria_id, estudiante_id, calificacion, fecha in resultados:
+        stats = profesores.setdefault(profesor_id, {
+            "profesor_id": profesor_id, "total": 0, "suma": 0.0,
+            "maxima": None, "minima": None, "ahora": ahora,
+        })
+        estudiante = estudiantes.setdefault((profesor_id, estudiante_id), {
+            "profesor_id": profesor_id, "estudiante_id": estudiante_id,
+            "total": 0, "suma": 0.0,
+        })
+        # SQLite devuelve las fechas como texto; MySQL como datetime
+        mes = str(fecha)[:7]
+        fila = rollup.setdefault((profesor_id, mes, categoria_id), dict(
+            {r: 0 for r in _V16_RANGOS},
+            profesor_id=profesor_id, mes=mes, categoria_id=categoria_id, total=0, suma=0.0,
+        ))
+        stats["total"] += 1
+        estudiante["total"] += 1
+        fila["total"] += 1
+        fila[_v16_rango(calificacion or 0)] += 1
+        if calificacion is None:
+            continue
+        stats["suma"] += calificacion
+        if stats["maxima"] is None or calificacion > stats["maxima"]:
+            stats["maxima"] = calificacion
+        if stats["minima"] is None or calificacion < stats["minima"]:
+            stats["minima"] = calificacion
+        estudiante["suma"] += calificacion / 20.0 if calificacion > 5.0 else calificacion
+        fila["suma"] += calificacion
+
+    for (profesor_id,) in conn.execute(text("SELECT id FROM users WHERE role = 'profesor'")):
+        profesores.setdefault(profesor_id, {
+            "profesor_id": profesor_id, "total": 0, "suma": 0.0,
+            "maxima": None, "minima": None, "ahora": ahora,
+        })
+
+    conn.execute(text("DELETE FROM reporte_mensual"))
+    conn.execute(text("DELETE FROM profesor_estudiante_stats"))
+    conn.execute(text("DELETE FROM profesor_stats"))
+    if profesores:
+        conn.execute(text("""
+            INSERT INTO profesor_stats (profesor_id, total_resultados, suma_calificaciones,
+                                        calificacion_maxima, calificacion_minima, actualizado_en)
+            VALUES (:profesor_id, :total, :suma, :maxima, :minima, :ahora)
+        """), list(profesores.values()))
+    if estudiantes:
+        conn.execute(text("""
+            INSERT INTO profesor_estudiante_stats (profesor_id, estudiante_id,
+                                                   total_resultados, suma_normalizada)
+            VALUES (:profesor_id, :estudiante_id, :total, :suma)
+        """), list(estudiantes.values()))
+    if rollup:
+        conn.execute(text("""
+            INSERT INTO reporte_mensual (profesor_id, mes, categoria_id, total,
+                                         suma_calificaciones, excelente, bueno,
+                                         aceptable, insuficiente)
+            VALUES (:profesor_id, :mes, :categoria_id, :total, :suma, :excelente, :bueno,
+                    :aceptable, :insuficiente)
+        """), list(rollup.values()))
+
+
+@migration(17, "estadisticas_reporte")
+def _m017_estadisticas_reporte(conn):
+    # El progreso de estudiantes y los exámenes populares del reporte salen de
+    # estas tablas en lugar del historial de resultados
+    _agregar_columnas(conn, "profesor_estudiante_stats", {
+        "suma_calificaciones": "FLOAT NOT NULL DEFAULT 0",
+        "calificacion_maxima": "FLOAT",
+        "calificacion_minima": "FLOAT",
+    })
+    _crear_tabla(
+        conn, "examenes_stats",
+        Column("examen_id", Integer, ForeignKey("examenes.id"), primary_key=True),
+        Column("total_presentaciones", Integer, nullable=False),
+        Column("suma_calificaciones", Float, nullable=False),
+        referencias=("examenes",),
+    )
+
+    por_estudiante = conn.execute(text("""
+        SELECT e.profesor_id, r.estudiante_id, COALESCE(SUM(r.calificacion), 0),
+               MAX(r.calificacion), MIN(r.calificacion)
+        FROM examenes_resultados r JOIN examenes e ON e.id = r.examen_id
+        WHERE r.completado = :si
+        GROUP BY e.profesor_id, r.estudiante_id
+    """), {"si": True}).all()
+    if por_estudiante:
+        conn.execute(text("""
+            UPDATE profesor_estudiante_stats
+            SET suma_calificaciones = :suma, calificacion_maxima = :maxima,
+                calificacion_minima = :minima
+            WHERE profesor_id = :profesor AND estudiante_id = :estudiante
+        """), [{"profesor": profesor, "estudiante": estudiante, "suma": suma,
+                "maxima": maxima, "minima": minima}
+               for profesor, estudiante, suma, maxima, minima in por_estudiante])
+
+    conn.execute(text("DELETE FROM examenes_stats"))
+    conn.execute(text("""
+        INSERT INTO examenes_stats (examen_id, total_presentaciones, suma_calificaciones)
+        SELECT examen_id, COUNT(id), COALESCE(SUM(calificacion), 0)
+        FROM examenes_resultados
+        WHERE completado = :si
+        GROUP BY examen_id
+    """), {"si": True})
+
+
+# ============= RUNNER =============
+
+def _asegurar_tabla_version(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INTEGER NOT NULL PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            aplicada_en DATETIME NOT NULL
+        )
+    """))
+
+
+def current_version(engine=None):
+    """Versión de esquema aplicada (0 si la base de datos es nueva)."""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        _asegurar_tabla_version(conn)
+        version = conn.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+    return version or 0
+
+
+def head_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def pending(engine=None):
+    actual = current_version(engine)
+    return [(v, nombre) for v, nombre, _ in MIGRATIONS if v > actual]
+
+
+def upgrade(engine=None, echo=None):
+    """Aplicar las migraciones pendientes, cada una en su propia transacción.
+
+    Devuelve la lista de (version, nombre) aplicadas.
+    """
+    engine = engine or db.engine
+    actual = current_version(engine)
+    aplicadas = []
+    for version, nombre, fn in MIGRATIONS:
+        if version <= actual:
+            continue
+        try:
+            with engine.begin() as conn:
+                fn(conn)
+                conn.execute(text(f"""
+                    INSERT INTO {SCHEMA_VERSION_TABLE} (version, nombre, aplicada_en)
+                    VALUES (:version, :nombre, :aplicada_en)
+                """), {"version": version, "nombre": nombre, "aplicada_en": datetime.utcnow()})
+        except IntegrityError:
+            # Otro worker aplicó la misma versión al mismo tiempo
+            continue
+        aplicadas.append((version, nombre))
+        if echo:
+            echo(f"✅ Migración {version:03d} {nombre} aplicada")
+    return aplicadas
+
+
+def init_app(app):
+    """Ejecutar las migraciones pendientes una sola vez al crear la aplicación."""
+    if not app.config.get("SCHEMA_AUTO_UPGRADE", True):
+        return
+    with app.app_context():
+        upgrade()
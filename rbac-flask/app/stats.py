@@ -0,0 +1,224 @@
+"""
+Estadísticas materializadas por profesor.
+
+El dashboard del profesor lee ProfesorStats / ProfesorEstudianteStats en lugar
+de recorrer todo su historial de resultados. Cada envío de examen actualiza las
+filas con UPDATE atómicos dentro de la misma transacción; `flask rebuild-stats`
+(o `recalcular`) las reconstruye desde cero. Las lecturas nunca escriben.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from . import reportes
+from .extensions import db
+from .models import (User, Examen, ExamenResultado, ProfesorStats,
+                     ProfesorEstudianteStats)
+
+Rendimiento = namedtuple("Rendimiento", "promedio maxima minima total")
+
+UMBRAL_BAJO_RENDIMIENTO = 3.0  # escala 0-5
+
+
+def normalizar(calificacion):
+    """Llevar calificaciones de la escala antigua 0-100 a la escala 0-5."""
+    return calificacion / 20.0 if calificacion > 5.0 else calificacion
+
+
+def _actualizar(profesor_id, estudiante_id, calificacion):
+    ahora = datetime.now()
+    maxima = ProfesorStats.calificacion_maxima
+    minima = ProfesorStats.calificacion_minima
+    filas = db.session.execute(update(ProfesorStats).where(
+        ProfesorStats.profesor_id == profesor_id
+    ).values(
+        total_resultados=ProfesorStats.total_resultados + 1,
+        suma_calificaciones=ProfesorStats.suma_calificaciones + calificacion,
+        calificacion_maxima=case(
+            (maxima.is_(None) | (maxima < calificacion), calificacion), else_=maxima),
+        calificacion_minima=case(
+            (minima.is_(None) | (minima > calificacion), calificacion), else_=minima),
+        actualizado_en=ahora,
+    ).execution_options(synchronize_session=False)).rowcount
+    if not filas:
+        return False
+
+    maxima = ProfesorEstudianteStats.calificacion_maxima
+    minima = ProfesorEstudianteStats.calificacion_minima
+    incremento_estudiante = update(ProfesorEstudianteStats).where(
+        ProfesorEstudianteStats.profesor_id == profesor_id,
+        ProfesorEstudianteStats.estudiante_id == estudiante_id
+    ).values(
+        total_resultados=ProfesorEstudianteStats.total_resultados + 1,
+        suma_normalizada=ProfesorEstudianteStats.suma_normalizada + normalizar(calificacion),
+        suma_calificaciones=ProfesorEstudianteStats.suma_calificaciones + calificacion,
+        calificacion_maxima=case(
+            (maxima.is_(None) | (maxima < calificacion), calificacion), else_=maxima),
+        calificacion_minima=case(
+            (minima.is_(None) | (minima > calificacion), calificacion), else_=minima),
+    ).execution_options(synchronize_session=False)
+    filas = db.session.execute(incremento_estudiante).rowcount
+    if not filas:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(ProfesorEstudianteStats).values(
+                    profesor_id=profesor_id,
+                    estudiante_id=estudiante_id,
+                    total_resultados=1,
+                    suma_normalizada=normalizar(calificacion),
+                    suma_calificaciones=calificacion,
+                    calificacion_maxima=calificacion,
+                    calificacion_minima=calificacion,
+                ))
+        except IntegrityError:
+            # Otra petición creó la fila al mismo tiempo
+            db.session.execute(incremento_estudiante)
+    return True
+
+
+def registrar_resultado(profesor_id, estudiante_id, calificacion):
+    """Sumar un resultado completado a las estadísticas (sin hacer commit).
+
+    Devuelve False si en lugar de incrementar se reconstruyó todo desde cero
+    (en ese caso el rollup del reporte también quedó reconstruido).
+    """
+    if _actualizar(profesor_id, estudiante_id, calificacion):
+        return True
+    try:
+        # Primer resultado del profesor desde el último rebuild: calcular desde
+        # cero (el resultado recién agregado se incluye por autoflush)
+        with db.session.begin_nested():
+            recalcular(profesor_id)
+    except IntegrityError:
+        # Otra petición creó las filas al mismo tiempo: aplicar como incremento
+        return _actualizar(profesor_id, estudiante_id, calificacion)
+    return False
+
+
+def recalcular(profesor_id=None, sesion=None):
+    """Reconstruir las estadísticas de un profesor (o de todos) desde cero,
+    junto con el rollup del reporte de exámenes.
+
+    Sin profesor_id también deja una fila vacía para cada profesor sin
+    resultados. No hace commit. Devuelve el número de profesores recalculados.
+    `sesion` permite ejecutarlo desde una migración (por defecto db.session).
+    """
+    sesion = sesion or db.session
+    reportes.recalcular(profesor_id, sesion)
+
+    filtro_stats = []
+    filtro_resultados = [ExamenResultado.completado == True]
+    if profesor_id is not None:
+        filtro_stats.append(ProfesorStats.profesor_id == profesor_id)
+        filtro_resultados.append(Examen.profesor_id == profesor_id)
+
+    sesion.execute(delete(ProfesorStats).where(*filtro_stats))
+    sesion.execute(delete(ProfesorEstudianteStats).where(*[
+        ProfesorEstudianteStats.profesor_id == profesor_id
+    ] if profesor_id is not None else []))
+
+    calificacion_normalizada = case(
+        (ExamenResultado.calificacion > 5.0, ExamenResultado.calificacion / 20.0),
+        else_=ExamenResultado.calificacion
+    )
+    por_estudiante = sesion.query(
+        Examen.profesor_id,
+        ExamenResultado.estudiante_id,
+        func.count(ExamenResultado.id),
+        func.sum(ExamenResultado.calificacion),
+        func.max(ExamenResultado.calificacion),
+        func.min(ExamenResultado.calificacion),
+        func.sum(calificacion_normalizada),
+    ).join(
+        Examen, ExamenResultado.examen_id == Examen.id
+    ).filter(*filtro_resultados).group_by(
+        Examen.profesor_id, ExamenResultado.estudiante_id
+    ).all()
+
+    ahora = datetime.now()
+    profesores = {}
+    filas_estudiante = []
+    for pid, eid, total, suma, maxima, minima, suma_norm in por_estudiante:
+        stats = profesores.setdefault(pid, {
+            "profesor_id": pid, "total_resultados": 0, "suma_calificaciones": 0.0,
+            "calificacion_maxima": None, "calificacion_minima": None,
+            "actualizado_en": ahora,
+        })
+        stats["total_resultados"] += total
+        stats["suma_calificaciones"] += suma or 0
+        if maxima is not None and (stats["calificacion_maxima"] is None
+                                   or maxima > stats["calificacion_maxima"]):
+            stats["calificacion_maxima"] = maxima
+        if minima is not None and (stats["calificacion_minima"] is None
+                                   or minima < stats["calificacion_minima"]):
+            stats["calificacion_minima"] = minima
+        filas_estudiante.append({
+            "profesor_id": pid, "estudiante_id": eid,
+            "total_resultados": total, "suma_normalizada": suma_norm or 0,
+            "suma_calificaciones": suma or 0,
+            "calificacion_maxima": maxima, "calificacion_minima": minima,
+        })
+
+    # Fila vacía para los profesores sin resultados: su ausencia significa
+    # "sin construir" y el primer envío la reconstruye (registrar_resultado)
+    if profesor_id is not None:
+        sin_resultados = [profesor_id]
+    else:
+        sin_resultados = [uid for (uid,) in sesion.query(User.id).filter(User.role == "profesor")]
+    for pid in sin_resultados:
+        profesores.setdefault(pid, {
+            "profesor_id": pid, "total_resultados": 0, "suma_calificaciones": 0.0,
+            "calificacion_maxima": None, "calificacion_minima": None,
+            "actualizado_en": ahora,
+        })
+
+    if profesores:
+        sesion.execute(insert(ProfesorStats), list(profesores.values()))
+    if filas_estudiante:
+        sesion.execute(insert(ProfesorEstudianteStats), filas_estudiante)
+    return len(profesores)
+
+
+def rendimiento(profesor_id):
+    """Promedio, máxima, mínima y total de resultados del profesor (lectura O(1)).
+
+    Solo lee: las filas se crean al escribir (registrar_resultado, la
+    migración 16 y `flask rebuild-stats`). Sin fila, el profesor aún no
+    tiene resultados.
+    """
+    stats = db.session.get(ProfesorStats, profesor_id)
+    if stats is None:
+        return Rendimiento(promedio=None, maxima=None, minima=None, total=0)
+    return Rendimiento(
+        promedio=stats.promedio,
+        maxima=stats.calificacion_maxima,
+        minima=stats.calificacion_minima,
+        total=stats.total_resultados,
+    )
+
+
+def estudiantes_bajo_rendimiento(profesor_id, limite=5):
+    """Estudiantes con promedio normalizado inferior al umbral (escala 0-5)."""
+    promedio = (ProfesorEstudianteStats.suma_normalizada /
+                ProfesorEstudianteStats.total_resultados).label('promedio')
+    return db.session.query(
+        User.id,
+        User.username,
+        promedio
+    ).select_from(ProfesorEstudianteStats).join(
+        User, User.id == ProfesorEstudianteStats.estudiante_id
+    ).filter(
+        ProfesorEstudianteStats.profesor_id == profesor_id,
+        ProfesorEstudianteStats.total_resultados > 0,
+        ProfesorEstudianteStats.suma_normalizada <
+        UMBRAL_BAJO_RENDIMIENTO * ProfesorEstudianteStats.total_resultados
+    ).limit(limite).all()
+
+
+def profesores_de_estudiante(estudiante_id):
+    """IDs de los profesores con resultados del estudiante."""
+    return [pid for (pid,) in db.session.query(ProfesorEstudianteStats.profesor_id).filter(
+        ProfesorEstudianteStats.estudiante_id == estudiante_id
+    ).all()]
@@ -0,0 +1,140 @@
+"""
+Versiones publicadas de los exámenes.
+
+Al publicar un examen, su contenido se congela en una fila de
+examenes_versiones por (examen_id, version). La fila es un solo JSON con las
+preguntas en orden, las opciones ya decodificadas, el índice de la opción
+correcta, los puntos y la dificultad. Presentar el examen (formularios.py),
+calificarlo (grading.py) y revisarlo (revision.py) leen esa fila por clave
+primaria, o la copia ya compilada en memoria, en vez de las preguntas.
+
+Editar un examen publicado sube Examen.version y congela la nueva versión en
+la misma transacción (`nueva_version`). Las filas congeladas no cambian
+nunca. Cada intento guarda la versión con la que empezó
+(ExamenResultado.examen_version) y se presenta, califica y revisa contra
+ella aunque el examen se edite mientras tanto.
+
+Los borradores sin publicar no tienen fila: su contenido se lee de las
+preguntas con la misma forma (`serializar`).
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from . import grading
+from .cache import LRUCache
+from .extensions import db
+from .models import ExamenVersion, Pregunta
+
+COLUMNAS = (
+    Pregunta.id, Pregunta.texto, Pregunta.tipo, Pregunta.opciones, Pregunta.respuesta_correcta,
+    Pregunta.puntos, Pregunta.imagen_url, Pregunta.explicacion, Pregunta.nivel_dificultad,
+    Pregunta.rasch_dificultad,
+)
+
+_contenidos = LRUCache(maxsize=256)
+
+
+class VersionEnConflicto(ValueError):
+    """La versión ya está congelada con otro contenido."""
+
+
+def contenido_de(filas):
+    """Contenido de una versión a partir de las filas de sus preguntas (COLUMNAS, en orden)."""
+    return {"preguntas": [
+        {
+            "id": pid,
+            "texto": texto,
+            "tipo": tipo,
+            "opciones": list(grading.opciones_de(tipo, opciones)),
+            "correcta": grading.respuesta_correcta(tipo, opciones, correcta),
+            "puntos": puntos,
+            "imagen_url": imagen_url,
+            "explicacion": explicacion,
+            "nivel_dificultad": nivel,
+            "rasch_dificultad": calibrada,
+        }
+        for (pid, texto, tipo, opciones, correcta, puntos, imagen_url, explicacion,
+             nivel, calibrada) in filas
+    ]}
+
+
+def serializar(examen_id, bloquear=False):
+    """Contenido actual del examen, leído de sus preguntas (una consulta).
+
+    Con `bloquear` la lectura es con bloqueo compartido: ve lo último
+    confirmado aunque la transacción ya tenga una instantánea anterior.
+    """
+    consulta = select(*COLUMNAS).where(
+        Pregunta.examen_id == examen_id).order_by(Pregunta.orden, Pregunta.id)
+    if bloquear:
+        consulta = consulta.with_for_update(read=True)
+    return contenido_de(db.session.execute(consulta).all())
+
+
+def congelado(examen_id, version):
+    """Contenido congelado de (examen, versión), o None si esa versión no se publicó."""
+    blob = db.session.execute(select(ExamenVersion.contenido).where(
+        ExamenVersion.examen_id == examen_id,
+        ExamenVersion.version == version,
+    )).scalar()
+    return json.loads(blob) if blob is not None else None
+
+
+def contenido(examen_id, version):
+    """Contenido de la versión: el congelado si existe, si no el de las preguntas.
+
+    Se guarda en caché por (examen_id, version): toda edición sube la versión,
+    así que el contenido de una versión no cambia (la misma regla que sigue
+    la caché de claves de respuestas).
+    """
+    if version is None:
+        return serializar(examen_id)
+    return _contenidos.get_or_set(
+        (examen_id, version),
+        lambda: congelado(examen_id, version) or serializar(examen_id)
+    )
+
+
+def congelar(examen):
+    """Congelar la versión actual del examen (sin commit).
+
+    Devuelve False si ya estaba congelada con el mismo contenido; si lo está
+    con otro, lanza VersionEnConflicto (la versión no corresponde a una sola
+    edición y la vista debe deshacer la transacción).
+    """
+    actual = serializar(examen.id, bloquear=True)
+    blob = db.session.execute(select(ExamenVersion.contenido).where(
+        ExamenVersion.examen_id == examen.id,
+        ExamenVersion.version == examen.version,
+    )).scalar()
+    if blob is not None:
+        if json.loads(blob) != actual:
+            raise VersionEnConflicto(
+                f"La versión {examen.version} del examen {examen.id} ya está congelada "
+                "con otro contenido")
+        return False
+    db.session.add(ExamenVersion(
+        examen_id=examen.id,
+        version=examen.version,
+        contenido=json.dumps(actual, ensure_ascii=False, separators=(",", ":")),
+        publicado_en=datetime.now(),
+    ))
+    return True
+
+
+def nueva_version(examen):
+    """Registrar un cambio en el contenido del examen.
+
+    Llamar después de aplicar los cambios y antes del commit: sube la versión
+    (grading.invalidate_answer_key) y, si el examen está publicado, congela la
+    nueva versión.
+    """
+    grading.invalidate_answer_key(examen)
+    if examen.publicado:
+        congelar(examen)
+
+
+def init_app(app):
+    _contenidos.maxsize = app.config.get("ANSWER_KEY_CACHE_SIZE", 256)
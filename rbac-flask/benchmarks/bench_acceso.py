@@ -0,0 +1,69 @@
+"""
+Benchmark: latencia de las vistas del estudiante según cuántos exámenes tiene asignados.
+
+Con la comprobación de acceso por clave primaria (app/acceso.py) la latencia
+de presentar / modo práctica no debe crecer con el número de exámenes
+asignados. Como referencia se mide también la comprobación anterior
+(`examen in user.examenes_asignados`), que carga la colección completa.
+
+Ejecutar: python benchmarks/bench_acceso.py [repeticiones]
+"""
+import sys
+
+from sqlalchemy import insert
+
+from common import make_app, timed, reporte, percentil
+
+from app.extensions import db
+from app.models import User, Examen, Pregunta, estudiante_examen
+
+TAMANOS = (10, 100, 1000, 5000)
+
+
+def _preparar(asignados):
+    app = make_app(METRICS_ENABLED=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        db.session.execute(insert(Examen), [
+            {"titulo": f"Examen {i}", "profesor_id": profesor.id, "publicado": True}
+            for i in range(asignados)
+        ])
+        ids = db.session.scalars(db.select(Examen.id).order_by(Examen.id)).all()
+        db.session.execute(estudiante_examen.insert(), [
+            {"estudiante_id": estudiante.id, "examen_id": examen_id} for examen_id in ids
+        ])
+        ultimo = ids[-1]
+        db.session.add(Pregunta(examen_id=ultimo, texto="P", tipo="abierta"))
+        db.session.commit()
+        estudiante_id = estudiante.id
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    return app, client, estudiante_id, ultimo
+
+
+def main(repeticiones=500):
+    for asignados in TAMANOS:
+        app, client, estudiante_id, ultimo = _preparar(asignados)
+        url = f"/estudiante/examen/{ultimo}/modo-practica"
+        assert client.get(url).status_code == 200
+        reporte(f"modo-practica ({asignados} asignados)", timed(lambda: client.get(url),
+                                                                repeticiones))
+        with app.app_context():
+            estudiante = db.session.get(User, estudiante_id)
+            examen = db.session.get(Examen, ultimo)
+
+            def coleccion():
+                db.session.expire(estudiante, ["examenes_asignados"])
+                return examen in estudiante.examenes_asignados
+
+            muestras = timed(coleccion, max(repeticiones // 10, 10))
+            print(f"{'':<40} referencia colección completa: p50={percentil(muestras, 50):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
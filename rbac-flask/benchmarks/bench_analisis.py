@@ -0,0 +1,143 @@
+"""
+Benchmark: análisis de ítems vectorizado (app/analisis.py).
+
+1. Cálculo: analisis.estadisticas sobre matrices sintéticas de
+   estudiantes × preguntas (por defecto 10 000 × 200) contra el mismo cálculo
+   en Python puro, pregunta por pregunta.
+2. De punta a punta sobre la base: carga de las respuestas con una consulta,
+   armado de las matrices y estadísticos (analisis.analizar), y la vista ya en
+   caché (analisis.analisis_examen con la misma marca de agua).
+
+Requiere NumPy. Ejecutar:
+python benchmarks/bench_analisis.py [estudiantes] [preguntas] [estudiantes_bd] [preguntas_bd]
+"""
+import json
+import math
+import random
+import sys
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from common import make_app, timed, reporte
+
+from app import analisis, grading
+from app.extensions import db
+from app.models import User, Examen, ExamenResultado, Pregunta, Respuesta
+
+OPCIONES = 4
+
+np = analisis.np
+
+
+def _sinteticas(estudiantes, preguntas, azar):
+    """Respuestas con habilidad y dificultad (para que haya correlación)."""
+    habilidad = azar.normal(size=(estudiantes, 1))
+    dificultad = azar.normal(size=(1, preguntas))
+    aciertos = (azar.random((estudiantes, preguntas))
+                < 1 / (1 + np.exp(dificultad - habilidad))).astype(np.int8)
+    elegidas = np.where(aciertos == 1, 1,
+                        azar.choice([0, 2, 3], size=aciertos.shape)).astype(np.int16)
+    elegidas[azar.random(aciertos.shape) < 0.02] = -1
+    return aciertos, elegidas
+
+
+def _python_puro(aciertos, elegidas):
+    """Referencia: dificultad, punto-biserial corregida, distractores y KR-20 con bucles."""
+    filas = aciertos.tolist()
+    opciones = elegidas.tolist()
+    n, k = len(filas), len(filas[0])
+    totales = [sum(fila) for fila in filas]
+    dificultad, discriminacion, tasas = [], [], []
+    for j in range(k):
+        columna = [fila[j] for fila in filas]
+        resto = [t - x for t, x in zip(totales, columna)]
+        p = sum(columna) / n
+        media_resto = sum(resto) / n
+        sxy = sum((x - p) * (r - media_resto) for x, r in zip(columna, resto))
+        sxx = sum((x - p) ** 2 for x in columna)
+        syy = sum((r - media_resto) ** 2 for r in resto)
+        dificultad.append(p)
+        discriminacion.append(sxy / math.sqrt(sxx * syy) if sxx and syy else None)
+        conteo = [0] * (OPCIONES + 1)
+        for fila in opciones:
+            conteo[fila[j] + 1] += 1
+        tasas.append([c / n for c in conteo])
+    media = sum(totales) / n
+    varianza = sum((t - media) ** 2 for t in totales) / n
+    kr20 = k / (k - 1) * (1 - sum(p * (1 - p) for p in dificultad) / varianza)
+    return dificultad, discriminacion, tasas, kr20
+
+
+def _calculo(estudiantes, preguntas):
+    aciertos, elegidas = _sinteticas(estudiantes, preguntas, np.random.default_rng(7))
+    opciones = [OPCIONES] * preguntas
+    vectorizado = analisis.estadisticas(aciertos, elegidas, opciones)
+    referencia = _python_puro(aciertos, elegidas)
+    assert np.allclose(vectorizado[0], referencia[0])
+    assert np.allclose(vectorizado[1], [np.nan if d is None else d for d in referencia[1]],
+                       equal_nan=True)
+    assert math.isclose(vectorizado[4], referencia[3])
+
+    etiqueta = f"{estudiantes}×{preguntas}"
+    reporte(f"estadisticas NumPy {etiqueta}",
+            timed(lambda: analisis.estadisticas(aciertos, elegidas, opciones), 10))
+    reporte(f"Python puro {etiqueta}", timed(lambda: _python_puro(aciertos, elegidas), 1))
+    print(f"{'':<40} KR-20 = {vectorizado[4]:.3f}")
+
+
+def _base(estudiantes, preguntas):
+    app = make_app(METRICS_ENABLED=False)
+    azar = random.Random(7)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor",
+                        password_hash="x")
+        db.session.add(profesor)
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        db.session.add(examen)
+        db.session.flush()
+        for i in range(preguntas):
+            db.session.add(Pregunta(
+                examen_id=examen.id, texto=f"Pregunta {i}", tipo="opcion_multiple", orden=i,
+                opciones=json.dumps([{"texto": f"Opción {o}", "correcta": o == 1}
+                                     for o in range(OPCIONES)]),
+            ))
+        db.session.commit()
+        clave = grading.get_answer_key(examen)
+        db.session.execute(insert(User), [
+            {"username": f"est{i}", "email": f"est{i}@bench.co", "password_hash": "x",
+             "role": "estudiante"} for i in range(estudiantes)
+        ])
+        ids = db.session.scalars(db.select(User.id).where(User.role == "estudiante")).all()
+        ahora = datetime.now()
+        db.session.execute(insert(ExamenResultado), [
+            {"examen_id": examen.id, "estudiante_id": eid, "completado": True,
+             "calificacion": 0, "fecha_presentacion": ahora} for eid in ids
+        ])
+        filas = []
+        for eid in ids:
+            for item in clave.items:
+                indice = azar.randrange(OPCIONES)
+                filas.append({"examen_id": examen.id, "estudiante_id": eid,
+                              "pregunta_id": item.pregunta_id, "opcion_indice": indice,
+                              "es_correcta": indice == item.correcta, "fecha_respuesta": ahora})
+        db.session.execute(insert(Respuesta), filas)
+        db.session.commit()
+
+        etiqueta = f"{estudiantes}×{preguntas}"
+        reporte(f"analizar desde la base {etiqueta}",
+                timed(lambda: analisis.analizar(examen.id, clave), 3))
+        analisis.analisis_examen(examen)
+        reporte("analisis_examen en caché", timed(lambda: analisis.analisis_examen(examen), 200))
+
+
+def main(estudiantes=10000, preguntas=200, estudiantes_bd=2000, preguntas_bd=100):
+    if not analisis.disponible():
+        sys.exit("Este benchmark requiere NumPy")
+    _calculo(estudiantes, preguntas)
+    _base(estudiantes_bd, preguntas_bd)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:5]])
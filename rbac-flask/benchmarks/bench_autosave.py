@@ -0,0 +1,114 @@
+"""
+Benchmark: pico de escritura al cerrar un examen cronometrado.
+
+Antes, cada estudiante enviaba todas sus respuestas al final y el envío
+insertaba una fila por pregunta. Con intentos y autosave (app/intentos.py) las
+respuestas se escriben por lotes durante el examen y el envío final solo
+califica lo guardado. Se mide el cierre simultáneo de todos los intentos y el
+costo de las escrituras repartidas durante el examen.
+
+Ejecutar: python benchmarks/bench_autosave.py [estudiantes] [preguntas]
+"""
+import json
+import random
+import sys
+
+from sqlalchemy import event
+
+from common import make_app, timed, reporte
+
+from app import grading, intentos
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+OPCIONES = ["A", "B", "C", "D"]
+
+
+def _preparar(estudiantes, preguntas):
+    app = make_app(PASSWORD_HASH_COST=12, AUTOSAVE_BATCH_SIZE=200, AUTOSAVE_FLUSH_SECONDS=3600)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", password_hash="x", role="profesor")
+        db.session.add(profesor)
+        db.session.flush()
+        examenes = []
+        for titulo in ("Antes", "Autosave"):
+            examen = Examen(titulo=titulo, profesor_id=profesor.id, publicado=True)
+            db.session.add(examen)
+            db.session.flush()
+            db.session.add_all(Pregunta(
+                examen_id=examen.id, texto=f"P{i}", tipo="opcion_multiple", orden=i,
+                opciones=json.dumps([{"texto": o, "correcta": o == "B"} for o in OPCIONES]))
+                for i in range(preguntas))
+            examenes.append(examen.id)
+        alumnos = [User(username=f"est{i}", email=f"est{i}@bench.co", password_hash="x",
+                        role="estudiante") for i in range(estudiantes)]
+        db.session.add_all(alumnos)
+        db.session.commit()
+        return app, examenes, [a.id for a in alumnos]
+
+
+def _contar_sentencias(app):
+    contador = {"n": 0}
+
+    def contar(*_):
+        contador["n"] += 1
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", contar)
+    return contador
+
+
+def main(estudiantes=100, preguntas=40):
+    app, (antes_id, autosave_id), alumnos = _preparar(estudiantes, preguntas)
+    contador = _contar_sentencias(app)
+    rng = random.Random(7)
+
+    with app.app_context():
+        antes = db.session.get(Examen, antes_id)
+        clave = grading.get_answer_key(antes)
+        envios = {est: {f"pregunta_{item.pregunta_id}": rng.choice(OPCIONES) for item in clave.items}
+                  for est in alumnos}
+
+        # Antes: todos envían al final y cada envío inserta sus filas
+        pendientes = iter(alumnos)
+        contador["n"] = 0
+        cierre_antes = timed(lambda: grading.submit(antes, (est := next(pendientes)), envios[est]),
+                             estudiantes)
+        sentencias_antes = contador["n"]
+
+        # Autosave: durante el examen llegan los cambios de a uno y se escriben por lotes
+        examen = db.session.get(Examen, autosave_id)
+        clave = grading.get_answer_key(examen)
+        for est in alumnos:
+            intentos.iniciar(examen, est)
+        cambios = [(est, item.pregunta_id) for item in clave.items for est in alumnos]
+        envios = {est: {} for est in alumnos}
+        contador["n"] = 0
+        pasos = iter(cambios)
+
+        def autosave():
+            est, pregunta_id = next(pasos)
+            respuesta = rng.choice(OPCIONES)
+            envios[est][f"pregunta_{pregunta_id}"] = respuesta
+            intentos.guardar(intentos.abierto(examen.id, est), {f"pregunta_{pregunta_id}": respuesta})
+        durante = timed(autosave, len(cambios))
+        intentos.vaciar()
+        sentencias_durante = contador["n"]
+
+        pendientes = iter(alumnos)
+        contador["n"] = 0
+        cierre_autosave = timed(
+            lambda: intentos.finalizar(examen, (est := next(pendientes)), envios[est]), estudiantes)
+        sentencias_autosave = contador["n"]
+
+    print(f"{estudiantes} estudiantes x {preguntas} preguntas")
+    reporte("cierre: envío completo (antes)", cierre_antes)
+    reporte("cierre: finalizar intento", cierre_autosave)
+    print(f"{'':<40} pico total: {sum(cierre_antes):8.1f} ms -> {sum(cierre_autosave):8.1f} ms, "
+          f"sentencias: {sentencias_antes} -> {sentencias_autosave}")
+    reporte("durante: autosave por respuesta", durante)
+    print(f"{'':<40} {len(cambios)} respuestas en {sentencias_durante} sentencias "
+          f"(lotes de {intentos.pendientes.lote})")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,80 @@
+"""
+Benchmark: importación masiva de estudiantes y asignación de un examen.
+
+Compara el hash de contraseñas en serie contra el pool de procesos, y la
+asignación anterior (un SELECT + append por estudiante) contra la diferencia
+de conjuntos con executemany.
+
+Ejecutar: python benchmarks/bench_bulk.py [estudiantes]
+"""
+import sys
+import time
+
+from common import make_app
+
+from app import bulk
+from app.extensions import db
+from app.models import User, Examen
+
+
+def _cronometrar(fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def main(estudiantes=200):
+    app = make_app()
+    with app.app_context():
+        passwords = [f"clave-{i}" for i in range(estudiantes)]
+        _, serie = _cronometrar(lambda: bulk.hash_passwords(passwords, procesos=1))
+        _, pool = _cronometrar(lambda: bulk.hash_passwords(passwords))
+        print(f"{'hash en serie':<40} {estudiantes} contraseñas  {serie:10.1f} ms")
+        print(f"{'hash con pool de procesos':<40} {estudiantes} contraseñas  {pool:10.1f} ms")
+
+        filas = [bulk.FilaImportacion(i, f"est{i}", f"est{i}@bench.co", passwords[i],
+                                      "11A" if i % 2 else "11B")
+                 for i in range(estudiantes)]
+        resultado, ms = _cronometrar(lambda: bulk.importar_estudiantes(filas))
+        print(f"{'importar_estudiantes':<40} {resultado.creados} creados     {ms:10.1f} ms")
+
+        profesor = User(username="prof", email="prof@bench.co", password_hash="x", role="profesor")
+        db.session.add(profesor)
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id)
+        db.session.add(examen)
+        db.session.commit()
+        examen_id = examen.id
+        ids = [u.id for u in User.query.filter_by(role="estudiante")]
+
+        def asignacion_anterior():
+            examen = db.session.get(Examen, examen_id)
+            examen.estudiantes = []
+            for est_id in ids:
+                estudiante = User.query.get(int(est_id))
+                if estudiante and estudiante.role == "estudiante":
+                    examen.estudiantes.append(estudiante)
+            db.session.commit()
+
+        def limpiar():
+            bulk.sincronizar_asignaciones(examen_id, [], "reemplazar")
+            db.session.commit()
+            db.session.expunge_all()
+
+        _, anterior = _cronometrar(asignacion_anterior)
+        limpiar()
+        _, nueva = _cronometrar(lambda: (bulk.sincronizar_asignaciones(examen_id, ids),
+                                         db.session.commit()))
+        _, sin_cambios = _cronometrar(lambda: (bulk.sincronizar_asignaciones(examen_id, ids),
+                                               db.session.commit()))
+        limpiar()
+        _, por_grupo = _cronometrar(lambda: (bulk.asignar_por_filtro(examen_id, grupo="11A"),
+                                             db.session.commit()))
+        print(f"{'asignación anterior (SELECT por fila)':<40} {len(ids)} estudiantes  {anterior:10.1f} ms")
+        print(f"{'sincronizar_asignaciones':<40} {len(ids)} estudiantes  {nueva:10.1f} ms")
+        print(f"{'sincronizar_asignaciones (sin cambios)':<40} {len(ids)} estudiantes  {sin_cambios:10.1f} ms")
+        print(f"{'asignar_por_filtro (grupo)':<40} {len(ids) // 2} estudiantes  {por_grupo:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,89 @@
+"""
+Benchmark: throughput con peticiones concurrentes, motor ajustado vs. sin ajustar.
+
+Hilos concurrentes mezclan lecturas (/estudiante/examenes) con escrituras
+(autosave con AUTOSAVE_BATCH_SIZE=1, un commit por petición) sobre la misma
+base SQLite en archivo. "Sin ajustar" es DB_ENGINE_TUNING=0: pool por
+defecto de SQLAlchemy y journal en modo DELETE con synchronous=FULL.
+
+Ejecutar: python benchmarks/bench_engine.py [peticiones] [hilos]
+"""
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, reporte
+
+from app import engine
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+ESTUDIANTES = 32
+
+
+def _preparar(ajustado):
+    app = make_app(DB_ENGINE_TUNING=ajustado, PASSWORD_HASH_COST=12,
+                   AUTOSAVE_BATCH_SIZE=1, METRICS_SERVER_TIMING=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", password_hash="x", role="profesor")
+        db.session.add(profesor)
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True,
+                        duracion_minutos=60)
+        db.session.add(examen)
+        db.session.flush()
+        preguntas = [Pregunta(examen_id=examen.id, texto=f"P{i}", tipo="opcion_multiple", orden=i,
+                              opciones=json.dumps([{"texto": o, "correcta": o == "B"}
+                                                   for o in "ABCD"]))
+                     for i in range(20)]
+        db.session.add_all(preguntas)
+        alumnos = []
+        for i in range(ESTUDIANTES):
+            alumno = User(username=f"est{i}", email=f"est{i}@bench.co", role="estudiante")
+            alumno.set_password("clave")
+            examen.estudiantes.append(alumno)
+            alumnos.append(alumno)
+        db.session.commit()
+        examen_id, preguntas_ids = examen.id, [p.id for p in preguntas]
+
+    clientes = []
+    for i in range(ESTUDIANTES):
+        client = app.test_client()
+        client.post("/login", data={"username": f"est{i}", "password": "clave"})
+        client.get(f"/estudiante/examen/{examen_id}/presentar")
+        clientes.append(client)
+    return app, examen_id, preguntas_ids, clientes
+
+
+def _carga(examen_id, preguntas_ids, clientes, peticiones, hilos):
+    def peticion(i):
+        client = clientes[i % len(clientes)]
+        inicio = time.perf_counter()
+        if i % 2:
+            client.post(f"/estudiante/examen/{examen_id}/autosave",
+                        json={f"pregunta_{preguntas_ids[i % len(preguntas_ids)]}": "ABCD"[i % 4]})
+        else:
+            client.get("/estudiante/examenes")
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(hilos) as pool:
+        latencias = list(pool.map(peticion, range(peticiones)))
+    return latencias, time.perf_counter() - inicio
+
+
+def main(peticiones=3000, hilos=24):
+    print(f"{peticiones} peticiones (50% escrituras), {hilos} hilos")
+    for ajustado in (False, True):
+        app, examen_id, preguntas_ids, clientes = _preparar(ajustado)
+        latencias, segundos = _carga(examen_id, preguntas_ids, clientes, peticiones, hilos)
+        nombre = "motor ajustado" if ajustado else "sin ajustar"
+        reporte(nombre, latencias)
+        pool = engine.estado_pools(app)[0]
+        print(f"{'':<40} {peticiones / segundos:8.1f} peticiones/s, "
+              f"conexiones en uso máx. {pool[4]}, checkouts saturados {pool[6]}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
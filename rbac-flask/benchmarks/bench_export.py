@@ -0,0 +1,96 @@
+"""
+Benchmark: memoria pico de la exportación CSV/XLSX según el tamaño de la cohorte.
+
+Con el streaming el pico debe mantenerse aproximadamente constante aunque
+crezca el número de estudiantes.
+
+Ejecutar: python benchmarks/bench_export.py [estudiantes ...]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import make_app
+
+from sqlalchemy import insert
+
+from app import export
+from app.extensions import db
+from app.models import User, Examen, Pregunta, Respuesta, ExamenResultado
+
+PREGUNTAS = 20
+
+
+def _poblar(estudiantes):
+    ahora = datetime.now()
+    profesor = User(username="prof", email="prof@bench.co", password_hash="x", role="profesor")
+    db.session.add(profesor)
+    db.session.flush()
+    examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+    db.session.add(examen)
+    db.session.flush()
+    db.session.execute(insert(Pregunta), [
+        {"examen_id": examen.id, "texto": f"Pregunta {i}", "tipo": "opcion_multiple",
+         "respuesta_correcta": "A", "orden": i}
+        for i in range(PREGUNTAS)
+    ])
+    db.session.execute(insert(User), [
+        {"username": f"est{i}", "email": f"est{i}@bench.co", "password_hash": "x",
+         "role": "estudiante", "is_active": True}
+        for i in range(estudiantes)
+    ])
+    ids = [u.id for u in User.query.filter_by(role="estudiante")]
+    preguntas = [p.id for p in Pregunta.query.filter_by(examen_id=examen.id)]
+    db.session.execute(insert(ExamenResultado), [
+        {"examen_id": examen.id, "estudiante_id": eid, "calificacion": 3.5,
+         "total_puntos": PREGUNTAS, "completado": True, "fecha_inicio": ahora,
+         "fecha_presentacion": ahora, "tiempo_utilizado": 600}
+        for eid in ids
+    ])
+    db.session.execute(insert(Respuesta), [
+        {"examen_id": examen.id, "estudiante_id": eid, "pregunta_id": pid,
+         "respuesta_texto": "A", "es_correcta": True, "puntos_obtenidos": 1,
+         "fecha_respuesta": ahora}
+        for eid in ids for pid in preguntas
+    ])
+    db.session.commit()
+    return examen.id
+
+
+def _medir(generador):
+    """(bytes generados, pico de memoria en KiB, segundos) consumiendo el generador."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total = 0
+    for parte in generador:
+        total += len(parte)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total, pico / 1024, segundos
+
+
+def main(cohortes=(500, 2000, 5000)):
+    for estudiantes in cohortes:
+        app = make_app()
+        with app.app_context():
+            examen_id = _poblar(estudiantes)
+            casos = [
+                ("csv respuestas", export.generar_csv(
+                    export.COLUMNAS_RESPUESTAS, export.filas_respuestas(examen_id))),
+                ("xlsx completo", export.generar_xlsx([
+                    ("Resultados", export.COLUMNAS_RESULTADOS,
+                     lambda: export.filas_resultados(examen_id)),
+                    ("Respuestas", export.COLUMNAS_RESPUESTAS,
+                     lambda: export.filas_respuestas(examen_id)),
+                ])),
+            ]
+            for nombre, generador in casos:
+                total, pico, segundos = _medir(generador)
+                print(f"{nombre:<16} estudiantes={estudiantes:<6} filas={estudiantes * PREGUNTAS:<8} "
+                      f"salida={total / 1024:9.1f} KiB  pico={pico:8.1f} KiB  {segundos:6.2f} s")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or (500, 2000, 5000))
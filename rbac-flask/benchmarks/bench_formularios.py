@@ -0,0 +1,77 @@
+"""
+Benchmark: formularios de examen barajados por estudiante (app/formularios.py).
+
+Con un examen de 120 preguntas de opción múltiple:
+
+1. Armar el formulario: compilarlo desde la base en cada petición (lo que
+   hacía la plantilla con examen.preguntas y from_json) contra tomar el base
+   de la caché, sin barajar y barajado para un estudiante.
+2. La vista /estudiante/examen/<id>/presentar completa, con el examen sin
+   barajar y barajado.
+
+Ejecutar: python benchmarks/bench_formularios.py [preguntas] [repeticiones]
+"""
+import json
+import sys
+
+from common import make_app, timed, reporte
+
+from app import formularios
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+OPCIONES = 4
+
+
+def _preparar(preguntas):
+    app = make_app(METRICS_ENABLED=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        examen.estudiantes.append(estudiante)
+        db.session.add(examen)
+        db.session.flush()
+        for i in range(preguntas):
+            db.session.add(Pregunta(
+                examen_id=examen.id, texto=f"Enunciado de la pregunta {i}", orden=i,
+                tipo="opcion_multiple",
+                opciones=json.dumps([{"texto": f"Opción {o} de la pregunta {i}", "correcta": o == 1}
+                                     for o in range(OPCIONES)]),
+            ))
+        db.session.commit()
+        ids = (examen.id, estudiante.id)
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    return app, client, ids
+
+
+def main(preguntas=120, repeticiones=200):
+    app, client, (examen_id, estudiante_id) = _preparar(preguntas)
+    with app.app_context():
+        examen = db.session.get(Examen, examen_id)
+        base = formularios.base(examen)
+        semilla = formularios.semilla(examen_id, estudiante_id)
+        reporte(f"compilar en cada petición ({preguntas})",
+                timed(lambda: formularios.compilar(examen_id, examen.version), repeticiones))
+        reporte("base en caché", timed(lambda: formularios.base(examen), repeticiones))
+        reporte("base en caché + barajar",
+                timed(lambda: formularios.barajar(formularios.base(examen), semilla), repeticiones))
+        assert formularios.barajar(base, semilla) == formularios.barajar(base, semilla)
+
+    url = f"/estudiante/examen/{examen_id}/presentar"
+    for barajar in (False, True):
+        with app.app_context():
+            db.session.get(Examen, examen_id).barajar_preguntas = barajar
+            db.session.commit()
+        assert client.get(url).status_code == 200
+        reporte(f"GET presentar {'barajado' if barajar else 'sin barajar'}",
+                timed(lambda: client.get(url), repeticiones))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,84 @@
+"""
+Benchmark: user_loader en caché (app/identidad.py) y comprobación de acceso a exámenes.
+
+1. La misma vista con USER_CACHE_TTL=0 (consultar users en cada petición) y
+   con la caché activa.
+2. `examen in user.examenes_asignados` (carga la colección completa) contra
+   `acceso.asignado` (una fila de estudiante_examen por clave primaria),
+   para un estudiante con muchos exámenes asignados.
+
+Ejecutar: python benchmarks/bench_identidad.py [repeticiones]
+"""
+import statistics
+import sys
+
+from common import make_app, timed, reporte
+
+from app import acceso
+from app.extensions import db
+from app.models import User, Examen
+
+EXAMENES = 300
+
+
+def _preparar(ttl):
+    app = make_app(USER_CACHE_TTL=ttl, METRICS_ENABLED=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        for i in range(EXAMENES):
+            examen = Examen(titulo=f"Examen {i}", profesor_id=profesor.id, publicado=True)
+            examen.estudiantes.append(estudiante)
+            db.session.add(examen)
+        db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    return app, client
+
+
+def _vista(repeticiones):
+    clientes = {"sin caché (TTL=0)": _preparar(0)[1], "con caché": _preparar(30)[1]}
+    url = "/"
+    muestras = {nombre: [] for nombre in clientes}
+    # Intercalar rondas para repartir el ruido de la máquina entre ambos casos
+    for _ in range(5):
+        for nombre, client in clientes.items():
+            client.get(url)
+            muestras[nombre] += timed(lambda: client.get(url), repeticiones // 5)
+    medias = {}
+    for nombre, valores in muestras.items():
+        reporte(f"{url} {nombre}", valores)
+        medias[nombre] = statistics.median(valores)
+    ahorro = (1 - medias["con caché"] / medias["sin caché (TTL=0)"]) * 100
+    print(f"{'':<40} ahorro (p50): {ahorro:.1f}%")
+
+
+def _acceso(repeticiones):
+    app, _ = _preparar(30)
+    with app.app_context():
+        estudiante = User.query.filter_by(username="est").one()
+        ultimo = db.session.get(Examen, EXAMENES)
+
+        def coleccion():
+            db.session.expire(estudiante, ["examenes_asignados"])
+            return ultimo in estudiante.examenes_asignados
+
+        def existe():
+            return acceso.asignado(estudiante.id, ultimo.id)
+
+        assert coleccion() and existe()
+        reporte(f"colección ({EXAMENES} exámenes)", timed(coleccion, repeticiones))
+        reporte("exists por clave primaria", timed(existe, repeticiones))
+
+
+def main(repeticiones=1000):
+    _vista(repeticiones)
+    _acceso(repeticiones)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
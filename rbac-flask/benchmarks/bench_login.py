@@ -0,0 +1,44 @@
+"""
+Benchmark: logins por segundo en un solo worker según la política de hash.
+
+Ejecutar: python benchmarks/bench_login.py [logins]
+"""
+import sys
+
+from common import make_app, timed, reporte
+
+from app.extensions import db
+from app.models import User
+
+POLITICAS = [
+    ("scrypt", 15),   # valor por defecto de werkzeug
+    ("scrypt", 13),
+    ("pbkdf2", 600_000),
+    ("pbkdf2", 150_000),
+]
+
+
+def _login(app):
+    # Cliente nuevo en cada login: sin sesión previa
+    respuesta = app.test_client().post("/login", data={"username": "est", "password": "clave"})
+    assert respuesta.status_code == 302, respuesta.status_code
+
+
+def main(logins=30):
+    for algoritmo, costo in POLITICAS:
+        app = make_app(PASSWORD_HASH_ALGORITHM=algoritmo, PASSWORD_HASH_COST=costo,
+                       PASSWORD_REHASH_ASYNC=False)
+        with app.app_context():
+            usuario = User(username="est", email="est@bench.co", role="estudiante")
+            usuario.set_password("clave")
+            db.session.add(usuario)
+            db.session.commit()
+        _login(app)
+        muestras = timed(lambda: _login(app), logins)
+        nombre = f"login {algoritmo} costo={costo}"
+        reporte(nombre, muestras)
+        print(f"{'':<40} {1000 * len(muestras) / sum(muestras):8.1f} logins/s por worker")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
@@ -0,0 +1,56 @@
+"""
+Benchmark: sobrecosto de la instrumentación (app/metrics.py) por petición.
+
+Compara la misma vista con METRICS_ENABLED apagado y encendido.
+
+Ejecutar: python benchmarks/bench_metrics.py [repeticiones]
+"""
+import statistics
+import sys
+
+from common import make_app, timed, reporte
+
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+
+def _preparar(metricas):
+    app = make_app(METRICS_ENABLED=metricas, PASSWORD_HASH_COST=12)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        for i in range(10):
+            examen = Examen(titulo=f"Examen {i}", profesor_id=profesor.id, publicado=True)
+            examen.estudiantes.append(estudiante)
+            db.session.add(examen)
+            db.session.flush()
+            db.session.add(Pregunta(examen_id=examen.id, texto="P", tipo="abierta"))
+        db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    return client
+
+
+def main(repeticiones=1000):
+    clientes = {"sin métricas": _preparar(False), "con métricas": _preparar(True)}
+    for url in ("/", "/estudiante/examenes"):
+        medias = {}
+        # Intercalar rondas para repartir el ruido de la máquina entre ambos casos
+        muestras = {nombre: [] for nombre in clientes}
+        for _ in range(5):
+            for nombre, client in clientes.items():
+                client.get(url)
+                muestras[nombre] += timed(lambda: client.get(url), repeticiones // 5)
+        for nombre, valores in muestras.items():
+            reporte(f"{url} {nombre}", valores)
+            medias[nombre] = statistics.median(valores)
+        sobrecosto = (medias["con métricas"] / medias["sin métricas"] - 1) * 100
+        print(f"{'':<40} sobrecosto (p50): {sobrecosto:+.1f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,112 @@
+"""
+Benchmark: respuestas de opción guardadas por índice (Respuesta.opcion_indice).
+
+1. Espacio: siembra respuestas como antes (texto completo de la opción en
+   respuesta_texto), mide el archivo, aplica la migración 13 (índices) y
+   vuelve a medir tras VACUUM.
+2. CPU de calificación por envío: grading.grade con el cuerpo por índice
+   (cliente actual) y con el texto de la opción (clientes anteriores).
+3. Distribución de opciones por pregunta (reportes.distribucion_opciones).
+
+Ejecutar: python benchmarks/bench_opciones.py [estudiantes] [preguntas]
+"""
+import json
+import os
+import random
+import sys
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from common import make_app, timed, reporte
+
+from app import grading, reportes, schema
+from app.extensions import db
+from app.models import User, Examen, ExamenResultado, Pregunta, Respuesta
+
+OPCIONES = 4
+
+
+def _tamano(app):
+    with app.app_context():
+        db.session.commit()
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        return os.path.getsize(db.engine.url.database) / 1024 / 1024
+
+
+def main(estudiantes=1000, preguntas=40):
+    app = make_app(METRICS_ENABLED=False)
+    azar = random.Random(7)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor",
+                        password_hash="x")
+        db.session.add(profesor)
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        db.session.add(examen)
+        db.session.flush()
+        for i in range(preguntas):
+            db.session.add(Pregunta(
+                examen_id=examen.id, texto=f"Pregunta {i}", tipo="opcion_multiple", orden=i,
+                opciones=json.dumps([
+                    {"texto": f"Opción {o} de la pregunta {i}: un enunciado de longitud típica "
+                              f"de una prueba tipo ICFES", "correcta": o == 1}
+                    for o in range(OPCIONES)
+                ]),
+            ))
+        db.session.commit()
+        clave = grading.get_answer_key(examen)
+        examen_id = examen.id
+        db.session.execute(insert(User), [
+            {"username": f"est{i}", "email": f"est{i}@bench.co", "password_hash": "x",
+             "role": "estudiante"} for i in range(estudiantes)
+        ])
+        ids = db.session.scalars(db.select(User.id).where(User.role == "estudiante")).all()
+        ahora = datetime.now()
+        db.session.execute(insert(ExamenResultado), [
+            {"examen_id": examen_id, "estudiante_id": eid, "completado": True,
+             "calificacion": 0, "fecha_presentacion": ahora} for eid in ids
+        ])
+        # Como se guardaban antes: el texto completo de la opción en cada fila
+        filas = []
+        for eid in ids:
+            for item in clave.items:
+                indice = azar.randrange(OPCIONES)
+                filas.append({"examen_id": examen_id, "estudiante_id": eid,
+                              "pregunta_id": item.pregunta_id,
+                              "respuesta_texto": item.opciones[indice],
+                              "es_correcta": indice == item.correcta,
+                              "fecha_respuesta": ahora})
+        db.session.execute(insert(Respuesta), filas)
+        db.session.commit()
+
+    antes = _tamano(app)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            inicio = datetime.now()
+            schema._m013_opcion_indice_respuestas(conn)
+            migracion = (datetime.now() - inicio).total_seconds()
+    despues = _tamano(app)
+    print(f"{'base con texto de opción':<40} {antes:8.2f} MB")
+    print(f"{'base con índice de opción':<40} {despues:8.2f} MB  "
+          f"({(1 - despues / antes) * 100:.0f}% menos; migración {migracion:.2f} s "
+          f"para {len(filas)} respuestas)")
+
+    with app.app_context():
+        por_indice = {f"pregunta_{item.pregunta_id}": azar.randrange(OPCIONES)
+                      for item in clave.items}
+        por_texto = {nombre: clave.por_pregunta[int(nombre[9:])].opciones[indice]
+                     for nombre, indice in por_indice.items()}
+        reporte(f"grade por índice ({preguntas} preguntas)",
+                timed(lambda: grading.grade(clave, por_indice), 2000))
+        reporte("grade por texto (compatibilidad)",
+                timed(lambda: grading.grade(clave, por_texto), 2000))
+        reporte("distribucion_opciones (GROUP BY)",
+                timed(lambda: reportes.distribucion_opciones(examen_id), 20))
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:3]]
+    main(*argumentos)
@@ -0,0 +1,56 @@
+"""
+Benchmark: listados de usuarios con paginación por clave (app/paginacion.py).
+
+Siembra N estudiantes y mide /profesor/estudiantes en la primera página, en
+una página profunda (cursor cerca del final) y con búsqueda por prefijo.
+Como referencia mide cargar el listado completo como antes
+(`User.query.filter_by(role="estudiante").all()`), sin contar el render.
+
+Ejecutar: python benchmarks/bench_paginacion.py [estudiantes] [repeticiones]
+"""
+import sys
+
+from sqlalchemy import insert
+
+from common import make_app, timed, reporte
+
+from app import paginacion
+from app.extensions import db
+from app.models import User
+
+
+def main(estudiantes=20000, repeticiones=100):
+    app = make_app(METRICS_ENABLED=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        profesor.set_password("clave")
+        db.session.add(profesor)
+        db.session.execute(insert(User), [
+            {"username": f"est{i:06d}", "email": f"est{i}@bench.co", "password_hash": "x",
+             "role": "estudiante", "is_active": i % 10 != 0}
+            for i in range(estudiantes)
+        ])
+        db.session.commit()
+        profunda = paginacion.codificar(f"est{estudiantes - 100:06d}")
+
+        def completo():
+            db.session.expire_all()
+            return User.query.filter_by(role="estudiante").all()
+
+        reporte(f"listado completo ({estudiantes})", timed(completo, max(repeticiones // 10, 3)))
+
+    client = app.test_client()
+    client.post("/login", data={"username": "prof", "password": "clave"})
+    casos = {
+        "primera página": "/profesor/estudiantes",
+        "página profunda": f"/profesor/estudiantes?cursor={profunda}",
+        "prefijo + inactivos": "/profesor/estudiantes?q=est01&activo=0",
+    }
+    for nombre, url in casos.items():
+        assert client.get(url).status_code == 200
+        reporte(f"{nombre}", timed(lambda: client.get(url), repeticiones))
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:3]]
+    main(*argumentos)
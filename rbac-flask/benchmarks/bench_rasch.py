@@ -0,0 +1,112 @@
+"""
+Benchmark: calibración Rasch y puntaje escalado (app/rasch.py).
+
+1. Calibración sobre cohortes sintéticas (por defecto 1k, 5k, 10k y 50k
+   estudiantes × 100 preguntas): rasch.ajustar, que itera sobre grupos de
+   puntaje bruto, contra el mismo JML iterando sobre la matriz completa de
+   estudiantes. Se informa también cuánto se recuperan las dificultades
+   verdaderas (correlación y error medio).
+2. Puntaje al enviar: grading.grade con la tabla precalculada de la clave
+   contra estimar θ por Newton en cada envío, y el costo de armar la tabla
+   (una vez por versión de la clave y proceso).
+
+Requiere NumPy. Ejecutar: python benchmarks/bench_rasch.py [preguntas] [cohorte ...]
+"""
+import math
+import sys
+
+from common import timed, reporte
+
+from app import grading, rasch
+
+np = rasch.np
+
+
+def _cohorte(estudiantes, preguntas, azar):
+    dificultad = azar.normal(size=preguntas)
+    habilidad = azar.normal(size=(estudiantes, 1))
+    aciertos = (azar.random((estudiantes, preguntas))
+                < 1 / (1 + np.exp(dificultad - habilidad))).astype(np.int8)
+    return aciertos, dificultad
+
+
+def _jml_completo(aciertos, iteraciones=100, tolerancia=1e-4):
+    """Referencia: JML con un θ por estudiante (matrices n × k en cada iteración)."""
+    brutos = aciertos.sum(axis=1)
+    x = aciertos[(brutos > 0) & (brutos < aciertos.shape[1])].astype(np.float64)
+    n, k = x.shape
+    r, s = x.sum(axis=1), x.sum(axis=0)
+    theta = np.log(r / (k - r))
+    b = -np.log(s / (n - s))
+    b -= b.mean()
+    for _ in range(iteraciones):
+        p = 1 / (1 + np.exp(b[None, :] - theta[:, None]))
+        paso_theta = np.clip((r - p.sum(axis=1)) / (p * (1 - p)).sum(axis=1), -1, 1)
+        theta += paso_theta
+        p = 1 / (1 + np.exp(b[None, :] - theta[:, None]))
+        paso_b = np.clip((s - p.sum(axis=0)) / (p * (1 - p)).sum(axis=0), -1, 1)
+        b -= paso_b
+        b -= b.mean()
+        if max(np.abs(paso_theta).max(), np.abs(paso_b).max()) < tolerancia:
+            break
+    return b * (k - 1) / k
+
+
+def _calibracion(preguntas, cohortes):
+    azar = np.random.default_rng(7)
+    for estudiantes in cohortes:
+        aciertos, verdadera = _cohorte(estudiantes, preguntas, azar)
+        dificultades, _, iteraciones, _ = rasch.ajustar(aciertos)
+        referencia = _jml_completo(aciertos)
+        assert np.allclose(dificultades, referencia, atol=1e-3)
+        etiqueta = f"{estudiantes}×{preguntas}"
+        reporte(f"ajustar por grupos {etiqueta}", timed(lambda: rasch.ajustar(aciertos), 5))
+        reporte(f"JML por estudiante {etiqueta}", timed(lambda: _jml_completo(aciertos), 2))
+        verdadera = verdadera - verdadera.mean()
+        print(f"{'':<40} {iteraciones} iteraciones; r={np.corrcoef(dificultades, verdadera)[0, 1]:.4f}"
+              f"  error medio={np.abs(dificultades - verdadera).mean():.3f} logits")
+
+
+def _theta_newton(dificultades, aciertos):
+    """Referencia: estimar θ del envío por Newton (O(preguntas × iteraciones))."""
+    k = len(dificultades)
+    objetivo = min(max(sum(aciertos), rasch.AJUSTE_EXTREMOS), k - rasch.AJUSTE_EXTREMOS)
+    theta = 0.0
+    for _ in range(50):
+        ps = [1 / (1 + math.exp(b - theta)) for b in dificultades]
+        paso = max(-1.0, min(1.0, (objetivo - sum(ps)) / sum(p * (1 - p) for p in ps)))
+        theta += paso
+        if abs(paso) < 1e-6:
+            break
+    return rasch.escalar(theta)
+
+
+def _puntaje(preguntas):
+    azar = np.random.default_rng(11)
+    dificultades = azar.normal(size=preguntas).tolist()
+    items = [grading.ItemClave(pregunta_id=i, tipo="opcion_multiple", correcta=1, puntos=1,
+                               texto="", explicacion=None, opciones=("A", "B", "C", "D"),
+                               campo=f"pregunta_{i}", dificultad=b)
+             for i, b in enumerate(dificultades)]
+    respuestas = {item.campo: int(azar.integers(0, 4)) for item in items}
+    aciertos = [respuestas[item.campo] == 1 for item in items]
+
+    clave = grading.AnswerKey(1, 1, items)
+    reporte(f"tabla de puntajes ({preguntas} preguntas)",
+            timed(lambda: rasch.tabla_puntajes(dificultades), 5))
+    assert grading.grade(clave, respuestas).puntaje == _theta_newton(dificultades, aciertos)
+    reporte("grade con tabla (por envío)", timed(lambda: grading.grade(clave, respuestas), 2000))
+    reporte("θ por Newton (por envío)",
+            timed(lambda: _theta_newton(dificultades, aciertos), 2000))
+
+
+def main(preguntas=100, cohortes=(1000, 5000, 10000, 50000)):
+    if np is None:
+        sys.exit("Este benchmark requiere NumPy")
+    _calibracion(preguntas, cohortes)
+    _puntaje(preguntas)
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:]]
+    main(*argumentos[:1], *([argumentos[1:]] if len(argumentos) > 1 else []))
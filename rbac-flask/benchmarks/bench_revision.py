@@ -0,0 +1,60 @@
+"""
+Benchmark: página de revisión de un simulacro (estudiante/detalle_resultado).
+
+Mide la vista completa con la revisión recién construida y servida desde caché.
+
+Ejecutar: python benchmarks/bench_revision.py [preguntas] [repeticiones]
+"""
+import json
+import sys
+
+from common import make_app, timed, reporte
+
+from app import revision
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+OPCIONES = ["A", "B", "C", "D"]
+
+
+def main(preguntas=120, repeticiones=50):
+    app = make_app(PASSWORD_HASH_COST=12)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        examen.estudiantes.append(estudiante)
+        db.session.add(examen)
+        db.session.flush()
+        for i in range(preguntas):
+            db.session.add(Pregunta(
+                examen_id=examen.id, texto=f"Pregunta {i}", tipo="opcion_multiple", orden=i,
+                opciones=json.dumps([{"texto": o, "correcta": o == "B"} for o in OPCIONES]),
+                explicacion="Porque sí",
+            ))
+        db.session.commit()
+        examen_id = examen.id
+        ids = [p.id for p in Pregunta.query.filter_by(examen_id=examen_id)]
+
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    respuestas = {f"pregunta_{pid}": OPCIONES[pid % 4] for pid in ids}
+    resultado_id = client.post(f"/estudiante/examen/{examen_id}/enviar",
+                               json=respuestas).get_json()["resultado_id"]
+    url = f"/estudiante/resultado/{resultado_id}"
+    client.get(url)
+
+    def sin_cache():
+        revision._revisiones.clear()
+        client.get(url)
+
+    reporte(f"revisión {preguntas} preguntas (construida)", timed(sin_cache, repeticiones))
+    reporte(f"revisión {preguntas} preguntas (caché)", timed(lambda: client.get(url), repeticiones))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
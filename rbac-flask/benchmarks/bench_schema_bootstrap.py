@@ -0,0 +1,37 @@
+"""
+Benchmark: latencia por petición con y sin `db.create_all()` en before_request.
+
+Ejecutar: python benchmarks/bench_schema_bootstrap.py [repeticiones]
+"""
+import sys
+
+from common import make_app, timed, reporte
+
+from app.extensions import db
+
+
+def _medir(app, repeticiones):
+    client = app.test_client()
+    # Calentar plantillas y conexiones
+    client.get("/")
+    return timed(lambda: client.get("/"), repeticiones)
+
+
+def main(repeticiones=500):
+    sin_ddl = _medir(make_app(), repeticiones)
+
+    # Comportamiento anterior: DDL/reflexión en cada petición
+    app = make_app()
+
+    @app.before_request
+    def _create_tables():
+        db.create_all()
+
+    con_ddl = _medir(app, repeticiones)
+
+    reporte("before_request db.create_all()", con_ddl)
+    reporte("migraciones al arrancar (actual)", sin_ddl)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
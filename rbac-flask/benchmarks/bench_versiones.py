@@ -0,0 +1,85 @@
+"""
+Benchmark: contenido congelado de los exámenes publicados (app/versiones.py).
+
+Con un examen publicado de 120 preguntas de opción múltiple:
+
+1. Obtener el contenido de una versión: serializarlo desde las preguntas
+   (lo que se hacía en cada compilación de clave o formulario) contra leer la
+   fila congelada por clave primaria y contra la copia en caché.
+2. Compilar la clave de respuestas y el formulario base en frío (caché de
+   contenidos vacía), que es lo que paga cada proceso con cada versión nueva.
+3. La vista /estudiante/examen/<id>/presentar completa.
+
+Ejecutar: python benchmarks/bench_versiones.py [preguntas] [repeticiones]
+"""
+import json
+import sys
+
+from common import make_app, timed, reporte
+
+from app import formularios, grading, versiones
+from app.extensions import db
+from app.models import User, Examen, Pregunta
+
+OPCIONES = 4
+
+
+def _preparar(preguntas):
+    app = make_app(METRICS_ENABLED=False)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", role="profesor")
+        estudiante = User(username="est", email="est@bench.co", role="estudiante")
+        profesor.set_password("clave")
+        estudiante.set_password("clave")
+        db.session.add_all([profesor, estudiante])
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        examen.estudiantes.append(estudiante)
+        db.session.add(examen)
+        db.session.flush()
+        for i in range(preguntas):
+            db.session.add(Pregunta(
+                examen_id=examen.id, texto=f"Enunciado de la pregunta {i}", orden=i,
+                tipo="opcion_multiple", explicacion=f"Explicación de la pregunta {i}",
+                opciones=json.dumps([{"texto": f"Opción {o} de la pregunta {i}", "correcta": o == 1}
+                                     for o in range(OPCIONES)]),
+            ))
+        db.session.flush()
+        versiones.congelar(examen)
+        db.session.commit()
+        examen_id = examen.id
+    client = app.test_client()
+    client.post("/login", data={"username": "est", "password": "clave"})
+    return app, client, examen_id
+
+
+def _en_frio(fn):
+    def medir():
+        versiones._contenidos.clear()
+        return fn()
+    return medir
+
+
+def main(preguntas=120, repeticiones=200):
+    app, client, examen_id = _preparar(preguntas)
+    with app.app_context():
+        version = db.session.get(Examen, examen_id).version
+        assert versiones.congelado(examen_id, version) == versiones.serializar(examen_id)
+        reporte(f"serializar desde preguntas ({preguntas})",
+                timed(lambda: versiones.serializar(examen_id), repeticiones))
+        reporte("leer versión congelada", timed(lambda: versiones.congelado(examen_id, version),
+                                                repeticiones))
+        reporte("contenido en caché", timed(lambda: versiones.contenido(examen_id, version),
+                                            repeticiones))
+        reporte("clave de respuestas en frío",
+                timed(_en_frio(lambda: grading.compile_answer_key(examen_id, version)), repeticiones))
+        reporte("formulario base en frío",
+                timed(_en_frio(lambda: formularios.compilar(examen_id, version)), repeticiones))
+
+    url = f"/estudiante/examen/{examen_id}/presentar"
+    assert client.get(url).status_code == 200
+    reporte("GET presentar", timed(lambda: client.get(url), repeticiones))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
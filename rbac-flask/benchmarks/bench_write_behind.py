@@ -0,0 +1,93 @@
+"""
+Benchmark: latencia de envío con ráfaga de cierre de examen.
+
+Muchos estudiantes envían a la vez (hilos concurrentes sobre la misma base
+SQLite). Se compara la latencia por envío de la escritura directa
+(intentos.finalizar) contra la escritura diferida (journal.encolar: calificar,
+anotar en el diario y responder), y el tiempo que tarda el hilo de fondo en
+aplicar el diario.
+
+Ejecutar: python benchmarks/bench_write_behind.py [estudiantes] [preguntas] [hilos]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, reporte
+
+from app import intentos, journal
+from app.extensions import db
+from app.models import User, Examen, Pregunta, ExamenResultado
+
+OPCIONES = ["A", "B", "C", "D"]
+
+
+def _preparar(estudiantes, preguntas, diferido):
+    app = make_app(SUBMIT_WRITE_BEHIND=diferido,
+                   SUBMIT_JOURNAL_PATH=os.path.join(tempfile.mkdtemp(), "diario.db"),
+                   SUBMIT_DRAIN_INTERVAL=0.2)
+    with app.app_context():
+        profesor = User(username="prof", email="prof@bench.co", password_hash="x", role="profesor")
+        db.session.add(profesor)
+        db.session.flush()
+        examen = Examen(titulo="Simulacro", profesor_id=profesor.id, publicado=True)
+        db.session.add(examen)
+        db.session.flush()
+        db.session.add_all(Pregunta(
+            examen_id=examen.id, texto=f"P{i}", tipo="opcion_multiple", orden=i,
+            opciones=json.dumps([{"texto": o, "correcta": o == "B"} for o in OPCIONES]))
+            for i in range(preguntas))
+        alumnos = [User(username=f"est{i}", email=f"est{i}@bench.co", password_hash="x",
+                        role="estudiante") for i in range(estudiantes)]
+        db.session.add_all(alumnos)
+        db.session.commit()
+        preguntas_ids = [p.id for p in examen.preguntas]
+        return app, examen.id, [a.id for a in alumnos], preguntas_ids
+
+
+def _rafaga(app, examen_id, alumnos, preguntas_ids, hilos, diferido):
+    rng = random.Random(3)
+    envios = {est: {f"pregunta_{pid}": rng.choice(OPCIONES) for pid in preguntas_ids}
+              for est in alumnos}
+
+    def enviar(est):
+        with app.app_context():
+            examen = db.session.get(Examen, examen_id)
+            inicio = time.perf_counter()
+            if diferido:
+                journal.encolar(app, examen, est, envios[est])
+            else:
+                intentos.finalizar(examen, est, envios[est])
+            return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(hilos) as pool:
+        latencias = list(pool.map(enviar, alumnos))
+    respondido = time.perf_counter() - inicio
+
+    # Esperar a que el diario quede aplicado
+    with app.app_context():
+        while db.session.query(ExamenResultado).filter_by(completado=True).count() < len(alumnos):
+            db.session.rollback()
+            time.sleep(0.05)
+    return latencias, respondido, time.perf_counter() - inicio
+
+
+def main(estudiantes=300, preguntas=40, hilos=16):
+    print(f"{estudiantes} envíos de {preguntas} preguntas, {hilos} hilos")
+    for diferido in (False, True):
+        app, examen_id, alumnos, preguntas_ids = _preparar(estudiantes, preguntas, diferido)
+        latencias, respondido, persistido = _rafaga(app, examen_id, alumnos, preguntas_ids,
+                                                    hilos, diferido)
+        nombre = "escritura diferida" if diferido else "escritura directa"
+        reporte(nombre, latencias)
+        print(f"{'':<40} todos respondidos en {respondido * 1000:8.1f} ms, "
+              f"persistidos en {persistido * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,51 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Cada benchmark crea la app sobre una base SQLite temporal para no tocar
+instance/app.db ni la base MySQL configurada.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from app import create_app  # noqa: E402
+
+
+def make_app(**overrides):
+    """Crear una app sobre un archivo SQLite temporal nuevo."""
+    tmpdir = tempfile.mkdtemp(prefix="bench_ifces_")
+    attrs = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        "TESTING": True,
+    }
+    attrs.update(overrides)
+    config = type("BenchConfig", (Config,), attrs)
+    return create_app(config)
+
+
+def timed(fn, repeticiones):
+    """Ejecutar `fn` varias veces y devolver las latencias en milisegundos."""
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return muestras
+
+
+def percentil(muestras, p):
+    ordenadas = sorted(muestras)
+    idx = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+    return ordenadas[idx]
+
+
+def reporte(nombre, muestras):
+    print(f"{nombre:<40} n={len(muestras):<6} "
+          f"media={statistics.mean(muestras):8.3f} ms  "
+          f"p50={percentil(muestras, 50):8.3f} ms  "
+          f"p99={percentil(muestras, 99):8.3f} ms")
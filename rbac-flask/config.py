@@ -30,7 +30,82 @@ class Config:
     SQLALCHEMY_DATABASE_URI = mysql_url or sqlite_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Ajuste del motor por dialecto (ver app/engine.py); 0 = valores por defecto de SQLAlchemy
+    DB_ENGINE_TUNING = os.getenv("DB_ENGINE_TUNING", "1") == "1"
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # MySQL: reciclar antes del wait_timeout del servidor y verificar la conexión al sacarla
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    # SQLite en archivo: pragmas aplicados a cada conexión
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Réplica de lectura para las vistas con @lee_de_replica (vacío = todo a la primaria).
+    # En local puede ser otro archivo SQLite, sincronizado con `flask db-sync-replica`
+    DB_REPLICA_URL = os.getenv("DB_REPLICA_URL", "")
+    # Segundos que un usuario lee de la primaria después de escribir
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+    # Aplicar migraciones pendientes al crear la app (desactivar para usar solo `flask db-upgrade`)
+    SCHEMA_AUTO_UPGRADE = os.getenv("SCHEMA_AUTO_UPGRADE", "1") == "1"
+
+    # Número máximo de claves de respuestas precompiladas en memoria por proceso
+    ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "256"))
+
+    # Fotos de usuario (id, rol, activo...) que el user_loader reutiliza sin consultar la base.
+    # Segundos de validez (0 = consultar siempre) y número máximo de usuarios en memoria
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+
+    # Filas por página de los listados de usuarios y resultados (y máximo pedible con ?limite=)
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+    # Mínimo de presentaciones completadas para que `flask calibrate` ajuste el modelo de Rasch
+    RASCH_MIN_STUDENTS = int(os.getenv("RASCH_MIN_STUDENTS", "30"))
+
+    # Política de hash de contraseñas (calibrar el costo con `flask bench-hash`).
+    # scrypt: costo = log2(n); pbkdf2: costo = iteraciones. 0 = valor por defecto de werkzeug
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")
+    PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "0"))
+    # Actualizar en segundo plano los hashes de política anterior tras un login exitoso
+    PASSWORD_REHASH_ASYNC = os.getenv("PASSWORD_REHASH_ASYNC", "1") == "1"
+
+    # Fallar las peticiones que superen el presupuesto de consultas de su vista (@query_budget)
+    QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "0") == "1"
+
+    # Instrumentación por petición (/admin/metrics y cabecera Server-Timing)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "1") == "1"
+    METRICS_SLOW_STATEMENTS = int(os.getenv("METRICS_SLOW_STATEMENTS", "10"))
+
+    # Guardado automático de intentos: el servidor escribe las respuestas por lotes de
+    # AUTOSAVE_BATCH_SIZE o cada AUTOSAVE_FLUSH_SECONDS; el navegador envía cambios cada
+    # AUTOSAVE_INTERVAL_SECONDS
+    AUTOSAVE_BATCH_SIZE = int(os.getenv("AUTOSAVE_BATCH_SIZE", "200"))
+    AUTOSAVE_FLUSH_SECONDS = float(os.getenv("AUTOSAVE_FLUSH_SECONDS", "5"))
+    AUTOSAVE_INTERVAL_SECONDS = int(os.getenv("AUTOSAVE_INTERVAL_SECONDS", "10"))
+    # Margen tras duracion_minutos en que un intento aún acepta autosaves y envío final
+    INTENTO_GRACIA_SEGUNDOS = int(os.getenv("INTENTO_GRACIA_SEGUNDOS", "60"))
+
+    # Escritura diferida de envíos: calificar y responder de inmediato, anotar en un diario
+    # SQLite local y aplicarlo a la base por lotes en un hilo de fondo
+    SUBMIT_WRITE_BEHIND = os.getenv("SUBMIT_WRITE_BEHIND", "0") == "1"
+    SUBMIT_JOURNAL_PATH = os.getenv("SUBMIT_JOURNAL_PATH", str(BASE_DIR / "instance" / "envios_diario.db"))
+    SUBMIT_JOURNAL_SYNC = os.getenv("SUBMIT_JOURNAL_SYNC", "FULL")  # FULL | NORMAL
+    SUBMIT_DRAIN_BATCH = int(os.getenv("SUBMIT_DRAIN_BATCH", "500"))
+    SUBMIT_DRAIN_INTERVAL = float(os.getenv("SUBMIT_DRAIN_INTERVAL", "1"))
+
+    # Procesos para hashear contraseñas en la importación masiva (0 = núcleos disponibles)
+    BULK_HASH_WORKERS = int(os.getenv("BULK_HASH_WORKERS", "0"))
+
 class TestConfig(Config):
     TESTING = True
     # Use a separate in-memory SQLite DB for tests
-    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    PASSWORD_REHASH_ASYNC = False
+    QUERY_BUDGET_ENFORCE = True
\ No newline at end of file
@@ -1,27 +1,35 @@
 """
 Script de migración para actualizar la base de datos existente.
-Ejecutar solo una vez para agregar las nuevas columnas y tablas.
+Aplica las migraciones pendientes de app/schema.py (equivalente a `flask db-upgrade`).
+Los antiguos scripts (migrate_config.py, migrate_icfes.py, migrate_comentarios.py,
+fix_columns.py, ...) quedaron incorporados como versiones del esquema.
 """
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
 from app import create_app
-from app.extensions import db
-from sqlalchemy import text
+from app import schema
+
+
+class MigrationConfig(Config):
+    SCHEMA_AUTO_UPGRADE = False
 
-app = create_app()
+
+app = create_app(MigrationConfig)
 
 with app.app_context():
-    # Obtener el tipo de base de datos
-    engine = db.engine
-    
     print("🔄 Iniciando migración de base de datos...")
-    
+    print(f"   Versión actual: {schema.current_version()}")
+
     try:
-        # Crear todas las tablas basadas en los modelos de SQLAlchemy
-        print("➡️ Creando todas las tablas...")
-        db.create_all()
-        print("   ✅ Tablas creadas exitosamente.")
-        
-        print("\n✅ Migración completada.")
-        
+        aplicadas = schema.upgrade(echo=print)
+        if not aplicadas:
+            print("   ✅ El esquema ya está actualizado.")
+        print(f"\n✅ Migración completada. Versión: {schema.current_version()}")
+
     except Exception as e:
         print(f"\n❌ Error durante la migración: {e}")
         raise
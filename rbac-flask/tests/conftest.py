@@ -0,0 +1,153 @@
+"""
+Fixtures compartidas de la suite.
+
+Cada test recibe una app nueva sobre TestConfig (SQLite en memoria, con
+QUERY_BUDGET_ENFORCE activo) y, si lo pide, datos sembrados por el camino
+normal de envío (grading.submit), de modo que estadísticas y rollups quedan
+como en producción.
+"""
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TestConfig  # noqa: E402
+from app import (analisis, create_app, formularios, grading, identidad, intentos,  # noqa: E402
+                 reportes, revision, versiones)
+from app.extensions import db  # noqa: E402
+from app.models import User, Examen, ExamenResultado, Pregunta, Categoria  # noqa: E402
+
+CLAVE = "clave"
+FILAS = 5  # estudiantes y exámenes sembrados: suficiente para que un N+1 se note
+
+# Cachés de proceso indexadas por id: la base en memoria reutiliza los ids en
+# cada test, así que se vacían para que ningún test lea datos de otro
+_CACHES = (
+    analisis._analisis, formularios._bases, grading._claves, identidad._cache,
+    intentos._abiertos, reportes._reportes, revision._revisiones, versiones._contenidos,
+)
+
+
+@pytest.fixture
+def config():
+    """Clase de configuración de la app; un módulo de tests puede redefinirla."""
+    return TestConfig
+
+
+@pytest.fixture
+def app(config):
+    for cache in _CACHES:
+        cache.clear()
+    app = create_app(config)
+    yield app
+    # Las respuestas del autosave esperan en una cola del proceso: no deben
+    # llegar al test siguiente ni escribirse desde el hilo de esta app
+    intentos._vaciador(app).detener()
+    intentos.pendientes.tomar()
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def datos(app):
+    """Un profesor con FILAS exámenes publicados y FILAS estudiantes que
+    presentaron todos."""
+    with app.app_context():
+        profesor = User(username="prof", email="prof@test.co", role="profesor")
+        profesor.set_password(CLAVE)
+        estudiantes = []
+        for i in range(FILAS):
+            estudiante = User(username=f"est{i}", email=f"est{i}@test.co", role="estudiante")
+            estudiante.set_password(CLAVE)
+            estudiantes.append(estudiante)
+        db.session.add(profesor)
+        db.session.add_all(estudiantes)
+        db.session.flush()
+
+        categorias = Categoria.query.all()
+        examenes = []
+        for i in range(FILAS):
+            examen = Examen(titulo=f"Examen {i}", profesor_id=profesor.id, publicado=True,
+                            categoria_id=categorias[i % len(categorias)].id if categorias else None)
+            examen.estudiantes.extend(estudiantes)
+            db.session.add(examen)
+            db.session.flush()
+            for j in range(3):
+                db.session.add(Pregunta(
+                    examen_id=examen.id, texto=f"P{j}", tipo="opcion_multiple", orden=j,
+                    opciones=json.dumps([{"texto": "A", "correcta": True},
+                                         {"texto": "B", "correcta": False}]),
+                ))
+            examenes.append(examen)
+        db.session.commit()
+
+        for examen in examenes:
+            for estudiante in estudiantes:
+                grading.submit(examen, estudiante.id, {})
+
+        resultado = ExamenResultado.query.filter_by(
+            estudiante_id=estudiantes[0].id, examen_id=examenes[0].id).one()
+        return SimpleNamespace(
+            profesor="prof",
+            estudiante="est0",
+            examen_id=examenes[0].id,
+            resultado_id=resultado.id,
+        )
+
+
+@pytest.fixture
+def mixto(app):
+    """Un examen publicado (y congelado) con una pregunta de cada tipo y puntos
+    distintos, y dos estudiantes asignados que aún no lo presentan."""
+    with app.app_context():
+        profesor = User(username="prof", email="prof@test.co", role="profesor")
+        profesor.set_password(CLAVE)
+        estudiantes = []
+        for i in range(2):
+            estudiante = User(username=f"est{i}", email=f"est{i}@test.co", role="estudiante")
+            estudiante.set_password(CLAVE)
+            estudiantes.append(estudiante)
+        db.session.add(profesor)
+        db.session.add_all(estudiantes)
+        db.session.flush()
+
+        examen = Examen(titulo="Mixto", profesor_id=profesor.id, publicado=True,
+                        duracion_minutos=30)
+        examen.estudiantes.extend(estudiantes)
+        db.session.add(examen)
+        db.session.flush()
+        preguntas = [
+            Pregunta(examen_id=examen.id, texto="Capital", tipo="opcion_multiple", orden=0,
+                     puntos=3, opciones=json.dumps([{"texto": "Cali", "correcta": False},
+                                                    {"texto": "Bogotá", "correcta": True},
+                                                    {"texto": "Lima", "correcta": False}])),
+            Pregunta(examen_id=examen.id, texto="2 + 2 = 5", tipo="verdadero_falso", orden=1,
+                     puntos=1, respuesta_correcta="Falso"),
+            Pregunta(examen_id=examen.id, texto="Explique", tipo="abierta", orden=2, puntos=1),
+        ]
+        db.session.add_all(preguntas)
+        db.session.flush()
+        versiones.congelar(examen)
+        db.session.commit()
+        return SimpleNamespace(
+            examen_id=examen.id,
+            estudiantes=[e.id for e in estudiantes],
+            om=preguntas[0].id,
+            vf=preguntas[1].id,
+            abierta=preguntas[2].id,
+        )
+
+
+@pytest.fixture
+def cliente(app):
+    """Fábrica de clientes con sesión iniciada como `usuario`."""
+    def iniciar(usuario):
+        client = app.test_client()
+        respuesta = client.post("/login", data={"username": usuario, "password": CLAVE})
+        assert respuesta.status_code == 302, respuesta.status_code
+        return client
+    return iniciar
@@ -0,0 +1,90 @@
+"""
+Formularios barajados por estudiante: el orden sale de una semilla por
+(examen, estudiante), es reproducible y la revisión muestra el mismo orden
+que vio el estudiante.
+"""
+from app import formularios, grading, revision
+from app.extensions import db
+from app.models import Examen, ExamenResultado
+
+IDS = list(range(1, 41))
+
+
+def test_el_orden_es_determinista_por_estudiante():
+    semilla = formularios.semilla(1, 7)
+    assert semilla == formularios.semilla(1, 7)
+    orden = formularios.orden_preguntas(semilla, IDS)
+    assert sorted(orden) == IDS and orden != IDS
+    assert formularios.orden_preguntas(semilla, reversed(IDS)) == orden
+    assert formularios.orden_preguntas(formularios.semilla(1, 8), IDS) != orden
+    assert formularios.orden_preguntas(formularios.semilla(2, 7), IDS) != orden
+
+    opciones = formularios.orden_opciones(semilla, 5, 6)
+    assert sorted(opciones) == list(range(6))
+    assert formularios.orden_opciones(semilla, 5, 6) == opciones
+
+
+def test_agregar_una_pregunta_no_reordena_las_demas():
+    semilla = formularios.semilla(1, 7)
+    antes = formularios.orden_preguntas(semilla, IDS)
+    despues = formularios.orden_preguntas(semilla, IDS + [99])
+    assert [pid for pid in despues if pid != 99] == antes
+
+
+def _barajar(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        examen.barajar_preguntas = True
+        db.session.commit()
+
+
+def test_formulario_barajado_conserva_los_indices(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        base = formularios.formulario(examen, mixto.estudiantes[0])
+        assert base is formularios.base(examen) and not base.barajado
+
+        semilla = b"\x00" * 16
+        barajado = formularios.barajar(base, semilla)
+        assert [p.id for p in barajado.preguntas] == formularios.orden_preguntas(
+            semilla, [p.id for p in base.preguntas])
+        por_id = {p.id: p for p in barajado.preguntas}
+        # Cada opción conserva su índice canónico como valor del formulario
+        assert [o.indice for o in por_id[mixto.om].opciones] == formularios.orden_opciones(
+            semilla, mixto.om, 3)
+        assert {o.indice: o.texto for o in por_id[mixto.om].opciones} == {
+            0: "Cali", 1: "Bogotá", 2: "Lima"}
+        assert por_id[mixto.vf].opciones == {p.id: p for p in base.preguntas}[mixto.vf].opciones
+
+
+def test_la_revision_reconstruye_el_orden_del_estudiante(app, mixto, cliente):
+    _barajar(app, mixto)
+    estudiante_id = mixto.estudiantes[0]
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        visto = formularios.formulario(examen, estudiante_id)
+        assert visto.barajado
+        assert [p.id for p in visto.preguntas] != [mixto.om, mixto.vf, mixto.abierta]
+
+    # La página del examen pinta las preguntas en ese orden
+    pagina = cliente("est0").get(f"/estudiante/examen/{mixto.examen_id}/presentar").get_data(
+        as_text=True)
+    posiciones = [pagina.index(p.texto) for p in visto.preguntas]
+    assert posiciones == sorted(posiciones)
+
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        db.session.query(ExamenResultado).delete()
+        db.session.commit()
+        resultado, _ = grading.submit(examen, estudiante_id, {f"pregunta_{mixto.om}": 1})
+        preguntas = revision.revision_resultado(db.session.get(ExamenResultado, resultado.id))
+
+    assert [p.texto for p in preguntas] == [p.texto for p in visto.preguntas]
+    assert [p.numero for p in preguntas] == [1, 2, 3]
+    om = next(p for p in preguntas if p.tipo == "opcion_multiple")
+    vista_om = next(p for p in visto.preguntas if p.id == mixto.om)
+    assert [o.texto for o in om.opciones] == [o.texto for o in vista_om.opciones]
+    assert [o.etiqueta for o in om.opciones] == ["A)", "B)", "C)"]
+    assert [o.texto for o in om.opciones if o.elegida] == ["Bogotá"]
+    assert [o.texto for o in om.opciones if o.correcta] == ["Bogotá"]
+    assert om.estado == "correcta"
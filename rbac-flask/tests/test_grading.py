@@ -0,0 +1,83 @@
+"""
+Motor de calificación: clave de respuestas precompilada y en caché por
+versión, nota 0-5 ponderada por Pregunta.puntos y envío en una transacción.
+"""
+from app import grading
+from app.extensions import db
+from app.models import Examen, ExamenResultado, Respuesta
+
+
+def _campos(mixto, om=None, vf=None, abierta=None):
+    return {f"pregunta_{pid}": valor
+            for pid, valor in ((mixto.om, om), (mixto.vf, vf), (mixto.abierta, abierta))
+            if valor is not None}
+
+
+def test_la_clave_se_compila_una_vez_por_version(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        clave = grading.get_answer_key(examen)
+        assert grading.answer_key_for(examen.id, examen.version) is clave
+        assert [item.pregunta_id for item in clave.items] == [mixto.om, mixto.vf, mixto.abierta]
+
+        version = examen.version
+        grading.invalidate_answer_key(examen)
+        assert examen.version == version + 1
+        assert grading.get_answer_key(examen) is not clave
+
+
+def test_nota_ponderada_por_puntos(app, mixto):
+    with app.app_context():
+        clave = grading.answer_key_for(mixto.examen_id, 1)
+        assert clave.total_puntos == 5
+
+        solo_om = grading.grade(clave, _campos(mixto, om=1))
+        assert (solo_om.correctas, solo_om.puntos_obtenidos, solo_om.calificacion) == (1, 3, 3.0)
+
+        solo_vf = grading.grade(clave, _campos(mixto, vf=1))
+        assert (solo_vf.correctas, solo_vf.puntos_obtenidos, solo_vf.calificacion) == (1, 1, 1.0)
+
+        # La abierta suma al total pero no se califica automáticamente
+        todas = grading.grade(clave, _campos(mixto, om=1, vf=1, abierta="Porque sí"))
+        assert (todas.correctas, todas.calificacion) == (2, 4.0)
+        assert grading.grade(clave, {}).calificacion == 0.0
+
+
+def test_submit_guarda_resultado_y_respuestas(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        estudiante_id = mixto.estudiantes[0]
+        resultado, calificacion = grading.submit(examen, estudiante_id, _campos(mixto, om=1, vf=0))
+
+        resultado = db.session.get(ExamenResultado, resultado.id)
+        assert resultado.completado and resultado.calificacion == calificacion.calificacion == 3.0
+        assert resultado.total_puntos == 5 and resultado.examen_version == examen.version
+
+        filas = {r.pregunta_id: (r.es_correcta, r.puntos_obtenidos) for r in Respuesta.query.filter_by(
+            examen_id=examen.id, estudiante_id=estudiante_id)}
+        assert filas == {mixto.om: (True, 3), mixto.vf: (False, 0), mixto.abierta: (False, 0)}
+
+
+def test_las_opciones_se_califican_y_guardan_por_indice(app, mixto):
+    with app.app_context():
+        clave = grading.answer_key_for(mixto.examen_id, 1)
+        om, vf, abierta = clave.items
+        assert (om.opciones, om.correcta) == (("Cali", "Bogotá", "Lima"), 1)
+        assert (vf.opciones, vf.correcta) == (grading.OPCIONES_VF, 1)
+        assert abierta.correcta is None
+
+        # Clientes y diarios anteriores mandan el texto de la opción
+        assert grading.normalizar(om, "Bogotá") == grading.normalizar(om, 1) == 1
+        assert grading.normalizar(vf, "Falso") == 1
+        for invalida in (3, -1, True, "Quito", None):
+            assert grading.normalizar(om, invalida) is None
+        assert grading.normalizar(abierta, 2) == ""
+
+        por_texto = grading.grade(clave, _campos(mixto, om="Bogotá", vf="Falso"))
+        por_indice = grading.grade(clave, _campos(mixto, om=1, vf=1))
+        assert por_texto.calificacion == por_indice.calificacion == 4.0
+
+        examen = db.session.get(Examen, mixto.examen_id)
+        grading.submit(examen, mixto.estudiantes[0], _campos(mixto, om="Lima", vf=0, abierta="Texto"))
+        filas = {r.pregunta_id: (r.opcion_indice, r.respuesta_texto) for r in Respuesta.query}
+        assert filas == {mixto.om: (2, None), mixto.vf: (0, None), mixto.abierta: (None, "Texto")}
@@ -0,0 +1,112 @@
+"""
+Intentos con guardado automático: el resultado se crea al abrir el examen,
+los autosaves se coalescen en memoria por pregunta y se escriben por lotes, y
+el envío final califica lo guardado más lo pendiente.
+"""
+from datetime import timedelta
+
+import pytest
+
+from config import TestConfig
+from app import intentos
+from app.extensions import db
+from app.models import ExamenResultado, Respuesta
+
+
+@pytest.fixture
+def config():
+    # Sin vaciado por tiempo durante el test: las pendientes se escriben solo
+    # cuando el test (o el envío final) lo pide
+    return type("IntentosConfig", (TestConfig,), {"AUTOSAVE_FLUSH_SECONDS": 600})
+
+
+@pytest.fixture
+def estudiante(mixto, cliente):
+    client = cliente("est0")
+    assert client.get(f"/estudiante/examen/{mixto.examen_id}/presentar").status_code == 200
+    return client
+
+
+def _autosave(client, mixto, **respuestas):
+    return client.post(f"/estudiante/examen/{mixto.examen_id}/autosave", json={
+        f"pregunta_{getattr(mixto, nombre)}": valor for nombre, valor in respuestas.items()})
+
+
+def _filas(app, mixto):
+    with app.app_context():
+        return {r.pregunta_id: r.opcion_indice for r in Respuesta.query.filter_by(
+            examen_id=mixto.examen_id, estudiante_id=mixto.estudiantes[0])}
+
+
+def test_abrir_el_examen_crea_un_solo_intento(app, mixto, estudiante):
+    assert estudiante.get(f"/estudiante/examen/{mixto.examen_id}/presentar").status_code == 200
+    with app.app_context():
+        resultados = ExamenResultado.query.filter_by(
+            examen_id=mixto.examen_id, estudiante_id=mixto.estudiantes[0]).all()
+        assert len(resultados) == 1
+        resultado = resultados[0]
+        assert not resultado.completado and resultado.fecha_inicio is not None
+        assert resultado.examen_version == 1
+
+        intentos.olvidar(mixto.examen_id, mixto.estudiantes[0])
+        intento = intentos.abierto(mixto.examen_id, mixto.estudiantes[0])
+        assert intento.resultado_id == resultado.id
+        assert intento.vence == resultado.fecha_inicio + timedelta(minutes=30)
+
+
+def test_el_autosave_coalesce_por_pregunta_y_escribe_por_lote(app, mixto, estudiante):
+    assert _autosave(estudiante, mixto, om=0).get_json() == {"success": True, "guardadas": 1}
+    assert _autosave(estudiante, mixto, om=2, vf="Falso").status_code == 200
+
+    pendientes = intentos.pendientes.de_intento(mixto.examen_id, mixto.estudiantes[0])
+    assert {pid: valor for pid, (valor, _, _) in pendientes.items()} == {mixto.om: 2, mixto.vf: 1}
+    assert _filas(app, mixto) == {}
+
+    # Otra respuesta a una pregunta ya escrita actualiza su fila
+    with app.app_context():
+        assert intentos.vaciar() == 2
+    assert _autosave(estudiante, mixto, om=1).status_code == 200
+    with app.app_context():
+        assert intentos.vaciar() == 1
+        filas = Respuesta.query.filter_by(examen_id=mixto.examen_id).all()
+        assert {r.pregunta_id: (r.opcion_indice, r.es_correcta) for r in filas} == {
+            mixto.om: (1, True), mixto.vf: (1, True)}
+    assert len(intentos.pendientes) == 0
+
+
+def test_el_envio_final_califica_lo_guardado_y_lo_pendiente(app, mixto, estudiante):
+    _autosave(estudiante, mixto, om=1)
+    with app.app_context():
+        intentos.vaciar()
+    _autosave(estudiante, mixto, vf=1)  # sigue en la cola
+
+    respuesta = estudiante.post(f"/estudiante/examen/{mixto.examen_id}/enviar",
+                                json={f"pregunta_{mixto.abierta}": "Porque sí"})
+    datos = respuesta.get_json()
+    assert (datos["calificacion"], datos["correctas"], datos["pendiente"]) == (4.0, 2, False)
+    assert _filas(app, mixto) == {mixto.om: 1, mixto.vf: 1, mixto.abierta: None}
+    with app.app_context():
+        resultado = db.session.get(ExamenResultado, datos["resultado_id"])
+        assert resultado.completado and resultado.calificacion == 4.0
+
+    segundo = estudiante.post(f"/estudiante/examen/{mixto.examen_id}/enviar", json={})
+    assert segundo.status_code == 400
+    assert _autosave(estudiante, mixto, om=0).status_code == 409
+
+
+def test_el_intento_vencido_no_acepta_respuestas(app, mixto, estudiante):
+    _autosave(estudiante, mixto, vf=1)
+    with app.app_context():
+        intentos.vaciar()
+        resultado = intentos.resultado_de(mixto.examen_id, mixto.estudiantes[0])
+        resultado.fecha_inicio -= timedelta(
+            minutes=30, seconds=app.config["INTENTO_GRACIA_SEGUNDOS"] + 1)
+        db.session.commit()
+        intentos.olvidar(mixto.examen_id, mixto.estudiantes[0])
+
+    assert _autosave(estudiante, mixto, om=1).status_code == 409
+    # El formulario final llega tarde: cuenta solo lo guardado a tiempo
+    respuesta = estudiante.post(f"/estudiante/examen/{mixto.examen_id}/enviar",
+                                json={f"pregunta_{mixto.om}": 1})
+    assert respuesta.get_json()["calificacion"] == 1.0
+    assert _filas(app, mixto) == {mixto.vf: 1}
@@ -0,0 +1,97 @@
+"""
+Escritura diferida de envíos: el envío se califica y se anota en el diario sin
+tocar la base, y vaciar el diario lo aplica una sola vez aunque se repita.
+"""
+import pytest
+
+from config import TestConfig
+from app import intentos, journal
+from app.extensions import db
+from app.models import ExamenResultado, ExamenStats, ProfesorEstudianteStats, Respuesta
+
+
+@pytest.fixture
+def config(tmp_path):
+    return type("DiarioConfig", (TestConfig,), {
+        "SUBMIT_WRITE_BEHIND": True,
+        "SUBMIT_JOURNAL_PATH": str(tmp_path / "diario.db"),
+        "AUTOSAVE_FLUSH_SECONDS": 600,
+    })
+
+
+@pytest.fixture
+def diario(app):
+    # El test vacía el diario a mano: el hilo de fondo no debe adelantarse
+    journal._trabajador(app).detener()
+    return journal._diario(app)
+
+
+def _enviar(client, mixto, **respuestas):
+    return client.post(f"/estudiante/examen/{mixto.examen_id}/enviar", json={
+        f"pregunta_{getattr(mixto, nombre)}": valor for nombre, valor in respuestas.items()})
+
+
+def _respuestas(app, estudiante_id):
+    with app.app_context():
+        return {r.pregunta_id: r.opcion_indice for r in Respuesta.query.filter_by(
+            estudiante_id=estudiante_id)}
+
+
+def test_el_envio_se_califica_y_se_anota_sin_escribir_en_la_base(app, mixto, cliente, diario):
+    client = cliente("est0")
+    client.get(f"/estudiante/examen/{mixto.examen_id}/presentar")
+    client.post(f"/estudiante/examen/{mixto.examen_id}/autosave",
+                json={f"pregunta_{mixto.om}": 1})
+
+    datos = _enviar(client, mixto, vf=1).get_json()
+    assert (datos["calificacion"], datos["pendiente"]) == (4.0, True)
+    assert len(diario) == 1 and journal.pendiente(app, mixto.examen_id, mixto.estudiantes[0])
+    # Lo que el autosave tenía en cola viaja en el diario
+    assert intentos.pendientes.de_intento(mixto.examen_id, mixto.estudiantes[0]) == {}
+    assert diario.leer(1)[0].respuestas == {str(mixto.om): 1, str(mixto.vf): 1}
+    with app.app_context():
+        assert not db.session.get(ExamenResultado, datos["resultado_id"]).completado
+    assert _respuestas(app, mixto.estudiantes[0]) == {}
+
+    assert _enviar(client, mixto, om=0).status_code == 400
+    assert client.get(f"/estudiante/examen/{mixto.examen_id}/presentar").status_code == 400
+
+
+def test_vaciar_el_diario_aplica_los_envios(app, mixto, cliente, diario):
+    client = cliente("est0")
+    client.get(f"/estudiante/examen/{mixto.examen_id}/presentar")
+    resultado_id = _enviar(client, mixto, om=1, vf=0).get_json()["resultado_id"]
+    # Sin intento abierto (cliente sin autosave) el resultado se crea al vaciar
+    assert _enviar(cliente("est1"), mixto, om="Bogotá").get_json()["resultado_id"] is None
+
+    assert journal.vaciar(app) == 2
+    assert len(diario) == 0
+    with app.app_context():
+        resultados = {r.estudiante_id: r for r in ExamenResultado.query}
+        assert resultados[mixto.estudiantes[0]].id == resultado_id
+        assert all(r.completado and r.calificacion == 3.0 for r in resultados.values())
+        # El primer envío del profesor reconstruye sus estadísticas con todo el lote
+        assert db.session.get(ExamenStats, mixto.examen_id).total_presentaciones == 2
+        assert [s.total_resultados for s in ProfesorEstudianteStats.query] == [1, 1]
+    assert _respuestas(app, mixto.estudiantes[0]) == {mixto.om: 1, mixto.vf: 0}
+    assert _respuestas(app, mixto.estudiantes[1]) == {mixto.om: 1}
+
+
+def test_aplicar_dos_veces_no_duplica(app, mixto, cliente, diario):
+    client = cliente("est0")
+    client.get(f"/estudiante/examen/{mixto.examen_id}/presentar")
+    _enviar(client, mixto, om=1)
+    envios = diario.leer(10)
+
+    # El proceso cae entre el commit y el borrado: el mismo lote se vuelve a aplicar
+    with app.app_context():
+        assert journal.aplicar(envios) == 1
+        db.session.commit()
+        assert journal.aplicar(envios) == 0
+        db.session.commit()
+        assert Respuesta.query.count() == 1
+        assert ExamenResultado.query.count() == 1
+        assert db.session.get(ExamenStats, mixto.examen_id).total_presentaciones == 1
+
+    assert journal.vaciar(app) == 0
+    assert len(diario) == 0
@@ -0,0 +1,56 @@
+"""
+Cada vista con @query_budget respeta su presupuesto de consultas sin importar
+cuántas filas pinte (detecta N+1).
+
+TestConfig activa QUERY_BUDGET_ENFORCE: una vista que se pasa lanza
+QueryBudgetExceeded al responder y el test falla.
+"""
+import pytest
+
+from app.budget import QueryBudgetExceeded
+
+VISTAS = [
+    ("profesor", "/dashboard_profesor"),
+    ("profesor", "/reporte_examenes"),
+    ("profesor", "/profesor/examenes"),
+    ("profesor", "/profesor/estudiantes"),
+    ("profesor", "/profesor/examen/{examen_id}/resultados"),
+    ("estudiante", "/dashboard_estudiante"),
+    ("estudiante", "/estudiante/examenes"),
+    ("estudiante", "/estudiante/mis-resultados"),
+    ("estudiante", "/estudiante/progreso-detallado"),
+    ("estudiante", "/estudiante/resultado/{resultado_id}"),
+]
+
+
+def _url(plantilla, datos):
+    return plantilla.format(examen_id=datos.examen_id, resultado_id=datos.resultado_id)
+
+
+@pytest.mark.parametrize("rol, plantilla", VISTAS, ids=[url for _, url in VISTAS])
+def test_vista_dentro_del_presupuesto(datos, cliente, rol, plantilla):
+    client = cliente(getattr(datos, rol))
+    respuesta = client.get(_url(plantilla, datos))
+    assert respuesta.status_code == 200
+
+
+def test_todas_las_vistas_con_presupuesto_estan_cubiertas(app, datos):
+    # Resolver cada URL a la vista que realmente la atiende: una regla tapada
+    # por otra con la misma URL no es alcanzable y no necesita test propio
+    adaptador = app.url_map.bind("localhost")
+    cubiertas = {adaptador.match(_url(url, datos))[0] for _, url in VISTAS}
+    alcanzables = set()
+    for regla in app.url_map.iter_rules():
+        if not hasattr(app.view_functions[regla.endpoint], "query_budget"):
+            continue
+        url = regla.build({arg: 1 for arg in regla.arguments})[1]
+        alcanzables.add(adaptador.match(url)[0])
+    assert alcanzables <= cubiertas, alcanzables - cubiertas
+
+
+def test_exceder_el_presupuesto_falla(app, datos, cliente, monkeypatch):
+    vista = app.view_functions["main.dashboard_profesor"]
+    monkeypatch.setattr(vista, "query_budget", (1, frozenset({"GET"})))
+    client = cliente(datos.profesor)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/dashboard_profesor")
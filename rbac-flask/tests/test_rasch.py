@@ -0,0 +1,77 @@
+"""
+Puntaje escalado de Rasch: tabla aciertos -> puntaje, calibración JML (con
+NumPy) y reescalado de los resultados contra la clave vigente.
+"""
+import json
+
+import pytest
+
+from app import analisis, grading, rasch, versiones
+from app.extensions import db
+from app.models import Examen, ExamenResultado, Pregunta
+
+
+def test_tabla_de_puntajes():
+    assert rasch.tabla_puntajes([]) == ()
+
+    tabla = rasch.tabla_puntajes([-1.0, 0.0, 1.0])
+    assert len(tabla) == 4
+    assert list(tabla) == sorted(tabla) and tabla[0] < tabla[-1]
+    # Dificultades simétricas: la mitad de los aciertos es la media de la escala
+    assert rasch.tabla_puntajes([-1.0, 1.0])[1] == rasch.ESCALA_MEDIA
+    # Con los mismos aciertos, un examen más difícil da más puntaje
+    assert rasch.tabla_puntajes([1.0, 2.0, 3.0])[2] > rasch.tabla_puntajes([-3.0, -2.0, -1.0])[2]
+    assert all(0 <= p <= rasch.ESCALA_MAXIMA for p in rasch.tabla_puntajes([-6.0] * 5 + [6.0] * 5))
+
+
+def test_ajustar_recupera_las_dificultades():
+    np = pytest.importorskip("numpy")
+    generador = np.random.default_rng(7)
+    reales = np.array([-1.5, -0.5, 0.0, 0.5, 1.5])
+    theta = generador.normal(0.0, 1.0, 3000)
+    aciertos = generador.random((3000, 5)) < 1.0 / (1.0 + np.exp(reales[None, :] - theta[:, None]))
+    # Una pregunta que nadie acierta y un estudiante con todo no informan
+    aciertos = np.column_stack([aciertos, np.zeros(3000, dtype=bool)])
+    aciertos[0] = True
+
+    dificultades, usados, _, convergio = rasch.ajustar(aciertos)
+    assert convergio and usados < 3000
+    assert np.abs(dificultades[:5] - (reales - reales.mean())).max() < 0.15
+    assert dificultades[5] == pytest.approx(dificultades[:5].max() + 1.0)
+
+    with pytest.raises(ValueError):
+        rasch.ajustar(np.ones((10, 4)))
+
+
+def test_el_envio_guarda_el_puntaje_de_la_tabla(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        clave = grading.get_answer_key(examen)
+        assert len(clave.escala) == 3  # solo las dos preguntas con opciones
+
+        resultado, calificacion = grading.submit(
+            examen, mixto.estudiantes[0], {f"pregunta_{mixto.om}": 1})
+        assert calificacion.puntaje == clave.escala[1]
+        assert db.session.get(ExamenResultado, resultado.id).puntaje_escalado == clave.escala[1]
+
+
+def test_reescalar_cuenta_contra_la_clave_vigente(app, mixto):
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        for estudiante_id, opcion in zip(mixto.estudiantes, (1, 0)):
+            grading.submit(examen, estudiante_id, {f"pregunta_{mixto.om}": opcion})
+
+        # La opción correcta pasa a ser la 0: Respuesta.es_correcta queda desactualizada
+        pregunta = db.session.get(Pregunta, mixto.om)
+        pregunta.opciones = json.dumps([{"texto": "Cali", "correcta": True},
+                                        {"texto": "Bogotá", "correcta": False},
+                                        {"texto": "Lima", "correcta": False}])
+        pregunta.rasch_dificultad = 2.0
+        versiones.nueva_version(examen)
+        db.session.commit()
+
+        escala = grading.get_answer_key(examen).escala
+        assert analisis.reescalar(examen) == 2
+        db.session.commit()
+        puntajes = {r.estudiante_id: r.puntaje_escalado for r in ExamenResultado.query}
+        assert puntajes == {mixto.estudiantes[0]: escala[0], mixto.estudiantes[1]: escala[1]}
@@ -0,0 +1,96 @@
+"""
+Ruteo a la réplica de lectura con dos archivos SQLite.
+
+La réplica es una copia de la primaria (replicas.sincronizar) tomada antes de
+crear un examen solo en la primaria, así que una lectura servida por la
+réplica no lo ve.
+"""
+import time
+
+import pytest
+from sqlalchemy import event
+
+from config import TestConfig
+from app import replicas
+from app.extensions import db
+from app.models import User, Examen
+
+VENTANA = 0.3  # DB_REPLICA_STICKY_SECONDS de los tests
+
+
+@pytest.fixture
+def config(tmp_path):
+    return type("ReplicaConfig", (TestConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primaria.db'}",
+        "DB_REPLICA_URL": f"sqlite:///{tmp_path / 'replica.db'}",
+        "DB_REPLICA_STICKY_SECONDS": VENTANA,
+    })
+
+
+@pytest.fixture
+def replicada(app, datos):
+    """Réplica sincronizada y un examen que solo existe en la primaria."""
+    with app.app_context():
+        replicas.sincronizar(app.config["SQLALCHEMY_DATABASE_URI"], app.config["DB_REPLICA_URL"])
+        profesor = User.query.filter_by(username=datos.profesor).one()
+        db.session.add(Examen(titulo="SoloEnPrimaria", profesor_id=profesor.id, publicado=True))
+        db.session.commit()
+    return datos
+
+
+@pytest.fixture
+def conteo(app):
+    """Sentencias ejecutadas por bind ("primaria" o replicas.BIND)."""
+    conteo = {}
+    with app.app_context():
+        for nombre, engine in db.engines.items():
+            def contar(*_, nombre=nombre or "primaria"):
+                conteo[nombre] = conteo.get(nombre, 0) + 1
+            event.listen(engine, "before_cursor_execute", contar)
+    return conteo
+
+
+@pytest.fixture
+def profesor(replicada, cliente):
+    client = cliente(replicada.profesor)
+    time.sleep(VENTANA + 0.1)  # el login escribe: dejar pasar su ventana de primaria
+    return client
+
+
+@pytest.mark.parametrize("url, en_replica", [
+    ("/reporte_examenes", True),
+    ("/dashboard_profesor", True),
+    ("/profesor/examenes", False),
+])
+def test_lecturas_van_a_la_replica_solo_en_vistas_marcadas(profesor, conteo, url, en_replica):
+    conteo.clear()
+    respuesta = profesor.get(url)
+    assert respuesta.status_code == 200
+    assert (conteo.get(replicas.BIND, 0) > 0) == en_replica
+    if en_replica:
+        assert not conteo.get("primaria")
+    else:
+        assert b"SoloEnPrimaria" in respuesta.data
+
+
+def test_la_replica_sirve_datos_atrasados(profesor):
+    assert b"SoloEnPrimaria" not in profesor.get("/reporte_examenes").data
+
+
+def test_despues_de_escribir_lee_de_la_primaria_durante_la_ventana(profesor, conteo):
+    conteo.clear()
+    respuesta = profesor.post("/profesor/examen/crear", data={
+        "titulo": "Nuevo", "descripcion": "", "duracion_minutos": "30"})
+    assert respuesta.status_code == 302
+    assert conteo.get("primaria", 0) > 0 and not conteo.get(replicas.BIND)
+
+    conteo.clear()
+    respuesta = profesor.get("/reporte_examenes")
+    assert b"SoloEnPrimaria" in respuesta.data
+    assert not conteo.get(replicas.BIND)
+
+    time.sleep(VENTANA + 0.1)
+    conteo.clear()
+    respuesta = profesor.get("/reporte_examenes")
+    assert b"SoloEnPrimaria" not in respuesta.data
+    assert conteo.get(replicas.BIND, 0) > 0
@@ -0,0 +1,88 @@
+"""
+Versiones congeladas: publicar guarda el contenido del examen en una fila,
+editar un publicado crea una versión nueva y cada intento se presenta y
+califica con la versión con la que empezó.
+"""
+import json
+
+import pytest
+
+from app import versiones
+from app.extensions import db
+from app.models import Examen, ExamenResultado, ExamenVersion, Pregunta
+
+
+def _versiones(app, examen_id):
+    with app.app_context():
+        return {v.version: json.loads(v.contenido) for v in ExamenVersion.query.filter_by(
+            examen_id=examen_id)}
+
+
+def test_la_version_publicada_no_sigue_a_las_preguntas(app, mixto):
+    with app.app_context():
+        congelada = versiones.congelado(mixto.examen_id, 1)
+        assert [p["id"] for p in congelada["preguntas"]] == [mixto.om, mixto.vf, mixto.abierta]
+        assert congelada["preguntas"][0]["opciones"] == ["Cali", "Bogotá", "Lima"]
+        assert congelada["preguntas"][0]["correcta"] == 1
+
+        db.session.get(Pregunta, mixto.om).texto = "Cambiada sin versión"
+        db.session.commit()
+        versiones._contenidos.clear()
+        assert versiones.contenido(mixto.examen_id, 1) == congelada
+
+
+def test_congelar_dos_veces_la_misma_version(app, mixto, cliente):
+    profesor = cliente("prof")
+    assert profesor.post(f"/profesor/examen/{mixto.examen_id}/publicar").status_code == 302
+    assert list(_versiones(app, mixto.examen_id)) == [1]
+
+    with app.app_context():
+        examen = db.session.get(Examen, mixto.examen_id)
+        assert versiones.congelar(examen) is False
+        db.session.get(Pregunta, mixto.om).texto = "Cambiada sin versión"
+        db.session.flush()
+        with pytest.raises(versiones.VersionEnConflicto):
+            versiones.congelar(examen)
+        db.session.rollback()
+
+
+def test_publicar_con_la_version_en_conflicto_no_guarda_nada(app, mixto, cliente):
+    with app.app_context():
+        db.session.get(Pregunta, mixto.om).texto = "Cambiada sin versión"
+        db.session.commit()
+    antes = _versiones(app, mixto.examen_id)
+
+    respuesta = cliente("prof").post(f"/profesor/examen/{mixto.examen_id}/publicar")
+    assert respuesta.status_code == 302 and "/profesor/examenes" in respuesta.location
+    assert _versiones(app, mixto.examen_id) == antes
+
+
+def test_editar_un_publicado_no_cambia_los_intentos_en_curso(app, mixto, cliente):
+    estudiante = cliente("est0")
+    assert estudiante.get(f"/estudiante/examen/{mixto.examen_id}/presentar").status_code == 200
+
+    profesor = cliente("prof")
+    assert profesor.post(f"/profesor/pregunta/{mixto.vf}/editar", data={
+        "texto": "2 + 2 = 4", "tipo": "verdadero_falso", "puntos": "1",
+        "respuesta_correcta": "Verdadero"}).status_code == 302
+    congeladas = _versiones(app, mixto.examen_id)
+    assert sorted(congeladas) == [1, 2]
+    assert [(p["texto"], p["correcta"]) for p in congeladas[1]["preguntas"][1:2]] == [("2 + 2 = 5", 1)]
+    assert [(p["texto"], p["correcta"]) for p in congeladas[2]["preguntas"][1:2]] == [("2 + 2 = 4", 0)]
+
+    # El intento empezado en la versión 1 se presenta y califica con ella
+    pagina = estudiante.get(f"/estudiante/examen/{mixto.examen_id}/presentar").get_data(as_text=True)
+    assert "2 + 2 = 5" in pagina and "2 + 2 = 4" not in pagina
+    respuestas = {f"pregunta_{mixto.om}": 1, f"pregunta_{mixto.vf}": 1}
+    enviado = estudiante.post(f"/estudiante/examen/{mixto.examen_id}/enviar", json=respuestas)
+    assert enviado.get_json()["calificacion"] == 4.0
+
+    # Un intento nuevo usa la versión 2
+    otro = cliente("est1")
+    assert "2 + 2 = 4" in otro.get(
+        f"/estudiante/examen/{mixto.examen_id}/presentar").get_data(as_text=True)
+    enviado = otro.post(f"/estudiante/examen/{mixto.examen_id}/enviar", json=respuestas)
+    assert enviado.get_json()["calificacion"] == 3.0
+    with app.app_context():
+        assert {r.estudiante_id: r.examen_version for r in ExamenResultado.query} == {
+            mixto.estudiantes[0]: 1, mixto.estudiantes[1]: 2}